@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the task management system.
+
+Each module is a standalone script, run from the project root, e.g.
+``python -m benchmarks.channel_layer``.
+"""
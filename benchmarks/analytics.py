@@ -0,0 +1,126 @@
+"""
+Flow analytics on a board with a long transition history.
+
+    python -m benchmarks.analytics [--transitions 1000000] [--days 365] [--repeat 5]
+
+Builds a throwaway SQLite database with one board whose tasks move through
+To Do, In Progress and Done (some going back a step) until the log holds
+--transitions rows spread over the last two years. Then times loading the
+log into arrays, computing the metrics, and the uncached board_flow call
+behind the analytics endpoint.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "task_management_system.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, connections, transaction  # noqa: E402
+
+
+def populate(transitions, seed=42):
+    from django.contrib.auth.models import User
+
+    from boards.models import Board, Column, Task, TaskTransition
+
+    rng = random.Random(seed)
+    owner = User.objects.create_user("bench")
+    board = Board.objects.create(name="Flow", owner=owner)
+    todo, doing, done = Column.objects.filter(board=board).order_by("order").values_list("id", flat=True)
+    now = datetime.now(timezone.utc)
+    stored = connection.ops.adapt_datetimefield_value  # what the ORM would write
+
+    task_sql = (
+        f"INSERT INTO {Task._meta.db_table} (id, title, description, board_id, column_id, priority, "
+        f"\"order\", created_at, updated_at, is_locked, subtasks_total, subtasks_done) "
+        f"VALUES (%s, 'Task', '', %s, %s, 'medium', 0, %s, %s, 0, 0, 0)"
+    )
+    move_sql = (
+        f"INSERT INTO {TaskTransition._meta.db_table} (task_id, board_id, from_column_id, to_column_id, created_at) "
+        f"VALUES (%s, %s, %s, %s, %s)"
+    )
+    task_id, written, tasks, moves = 0, 0, [], []
+    with transaction.atomic(), connection.cursor() as cursor:
+        while written < transitions:
+            task_id += 1
+            at = now - timedelta(days=rng.uniform(0, 730))
+            path = [todo, doing]
+            while rng.random() < 0.2:
+                path += [todo, doing]
+            if rng.random() < 0.8:
+                path.append(done)
+            previous = None
+            for column in path:
+                moves.append((task_id, board.id, previous, column, stored(at)))
+                previous = column
+                at += timedelta(hours=rng.expovariate(1 / 36))
+            tasks.append((task_id, board.id, previous, stored(at), stored(at)))
+            written += len(path)
+            if len(moves) >= 20000:
+                cursor.executemany(task_sql, tasks)
+                cursor.executemany(move_sql, moves)
+                tasks, moves = [], []
+        cursor.executemany(task_sql, tasks)
+        cursor.executemany(move_sql, moves)
+    return board, task_id, written
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--transitions", type=int, default=1_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for conn in connections.all():
+            conn.settings_dict["NAME"] = os.path.join(tmp, "bench.sqlite3")
+        call_command("migrate", verbosity=0)
+
+        from boards import analytics
+
+        start = time.perf_counter()
+        board, tasks, written = populate(args.transitions)
+        print(f"Inserted {tasks:,} tasks and {written:,} transitions in {time.perf_counter() - start:.1f}s\n")
+
+        ids = [board.id]
+        columns = analytics.load_columns(ids, by_title=False)
+        arrays = analytics.load_transitions(ids)
+        now = int(time.time())
+
+        def uncached():
+            cache.clear()
+            analytics.board_flow(board, args.days)
+
+        print(f"{'step':<22} {'median ms':>10} {'max ms':>10}")
+        for name, func in (
+            ("load transitions", lambda: analytics.load_transitions(ids)),
+            ("compute metrics", lambda: analytics.flow_metrics(*arrays, *columns, args.days, now)),
+            ("board_flow, uncached", uncached),
+            ("board_flow, cached", lambda: analytics.board_flow(board, args.days)),
+        ):
+            median, worst = timed(func, args.repeat)
+            print(f"{name:<22} {median:>10.1f} {worst:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+board_detail latency on a large board, before and after archiving.
+
+    python -m benchmarks.archive [--tasks 20000] [--finished 0.8] [--repeat 20]
+
+Builds a throwaway SQLite database with one board of --tasks cards, the
+--finished share of them sitting in Done since two to twelve months ago,
+each with a couple of subtasks, an assignee and its column history. Times
+GET board_detail and snapshot.json (median of --repeat) through the real
+ASGI application, runs archive_tasks, and times them again.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.utils import timezone
+
+# Sets up Django, and drives the ASGI app the same way the e2e benchmark does
+from benchmarks.e2e import HOST, Client
+
+BATCH = 2000
+
+
+def populate(n_tasks, finished, seed=42):
+    from django.contrib.auth.models import User
+
+    from boards.models import Board, SubTask, Task, TaskTransition
+
+    rng = random.Random(seed)
+    user = User.objects.create_user("bench")
+    board = Board.objects.create(name="Large", owner=user)
+    board.members.add(user)
+    todo, doing, done = board.columns.order_by("order")
+    now = timezone.now()
+
+    with transaction.atomic():
+        for start in range(0, n_tasks, BATCH):
+            count = min(BATCH, n_tasks - start)
+            columns = [done if rng.random() < finished else rng.choice([todo, doing]) for _ in range(count)]
+            tasks = Task.objects.bulk_create([
+                Task(title=f"Task {start + i}", board=board, column=column, order=(start + i + 1) * 1024)
+                for i, column in enumerate(columns)
+            ])
+            Task.assigned_to.through.objects.bulk_create([Task.assigned_to.through(task=t, user=user) for t in tasks])
+            SubTask.objects.bulk_create([
+                SubTask(task=t, title=f"Step {j}", is_completed=t.column_id == done.id) for t in tasks for j in range(2)
+            ])
+            moves = []
+            for t in tasks:
+                at = now - timedelta(days=rng.uniform(60, 365))
+                moves.append(TaskTransition(task=t, board=board, to_column=todo, created_at=at))
+                if t.column_id != todo.id:
+                    moves.append(TaskTransition(task=t, board=board, from_column=todo, to_column=doing, created_at=at + timedelta(days=1)))
+                if t.column_id == done.id:
+                    moves.append(TaskTransition(task=t, board=board, from_column=doing, to_column=done, created_at=at + timedelta(days=2)))
+            TaskTransition.objects.bulk_create(moves)
+        Task.recount_subtasks()
+        # Everything was last touched when it entered its column
+        Task.objects.filter(board=board, column=done).update(updated_at=now - timedelta(days=58))
+    return board, user
+
+
+async def timed(client, path, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        status, _ = await client.request("GET", path)
+        samples.append((time.perf_counter() - start) * 1000)
+        assert status == 200, status
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--finished", type=float, default=0.8, help="Share of tasks long since done.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for conn in connections.all():
+            conn.settings_dict["NAME"] = os.path.join(tmp, "bench.sqlite3")
+        settings.CHANNEL_LAYERS["default"]["CONFIG"] = {"path": os.path.join(tmp, "channels.sqlite3")}
+        settings.DEBUG = False
+        settings.ALLOWED_HOSTS = [HOST]
+        call_command("migrate", verbosity=0)
+
+        from boards.archive import archive_tasks
+        from task_management_system.asgi import application
+
+        board, user = populate(args.tasks, args.finished)
+        client = Client(application, user)
+        paths = {
+            "board_detail": f"/boards/{board.id}/",
+            "snapshot.json": f"/boards/{board.id}/snapshot.json",
+        }
+
+        before = {name: asyncio.run(timed(client, path, args.repeat)) for name, path in paths.items()}
+        start = time.perf_counter()
+        archived = archive_tasks(days=30)
+        elapsed = time.perf_counter() - start
+        print(f"Archived {archived:,} of {args.tasks:,} tasks in {elapsed:.1f}s\n")
+        after = {name: asyncio.run(timed(client, path, args.repeat)) for name, path in paths.items()}
+
+        print(f"{'view':<15} {'before ms':>10} {'after ms':>10} {'speedup':>8}")
+        for name in paths:
+            print(f"{name:<15} {before[name]:>10.1f} {after[name]:>10.1f} {before[name] / after[name]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
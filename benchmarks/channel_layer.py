@@ -0,0 +1,134 @@
+"""
+Channel layer throughput: SQLiteChannelLayer against InMemoryChannelLayer.
+
+    python -m benchmarks.channel_layer [--messages 5000] [--group-size 40] [--processes 4]
+
+Measures messages per second for point-to-point send/receive and deliveries
+per second for a group_send fanned out to --group-size channels. The SQLite
+layer is also measured fanning out to receivers in --processes separate
+worker processes, which the in-memory layer can't do at all.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "task_management_system.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from channels.layers import InMemoryChannelLayer  # noqa: E402
+
+from boards.layers import SQLiteChannelLayer  # noqa: E402
+
+
+def make_layers(path, capacity):
+    return {
+        "InMemoryChannelLayer": lambda: InMemoryChannelLayer(capacity=capacity),
+        "SQLiteChannelLayer": lambda: SQLiteChannelLayer(path=path, capacity=capacity),
+    }
+
+
+async def point_to_point(layer, messages):
+    channel = await layer.new_channel()
+    start = time.perf_counter()
+
+    async def consume():
+        for _ in range(messages):
+            await layer.receive(channel)
+
+    consumer = asyncio.ensure_future(consume())
+    for i in range(messages):
+        await layer.send(channel, {"type": "board_update", "data": {"task_id": i}})
+    await consumer
+    return messages / (time.perf_counter() - start)
+
+
+async def fan_out(layer, messages, group_size):
+    channels = [await layer.new_channel() for _ in range(group_size)]
+    for channel in channels:
+        await layer.group_add("board_bench", channel)
+    start = time.perf_counter()
+
+    async def consume(channel):
+        for _ in range(messages):
+            await layer.receive(channel)
+
+    consumers = [asyncio.ensure_future(consume(c)) for c in channels]
+    for i in range(messages):
+        await layer.group_send("board_bench", {"type": "board_update", "data": {"task_id": i}})
+    await asyncio.gather(*consumers)
+    return messages * group_size / (time.perf_counter() - start)
+
+
+def _receiver(path, capacity, messages, ready, done):
+    async def main():
+        layer = SQLiteChannelLayer(path=path, capacity=capacity)
+        channel = await layer.new_channel()
+        await layer.group_add("board_procs", channel)
+        ready.release()
+        for _ in range(messages):
+            await layer.receive(channel)
+        await layer.close()
+    asyncio.run(main())
+    done.release()
+
+
+def cross_process(path, capacity, messages, processes):
+    ctx = multiprocessing.get_context("spawn")
+    ready, done = ctx.Semaphore(0), ctx.Semaphore(0)
+    workers = [
+        ctx.Process(target=_receiver, args=(path, capacity, messages, ready, done))
+        for _ in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.acquire()
+
+    async def send():
+        layer = SQLiteChannelLayer(path=path, capacity=capacity)
+        for i in range(messages):
+            await layer.group_send("board_procs", {"type": "board_update", "data": {"task_id": i}})
+        await layer.close()
+
+    start = time.perf_counter()
+    asyncio.run(send())
+    for _ in workers:
+        done.acquire()
+    elapsed = time.perf_counter() - start
+    for worker in workers:
+        worker.join()
+    return messages * processes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--group-size", type=int, default=40)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    # Big enough that nothing is dropped as ChannelFull while we measure
+    capacity = args.messages + 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "channels.sqlite3")
+        print(f"{'layer':<22} {'send/receive msg/s':>20} {'group_send deliveries/s':>25}")
+        for name, factory in make_layers(path, capacity).items():
+            layer = factory()
+            p2p = asyncio.run(point_to_point(layer, args.messages))
+            layer = factory()
+            fan = asyncio.run(fan_out(layer, args.messages // 10, args.group_size))
+            print(f"{name:<22} {p2p:>20,.0f} {fan:>25,.0f}")
+
+        rate = cross_process(path, capacity, args.messages // 10, args.processes)
+        print(f"\nSQLiteChannelLayer across {args.processes} processes: {rate:,.0f} deliveries/s")
+
+
+if __name__ == "__main__":
+    main()
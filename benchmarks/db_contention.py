@@ -0,0 +1,177 @@
+"""
+Read/write contention on the SQLite database.
+
+    python -m benchmarks.db_contention [--threads 8] [--seconds 10] [--write-ratio 0.2]
+                                       [--tasks 2000] [--output db_contention.json]
+
+Many threads run a mixed workload against one database file. Reads build a
+board snapshot, as board_detail does. Writes move a task and log the event in
+one transaction, as reorder and the bulk endpoint do. Each thread closes its
+connections after every operation, the way a request ends. The workload runs
+twice, each time on a fresh copy of the same seeded dataset:
+
+    plain    the stock sqlite3 backend with default settings
+             (rollback journal, deferred transactions, 5 s busy timeout)
+    routed   the configured boards.db backend and router
+             (WAL, BEGIN IMMEDIATE, a pool of read-only connections)
+
+For each we report operations per second, p50/p95 latency, and how many
+operations failed with "database is locked".
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+MODES = ("plain", "routed")
+
+
+def configure(mode, path):
+    from django.conf import settings
+
+    if mode == "plain":
+        settings.DATABASES = {"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": path}}
+        settings.DATABASE_ROUTERS = []
+    else:
+        for database in settings.DATABASES.values():
+            database["NAME"] = path
+
+
+def percentiles(samples):
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None}
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))], 3),
+    }
+
+
+def run_mode(args):
+    """Child process: seed, then hammer the database from ``args.threads`` threads."""
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "task_management_system.settings")
+    configure(args.mode, args.database)
+
+    import django
+
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import OperationalError, connections, transaction
+
+    from boards import events
+    from boards.db.routers import reading
+    from boards.models import Board, Column, Task
+    from boards.ordering import place_task
+    from boards.snapshot import build_board_snapshot
+
+    call_command("migrate", verbosity=0)
+    call_command(
+        "seed_boards", users=40, teams=4, boards=4, tasks=args.tasks, team_size=10, board_size=10,
+        notifications=0, comments=0, attachments=0, seed=0, prefix="contention", verbosity=0,
+        stdout=open(os.devnull, "w"),
+    )
+    board_ids = list(Board.objects.values_list("id", flat=True))
+    columns = {b: list(Column.objects.filter(board_id=b).values_list("id", flat=True)) for b in board_ids}
+    tasks = {b: list(Task.objects.filter(board_id=b).values_list("id", flat=True)) for b in board_ids}
+    connections.close_all()
+
+    stop = threading.Event()
+    results = {"read": [], "write": []}
+    errors = {"read": 0, "write": 0}
+    lock = threading.Lock()
+
+    def read(rng):
+        build_board_snapshot(rng.choice(board_ids))
+
+    def write(rng):
+        board_id = rng.choice(board_ids)
+        # Reads then writes in one transaction, like reorder and the bulk endpoint
+        with transaction.atomic():
+            task = Task.objects.get(id=rng.choice(tasks[board_id]))
+            column = Column.objects.get(id=rng.choice(columns[board_id]))
+            order = place_task(task, column)
+            events.record([(board_id, {"type": "task_moved", "task_id": task.id, "new_column_id": column.id, "order": order})])
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            kind = "write" if rng.random() < args.write_ratio else "read"
+            token = reading.set(kind == "read")
+            began = time.perf_counter()
+            try:
+                (write if kind == "write" else read)(rng)
+            except OperationalError as e:
+                if "locked" not in str(e):
+                    raise
+                with lock:
+                    errors[kind] += 1
+            else:
+                with lock:
+                    results[kind].append((time.perf_counter() - began) * 1000)
+            finally:
+                reading.reset(token)
+                connections.close_all()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    began = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - began
+
+    report = {}
+    for kind in ("read", "write"):
+        report[kind] = {
+            "ops_per_s": round(len(results[kind]) / elapsed, 1),
+            **percentiles(results[kind]),
+            "locked_errors": errors[kind],
+        }
+    json.dump(report, sys.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--tasks", type=int, default=2000, help="Tasks in the seeded dataset.")
+    parser.add_argument("--output", default="db_contention.json")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args)
+        return
+
+    report = {"params": {k: v for k, v in vars(args).items() if k not in ("mode", "database", "output")}}
+    for mode in MODES:
+        with tempfile.TemporaryDirectory() as tmp:
+            child = subprocess.run(
+                [sys.executable, "-m", "benchmarks.db_contention", *sys.argv[1:],
+                 "--mode", mode, "--database", os.path.join(tmp, "contention.sqlite3")],
+                capture_output=True, text=True, check=True,
+            )
+        report[mode] = json.loads(child.stdout)
+        for kind in ("read", "write"):
+            r = report[mode][kind]
+            print(f"{mode:<7} {kind:<6} {r['ops_per_s']:>8.1f} ops/s   p50 {r['p50_ms'] or 0:>8.2f} ms"
+                  f"   p95 {r['p95_ms'] or 0:>8.2f} ms   locked {r['locked_errors']}")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
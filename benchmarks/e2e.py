@@ -0,0 +1,315 @@
+"""
+End-to-end latency of the main views and of WebSocket fan-out.
+
+    python -m benchmarks.e2e [--requests 200] [--concurrency 4] [--clients 1 10 50]
+                             [--output e2e.json] [--baseline old.json] [--threshold 0.2]
+
+Drives the real ASGI application from task_management_system/asgi.py
+in-process, against a throwaway database filled by ``seed_boards``. HTTP
+requests carry a logged-in session and CSRF token, so they take the same path
+through the middleware as a browser's. The views timed are board_detail,
+task_detail, move_task, edit_task (GET and POST) and add_task. For each we
+report p50/p95/p99 latency and throughput.
+
+Fan-out is timed from sending a move_task POST until each of N connected
+BoardConsumer clients has received the task_moved event. That includes the
+consumer's batching window (BOARD_BATCH_WINDOW_MS).
+
+Results go to --output as JSON. Given a --baseline from an earlier run, the
+script exits with status 1 if any latency grew, or any throughput fell, by
+more than --threshold (0.2 = 20%).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode, urlsplit
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "task_management_system.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from asgiref.testing import ApplicationCommunicator  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+
+HOST = "localhost"
+
+
+class Client:
+    """Minimal in-process HTTP/WebSocket client for an ASGI app, logged in as one user."""
+
+    def __init__(self, app, user):
+        from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+        from django.contrib.sessions.backends.db import SessionStore
+        from django.utils.crypto import get_random_string
+
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        self.app = app
+        self.csrf = get_random_string(32)
+        self.cookie = f"{settings.SESSION_COOKIE_NAME}={session.session_key}; {settings.CSRF_COOKIE_NAME}={self.csrf}"
+
+    def headers(self, extra=()):
+        return [(b"host", HOST.encode()), (b"cookie", self.cookie.encode()), *extra]
+
+    async def request(self, method, path, data=None):
+        """Returns (status, body)."""
+        url = urlsplit(path)
+        body, extra = b"", []
+        if data is not None:
+            body = urlencode(data, doseq=True).encode()
+            extra = [
+                (b"content-type", b"application/x-www-form-urlencoded"),
+                (b"content-length", str(len(body)).encode()),
+                (b"x-csrftoken", self.csrf.encode()),
+            ]
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": method, "scheme": "http", "path": url.path, "raw_path": url.path.encode(),
+            "query_string": url.query.encode(), "root_path": "",
+            "headers": self.headers(extra), "client": ("127.0.0.1", 50000), "server": (HOST, 80),
+        }
+        app = ApplicationCommunicator(self.app, scope)
+        await app.send_input({"type": "http.request", "body": body, "more_body": False})
+        start = await app.receive_output(30)
+        chunks = []
+        while True:
+            message = await app.receive_output(30)
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        await app.wait()
+        return start["status"], b"".join(chunks)
+
+    async def websocket(self, path):
+        scope = {
+            "type": "websocket", "asgi": {"version": "3.0"}, "path": path, "raw_path": path.encode(),
+            "query_string": b"", "root_path": "", "headers": self.headers(), "subprotocols": [],
+            "client": ("127.0.0.1", 50000), "server": (HOST, 80),
+        }
+        socket = ApplicationCommunicator(self.app, scope)
+        await socket.send_input({"type": "websocket.connect"})
+        accepted = await socket.receive_output(10)
+        assert accepted["type"] == "websocket.accept", accepted
+        return socket
+
+
+def percentiles(samples):
+    ordered = sorted(samples)
+
+    def at(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    return {
+        "p50_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(at(95), 3),
+        "p99_ms": round(at(99), 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+async def measure(requests, concurrency, make_call):
+    """Run ``requests`` calls, ``concurrency`` at a time. make_call(i) returns a coroutine."""
+    samples, failures, counter = [], [], iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            if failures:
+                return  # let requests in flight finish, start no more
+            began = time.perf_counter()
+            status, _ = await make_call(i)
+            samples.append((time.perf_counter() - began) * 1000)
+            if status >= 400:
+                failures.append(f"request {i} failed with HTTP {status}")
+
+    began = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - began
+    if failures:
+        raise RuntimeError(failures[0])
+    return {**percentiles(samples), "throughput_rps": round(requests / elapsed, 1), "requests": requests}
+
+
+async def bench_views(client, board, task, columns, args):
+    from django.urls import reverse
+
+    results = {}
+    detail, task_url = reverse("board_detail", args=[board.id]), reverse("task_detail", args=[task.id])
+    edit_url, add_url, move_url = (
+        reverse("edit_task", args=[task.id]), reverse("add_task", args=[board.id]), reverse("move_task"),
+    )
+    form = {"title": task.title, "column": task.column_id, "priority": "medium"}
+    cases = {
+        "board_detail": lambda i: client.request("GET", detail),
+        "task_detail": lambda i: client.request("GET", task_url),
+        "move_task": lambda i: client.request("POST", move_url, {
+            "task_id": task.id, "new_column_id": columns[i % len(columns)],
+        }),
+        "edit_task_get": lambda i: client.request("GET", edit_url),
+        "edit_task_post": lambda i: client.request("POST", edit_url, form),
+        "add_task": lambda i: client.request("POST", add_url, {
+            "title": f"Bench task {i}", "column": columns[0], "priority": "low",
+        }),
+    }
+    for name, call in cases.items():
+        # Warm up caches and the view's code path first
+        for i in range(min(5, args.requests)):
+            await call(i)
+        results[name] = await measure(args.requests, args.concurrency, call)
+        print(f"{name:<16} p50 {results[name]['p50_ms']:>8.2f} ms   p95 {results[name]['p95_ms']:>8.2f} ms"
+              f"   {results[name]['throughput_rps']:>8.1f} req/s")
+    return results
+
+
+async def bench_fanout(client, board, task, columns, n_clients, rounds):
+    from django.urls import reverse
+
+    sockets = [await client.websocket(f"/ws/boards/{board.id}/") for _ in range(n_clients)]
+
+    async def delivered(socket, began):
+        # Wait for this round's event; earlier frames (e.g. lock events) are skipped
+        while True:
+            frame = await socket.receive_output(10)
+            events = json.loads(frame["text"])
+            events = events if isinstance(events, list) else [events]
+            if any(e.get("type") == "task_moved" and e.get("task_id") == task.id for e in events):
+                return (time.perf_counter() - began) * 1000
+
+    samples = []
+    for i in range(rounds):
+        began = time.perf_counter()
+        waiting = [asyncio.ensure_future(delivered(socket, began)) for socket in sockets]
+        status, _ = await client.request("POST", reverse("move_task"), {
+            "task_id": task.id, "new_column_id": columns[i % len(columns)],
+        })
+        assert status == 200, status
+        samples += await asyncio.gather(*waiting)
+
+    for socket in sockets:
+        await socket.send_input({"type": "websocket.disconnect", "code": 1000})
+        await socket.wait(5)
+    return {**percentiles(samples), "clients": n_clients, "rounds": rounds}
+
+
+def compare(results, baseline, threshold):
+    """Lines describing regressions beyond ``threshold``, empty if there are none."""
+    regressions = []
+    for group in ("views", "fanout"):
+        for name, current in results.get(group, {}).items():
+            before = baseline.get(group, {}).get(name)
+            if not before:
+                continue
+            for metric, value in current.items():
+                old = before.get(metric)
+                if not old or not isinstance(value, (int, float)) or metric in ("requests", "clients", "rounds"):
+                    continue
+                worse = value < old * (1 - threshold) if metric == "throughput_rps" else value > old * (1 + threshold)
+                if worse:
+                    regressions.append(f"{group}.{name}.{metric}: {old} -> {value}")
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare(args):
+    """Seed the database and pick a board, one of its members and a task."""
+    from django.contrib.auth.models import User
+
+    from boards.models import Board, Column
+
+    call_command(
+        "seed_boards", users=50, teams=5, boards=20, tasks=args.tasks, team_size=20, board_size=8,
+        notifications=10, seed=0, prefix="bench", verbosity=0, stdout=open(os.devnull, "w"),
+    )
+    board = Board.objects.order_by("id").first()
+    user = User.objects.get(id=board.members.values_list("id", flat=True).first())
+    columns = list(Column.objects.filter(board=board).values_list("id", flat=True))
+    task = board.tasks.order_by("id").first()
+    print(f"Board {board.id}: {board.tasks.count()} tasks, {len(columns)} columns\n")
+    return board, user, columns, task
+
+
+async def run(args, client, board, task, columns):
+    results = {"views": await bench_views(client, board, task, columns, args), "fanout": {}}
+    print()
+    for n in args.clients:
+        result = await bench_fanout(client, board, task, columns, n, args.rounds)
+        results["fanout"][f"{n}_clients"] = result
+        print(f"fan-out to {n:>4} clients  p50 {result['p50_ms']:>8.2f} ms   p95 {result['p95_ms']:>8.2f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200, help="Requests per view.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--tasks", type=int, default=2000, help="Tasks in the seeded dataset.")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--rounds", type=int, default=30, help="Moves per fan-out measurement.")
+    parser.add_argument("--output", default="e2e.json")
+    parser.add_argument("--baseline", help="Earlier --output to compare against.")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for conn in connections.all():
+            conn.settings_dict["NAME"] = os.path.join(tmp, "bench.sqlite3")
+        settings.CHANNEL_LAYERS["default"]["CONFIG"] = {"path": os.path.join(tmp, "channels.sqlite3")}
+        settings.MEDIA_ROOT = os.path.join(tmp, "media")
+        # Production-like: no query logging, no debug pages
+        settings.DEBUG = False
+        settings.ALLOWED_HOSTS = [HOST]
+        call_command("migrate", verbosity=0)
+
+        from task_management_system.asgi import application
+
+        board, user, columns, task = prepare(args)
+        client = Client(application, user)
+        results = asyncio.run(run(args, client, board, task, columns))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "channel_layer": settings.CHANNEL_LAYERS["default"]["BACKEND"],
+        "params": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        **results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nRegressions beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+NDJSON board export and import throughput.
+
+    python -m benchmarks.ndjson [--tasks 50000] [--batch-size 1000]
+
+Seeds one board with --tasks tasks (and seed_boards' usual subtasks,
+comments and attachments) in a throwaway SQLite database, exports it to a
+file and imports that file back as a new board. Each step runs twice: once
+timed, once under tracemalloc for its peak Python memory, which should stay
+flat as --tasks grows.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "task_management_system.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+
+
+def measure(func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=50_000)
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per bulk insert on import.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for conn in connections.all():
+            conn.settings_dict["NAME"] = os.path.join(tmp, "bench.sqlite3")
+        # DEBUG would keep every query's SQL in memory
+        settings.DEBUG = False
+        call_command("migrate", verbosity=0)
+        call_command(
+            "seed_boards", users=20, teams=1, boards=1, tasks=args.tasks, team_size=20, board_size=20,
+            notifications=0, seed=0, prefix="ndjson", skip_search_index=True, verbosity=0,
+            stdout=open(os.devnull, "w"),
+        )
+
+        from boards.models import Board
+        from boards.ndjson import export_board, import_board
+
+        board = Board.objects.get()
+        path = os.path.join(tmp, "board.ndjson")
+
+        def export():
+            with open(path, "w", encoding="utf-8") as out:
+                out.writelines(export_board(board))
+            with open(path, encoding="utf-8") as f:
+                return sum(1 for _ in f)
+
+        def load():
+            with open(path, encoding="utf-8") as lines:
+                _, counts = import_board(lines, board.owner, batch_size=args.batch_size)
+            return sum(n for kind, n in counts.items() if kind != "skipped")
+
+        lines, export_s, export_mb = measure(export)
+        size_mb = os.path.getsize(path) / 2**20
+        rows, import_s, import_mb = measure(load)
+
+        print(f"{'step':<8} {'rows':>10} {'seconds':>8} {'rows/s':>10} {'peak MB':>8}")
+        print(f"{'export':<8} {lines:>10,} {export_s:>8.2f} {lines / export_s:>10,.0f} {export_mb:>8.1f}")
+        print(f"{'import':<8} {rows:>10,} {import_s:>8.2f} {rows / import_s:>10,.0f} {import_mb:>8.1f}")
+        print(f"\nExport file: {size_mb:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
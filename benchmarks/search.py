@@ -0,0 +1,117 @@
+"""
+Full-text search against LIKE on a large board dataset.
+
+    python -m benchmarks.search [--tasks 1000000] [--boards 10] [--repeat 20]
+
+Builds a throwaway SQLite database with --tasks tasks spread over --boards
+boards, fills the FTS5 index, then times the board-scoped FTS5 search from
+boards.search against the equivalent ``icontains`` (LIKE) query.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "task_management_system.settings")
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.db.models import Q  # noqa: E402
+
+_rng = random.Random(0)
+WORDS = [
+    "".join(_rng.choice("bcdfghjklmnprstvwz") + _rng.choice("aeiou") for _ in range(3))
+    for _ in range(5000)
+]
+
+
+def populate(tasks, boards, seed=42):
+    from django.contrib.auth.models import User
+
+    from boards.models import Board, Column, Task
+
+    rng = random.Random(seed)
+    owner = User.objects.create_user("bench")
+    board_ids = []
+    for i in range(boards):
+        board = Board.objects.create(name=f"Board {i}", owner=owner)
+        board_ids.append((board.id, Column.objects.filter(board=board).first().id))
+
+    table = Task._meta.db_table
+    sql = (
+        f"INSERT INTO {table} (title, description, board_id, column_id, priority, "
+        f"\"order\", created_at, updated_at, is_locked) "
+        f"VALUES (%s, %s, %s, %s, 'medium', 0, datetime('now'), datetime('now'), 0)"
+    )
+    batch = 20000
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, tasks, batch):
+            rows = []
+            for i in range(start, min(start + batch, tasks)):
+                board_id, column_id = board_ids[i % boards]
+                title = " ".join(rng.choices(WORDS, k=4))
+                description = " ".join(rng.choices(WORDS, k=30))
+                rows.append((title, description, board_id, column_id))
+            cursor.executemany(sql, rows)
+    return Board.objects.get(id=board_ids[0][0])
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), max(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--boards", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connection.settings_dict["NAME"] = os.path.join(tmp, "bench.sqlite3")
+        call_command("migrate", verbosity=0)
+
+        from boards.models import Task
+        from boards.search import rebuild_index, search_board
+
+        start = time.perf_counter()
+        board = populate(args.tasks, args.boards)
+        print(f"Inserted {args.tasks:,} tasks in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        docs = rebuild_index()
+        print(f"Indexed {docs:,} documents in {time.perf_counter() - start:.1f}s\n")
+
+        rng = random.Random(1)
+        queries = [" ".join(rng.choices(WORDS, k=2)) for _ in range(args.repeat)]
+        words = iter(())
+
+        def like():
+            terms = next(words).split()
+            filters = Q()
+            for term in terms:
+                filters &= Q(title__icontains=term) | Q(description__icontains=term)
+            list(Task.objects.filter(board=board).filter(filters).values_list("id", "title")[:50])
+
+        def fts():
+            search_board(board, next(words))
+
+        print(f"{'query':<8} {'median ms':>10} {'max ms':>10}")
+        for name, func in (("LIKE", like), ("FTS5", fts)):
+            words = iter(queries)
+            median, worst = timed(func, args.repeat)
+            print(f"{name:<8} {median:>10.1f} {worst:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
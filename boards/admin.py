@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Team, Board, Column, Task, Comment, Notification, SubTask, Attachment
+from .models import Team, Board, Column, Task, ArchivedTask, Comment, Notification, NotificationCounter, SubTask, Attachment, Blob
 
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
@@ -22,13 +22,22 @@ class TaskAdmin(admin.ModelAdmin):
     list_display = ('title', 'column', 'priority', 'due_date', 'is_locked')
     list_filter = ('priority', 'column__board', 'is_locked')
 
+@admin.register(ArchivedTask)
+class ArchivedTaskAdmin(admin.ModelAdmin):
+    list_display = ('title', 'board', 'done_at', 'archived_at')
+    list_filter = ('board',)
+
 @admin.register(SubTask)
 class SubTaskAdmin(admin.ModelAdmin):
     list_display = ('title', 'task', 'is_completed')
 
 @admin.register(Attachment)
 class AttachmentAdmin(admin.ModelAdmin):
-    list_display = ('file', 'task', 'uploaded_by', 'uploaded_at')
+    list_display = ('__str__', 'task', 'uploaded_by', 'uploaded_at')
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'size', 'ref_count', 'created_at')
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
@@ -36,4 +45,8 @@ class CommentAdmin(admin.ModelAdmin):
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ('user', 'message', 'is_read', 'created_at')
\ No newline at end of file
+    list_display = ('user', 'message', 'is_read', 'created_at')
+
+@admin.register(NotificationCounter)
+class NotificationCounterAdmin(admin.ModelAdmin):
+    list_display = ('user', 'unread')
@@ -0,0 +1,204 @@
+"""
+Flow analytics over the TaskTransition log.
+
+A board's (or a team's) transitions are loaded straight into NumPy arrays
+and every metric is computed with whole-array operations, never a Python
+loop over tasks or transitions:
+
+- cumulative flow: how many tasks sat in each column at the end of each day
+- cycle time: leaving the board's first column to finally reaching its last
+- lead time: creation to finally reaching the last column
+- weekly throughput: tasks finishing per ISO week
+
+A task counts as done when its latest transition is into the board's last
+column, at the time of that transition. A team's boards are combined by
+column title, so every board's "To Do" lands in one lane.
+
+Results are cached under the boards' versions, so a move or bulk change on
+any of them starts a fresh computation. Column changes made in the edit
+form don't bump the version and show up once the entry expires
+(ANALYTICS_CACHE_TIMEOUT).
+"""
+import hashlib
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, router
+from django.utils import timezone
+
+from .models import Board, Column, TaskTransition
+
+TIMEOUT = getattr(settings, "ANALYTICS_CACHE_TIMEOUT", 300)
+DEFAULT_DAYS = 90
+MAX_DAYS = 3650
+PERCENTILES = (50, 85, 95)
+DAY = 86400
+# 1970-01-01 was a Thursday; shifting by 3 days makes weeks start on Monday
+WEEK_OFFSET = 3
+
+
+def board_flow(board, days=DEFAULT_DAYS):
+    return _cached([board.id], {"board": board.id}, days, by_title=False)
+
+
+def team_flow(team, days=DEFAULT_DAYS):
+    board_ids = list(Board.objects.filter(team=team).values_list("id", flat=True))
+    return _cached(board_ids, {"team": team.id}, days, by_title=True)
+
+
+def _cached(board_ids, scope, days, by_title):
+    today = timezone.now().date().isoformat()
+    versions = sorted(Board.objects.filter(id__in=board_ids).values_list("id", "version"))
+    digest = hashlib.sha1(repr((scope, versions, days, today)).encode()).hexdigest()
+    key = f"analytics:{digest}"
+    result = cache.get(key)
+    if result is None:
+        result = {**scope, **compute(board_ids, days, by_title=by_title)}
+        cache.set(key, result, TIMEOUT)
+    return result
+
+
+def load_columns(board_ids, by_title):
+    """
+    Column ids (sorted), each column's lane, which columns start and finish
+    their board, and the lane names. Lanes follow column order.
+    """
+    rows = list(
+        Column.objects.filter(board_id__in=board_ids)
+        .order_by("order", "id").values_list("id", "board_id", "title")
+    )
+    lanes, lane_of, first, last = [], {}, {}, {}
+    for col_id, board_id, title in rows:
+        key = title if by_title else col_id
+        if key not in lane_of:
+            lane_of[key] = len(lanes)
+            lanes.append(title)
+        first.setdefault(board_id, col_id)
+        last[board_id] = col_id
+    ids = np.array([r[0] for r in rows], dtype=np.int64)
+    lane = np.array([lane_of[r[2] if by_title else r[0]] for r in rows], dtype=np.int64)
+    starts = np.isin(ids, list(first.values()))
+    finishes = np.isin(ids, list(last.values()))
+    order = np.argsort(ids)
+    return ids[order], lane[order], starts[order], finishes[order], lanes
+
+
+def load_transitions(board_ids):
+    """(task_id, to_column_id, unix seconds) arrays, sorted by task and then time."""
+    empty = np.empty(0, dtype=np.int64)
+    if not board_ids:
+        return empty, empty, empty
+    table = TaskTransition._meta.db_table
+    placeholders = ", ".join(["%s"] * len(board_ids))
+    conn = connections[router.db_for_read(TaskTransition)]
+    with conn.cursor() as cursor:
+        # A row per transition would mean a million Python tuples. Each column
+        # comes back as one comma-separated string instead, read off the
+        # covering index in order, and NumPy parses it in C.
+        cursor.execute(
+            f"SELECT group_concat(task_id), group_concat(to_column_id), group_concat(created_at) FROM ("
+            f"SELECT task_id, to_column_id, created_at FROM {table} "
+            f"WHERE board_id IN ({placeholders}) ORDER BY task_id, created_at)",
+            list(board_ids),
+        )
+        tasks, columns, times = cursor.fetchone()
+    if tasks is None:
+        return empty, empty, empty
+    task = np.fromstring(tasks, dtype=np.int64, sep=",")
+    column = np.fromstring(columns, dtype=np.int64, sep=",")
+    # Stored as UTC text, "YYYY-MM-DD HH:MM:SS[.ffffff]"
+    at = np.array(times.split(","), dtype="datetime64[s]").astype(np.int64)
+    # group_concat keeps the subquery's order in practice, but SQLite doesn't promise it
+    if not _sorted(task, at):
+        order = np.lexsort((at, task))
+        task, column, at = task[order], column[order], at[order]
+    return task, column, at
+
+
+def compute(board_ids, days=DEFAULT_DAYS, by_title=False, now=None):
+    col_ids, col_lane, col_starts, col_finishes, lanes = load_columns(board_ids, by_title)
+    task, column, at = load_transitions(board_ids)
+    now = int((now or timezone.now()).timestamp())
+    return flow_metrics(task, column, at, col_ids, col_lane, col_starts, col_finishes, lanes, days, now)
+
+
+def flow_metrics(task, column, at, col_ids, col_lane, col_starts, col_finishes, lanes, days, now):
+    """The metrics for one set of transitions, sorted as load_transitions returns them."""
+    # Drop transitions into columns that no longer exist
+    known = np.isin(column, col_ids)
+    task, pos, at = task[known], np.searchsorted(col_ids, column[known]), at[known]
+    lane = col_lane[pos]
+
+    new_task = np.ones(len(task), dtype=bool)
+    new_task[1:] = task[1:] != task[:-1]
+    last_of_task = np.ones(len(task), dtype=bool)
+    last_of_task[:-1] = new_task[1:]
+
+    today = now // DAY
+    first_day = today - days + 1
+    day = at // DAY
+
+    # Cumulative flow: +1 into the new lane, -1 out of the previous one
+    n_lanes = len(lanes)
+    row = np.clip(day - first_day, 0, days - 1)
+    moved = ~new_task
+    flat = np.concatenate([row * n_lanes + lane, row[moved] * n_lanes + lane[np.flatnonzero(moved) - 1]])
+    weights = np.concatenate([np.ones(len(task)), -np.ones(int(moved.sum()))])
+    deltas = np.bincount(flat, weights=weights, minlength=days * n_lanes).reshape(days, n_lanes)
+    cfd = np.cumsum(deltas, axis=0).astype(np.int64)
+
+    # Completions: the task's latest transition is into a finishing column
+    done = last_of_task & col_finishes[pos]
+    done_task, done_at = task[done], at[done]
+    recent = (done_at >= first_day * DAY) & (done_at < (today + 1) * DAY)
+    done_task, done_at = done_task[recent], done_at[recent]
+
+    # Lead time from the first transition; cycle time from the first one out of a
+    # start column (or the finishing one itself, on a board with a single column)
+    lead = done_at - _first_time(task, at, new_task, done_task)
+    cycle = done_at - _first_time(task, at, ~col_starts[pos] | done, done_task)
+
+    # Throughput per Monday-to-Sunday week
+    first_week = (first_day + WEEK_OFFSET) // 7
+    weeks = (today + WEEK_OFFSET) // 7 - first_week + 1
+    per_week = np.bincount((done_at // DAY + WEEK_OFFSET) // 7 - first_week, minlength=weeks)
+
+    return {
+        "days": days,
+        "lanes": lanes,
+        "cumulative_flow": {
+            "dates": _dates(np.arange(first_day, today + 1)),
+            "counts": {name: cfd[:, i].tolist() for i, name in enumerate(lanes)},
+        },
+        "cycle_time_days": _percentiles(cycle),
+        "lead_time_days": _percentiles(lead),
+        "throughput": {
+            "weeks": _dates(np.arange(first_week, first_week + weeks) * 7 - WEEK_OFFSET),
+            "done": per_week.tolist(),
+        },
+    }
+
+
+def _sorted(task, at):
+    return bool(np.all((task[1:] > task[:-1]) | ((task[1:] == task[:-1]) & (at[1:] >= at[:-1]))))
+
+
+def _first_time(task, at, mask, wanted):
+    """When each ``wanted`` task first had a row under ``mask``; every one must have one."""
+    idx = np.flatnonzero(mask)
+    keep = np.ones(len(idx), dtype=bool)
+    keep[1:] = task[idx[1:]] != task[idx[:-1]]
+    idx = idx[keep]
+    return at[idx[np.searchsorted(task[idx], wanted)]]
+
+
+def _percentiles(seconds):
+    if not len(seconds):
+        return {"count": 0, **{f"p{p}": None for p in PERCENTILES}}
+    values = np.percentile(seconds / DAY, PERCENTILES)
+    return {"count": int(len(seconds)), **{f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, values)}}
+
+
+def _dates(day_numbers):
+    return (np.datetime64("1970-01-01") + day_numbers.astype("timedelta64[D]")).astype(str).tolist()
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class BoardsConfig(AppConfig):
     name = "boards"
+
+    def ready(self):
+        # Signal receivers that keep the search index, sidebar cache,
+        # attachment blobs (including archived ones) and previews in sync
+        from . import archive, previews, search, sidebar, uploads  # noqa: F401
@@ -0,0 +1,217 @@
+"""
+Hot/cold archiving of finished tasks.
+
+A task that has sat in its board's last column, untouched, for longer than
+ARCHIVE_AFTER_DAYS moves to ArchivedTask: one row holding the task and, in
+its ``data``, the task's assignees, subtasks, comments, attachments and
+column history. The live tables, and with them every board page, snapshot
+and search, then only carry work that is still moving.
+
+``archive_tasks`` works in batches of ARCHIVE_BATCH_SIZE, each its own short
+transaction, so the database's single writer is never held for long. Open
+boards drop the cards through the usual ``tasks_bulk`` delete event.
+
+An archived task keeps its own reference on each attachment's blob, so the
+file stays on disk until the archived row itself is deleted. ``restore``
+puts everything back under the original ids, so links to the task and its
+attachments work again, and open boards get the card back through a
+``task_created`` event. Notifications about the task are not kept.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connections, router, transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import events
+from .models import ArchivedTask, Attachment, Column, Comment, SubTask, Task, TaskTransition
+from .ordering import next_order
+from .search import reindex_tasks
+from .snapshot import task_card
+from .uploads import release_blob_refs, take_blob_refs
+
+AFTER_DAYS = getattr(settings, "ARCHIVE_AFTER_DAYS", 30)
+BATCH_SIZE = getattr(settings, "ARCHIVE_BATCH_SIZE", 500)
+
+TASK_FIELDS = ("id", "board_id", "column_id", "title", "description", "priority", "due_date", "created_by_id", "created_at", "updated_at")
+
+
+class RestoreError(Exception):
+    pass
+
+
+def archivable(days=AFTER_DAYS, board_ids=None, now=None):
+    """
+    Tasks in their board's last column that nobody has edited or moved for
+    ``days``. Tasks under an editing lease are left alone.
+    """
+    cutoff = (now or timezone.now()) - timedelta(days=days)
+    moved = TaskTransition.objects.filter(board_id=OuterRef("board_id"), task_id=OuterRef("pk"), created_at__gte=cutoff)
+    tasks = (
+        Task.objects.filter(column__in=Column.last_per_board().values("id"), updated_at__lt=cutoff, is_locked=False)
+        .exclude(Exists(moved))
+    )
+    if board_ids is not None:
+        tasks = tasks.filter(board_id__in=board_ids)
+    return tasks
+
+
+def archive_tasks(days=AFTER_DAYS, board_ids=None, batch_size=BATCH_SIZE, now=None):
+    """Archive everything ``archivable`` finds, ``batch_size`` tasks per transaction. Returns the count."""
+    now = now or timezone.now()
+    archived = 0
+    while True:
+        with transaction.atomic():
+            ids = list(archivable(days, board_ids, now).order_by("id").values_list("id", flat=True)[:batch_size])
+            if not ids:
+                break
+            archive_batch(ids, now)
+        archived += len(ids)
+    return archived
+
+
+def archive_batch(task_ids, now=None):
+    """Move ``task_ids`` and everything hanging off them into the archive. Call inside a transaction."""
+    tasks = list(Task.objects.filter(id__in=task_ids).order_by("id").values(*TASK_FIELDS))
+    ids = [t["id"] for t in tasks]
+    assignees = _by_task(Task.assigned_to.through.objects.filter(task_id__in=ids), "user_id")
+    subtasks = _by_task(SubTask.objects.filter(task_id__in=ids), "id", "title", "is_completed", "created_at")
+    comments = _by_task(Comment.objects.filter(task_id__in=ids), "id", "author_id", "content", "created_at")
+    attachments = _by_task(
+        Attachment.objects.filter(task_id__in=ids), "id", "file", "blob_id", "name", "uploaded_by_id", "uploaded_at",
+    )
+    moves = _by_task(TaskTransition.objects.filter(task_id__in=ids), "from_column_id", "to_column_id", "created_at")
+
+    rows, by_board = [], {}
+    for t in tasks:
+        history = moves.get(t["id"], [])
+        arrivals = [m["created_at"] for m in history if m["to_column_id"] == t["column_id"]]
+        rows.append(ArchivedTask(
+            task_id=t["id"], board_id=t["board_id"], column_id=t["column_id"], title=t["title"],
+            description=t["description"], priority=t["priority"], due_date=t["due_date"],
+            created_by_id=t["created_by_id"], created_at=t["created_at"],
+            done_at=max(arrivals, default=t["updated_at"]), archived_at=now or timezone.now(),
+            data={
+                "assignees": [a["user_id"] for a in assignees.get(t["id"], [])],
+                "subtasks": subtasks.get(t["id"], []),
+                "comments": comments.get(t["id"], []),
+                "attachments": attachments.get(t["id"], []),
+                "transitions": history,
+            },
+        ))
+        by_board.setdefault(t["board_id"], []).append(t["id"])
+    ArchivedTask.objects.bulk_create(rows)
+
+    # The archive takes a reference before the task's attachments drop theirs
+    take_blob_refs(a["blob_id"] for items in attachments.values() for a in items)
+    # Per-row delete signals (search index, notification counters, blobs) still run
+    Task.objects.filter(id__in=ids).delete()
+    events.publish([
+        (board_id, {"type": "tasks_bulk", "action": "delete", "task_ids": board_tasks})
+        for board_id, board_tasks in by_board.items()
+    ])
+    return len(rows)
+
+
+def restore(archived):
+    """Put ``archived`` back on its board under its original ids and return the Task."""
+    with transaction.atomic():
+        column = archived.column or Column.last_per_board().filter(board_id=archived.board_id).first()
+        if column is None:
+            raise RestoreError("The board has no columns to restore into.")
+        data = archived.data
+        mentioned = {c["author_id"] for c in data["comments"]} | {a["uploaded_by_id"] for a in data["attachments"]}
+        users = set(User.objects.filter(id__in=mentioned | set(data["assignees"])).values_list("id", flat=True))
+
+        task = Task.objects.create(
+            id=archived.task_id, board_id=archived.board_id, column=column, title=archived.title,
+            description=archived.description, priority=archived.priority, due_date=archived.due_date,
+            created_by_id=archived.created_by_id, order=next_order(column.tasks.all()),
+        )
+        task.assigned_to.add(*[uid for uid in data["assignees"] if uid in users])
+        SubTask.objects.bulk_create([
+            SubTask(id=s["id"], task=task, title=s["title"], is_completed=s["is_completed"])
+            for s in data["subtasks"]
+        ])
+        # Comments go with their author, as they would have if the task had stayed
+        comments = [c for c in data["comments"] if c["author_id"] in users]
+        Comment.objects.bulk_create([
+            Comment(id=c["id"], task=task, author_id=c["author_id"], content=c["content"]) for c in comments
+        ])
+        Attachment.objects.bulk_create([
+            Attachment(
+                id=a["id"], task=task, file=a["file"], blob_id=a["blob_id"], name=a["name"],
+                uploaded_by_id=a["uploaded_by_id"] if a["uploaded_by_id"] in users else None,
+            )
+            for a in data["attachments"]
+        ])
+        take_blob_refs(a["blob_id"] for a in data["attachments"])
+
+        live = set(Column.objects.filter(board_id=archived.board_id).values_list("id", flat=True))
+        TaskTransition.objects.bulk_create([
+            TaskTransition(
+                task=task, board_id=archived.board_id, to_column_id=m["to_column_id"],
+                from_column_id=m["from_column_id"] if m["from_column_id"] in live else None,
+                created_at=_when(m["created_at"]),
+            )
+            for m in data["transitions"] if m["to_column_id"] in live
+        ])
+        if column.id != archived.column_id:
+            TaskTransition.record(archived.board_id, [(task.id, None, column.id)])
+
+        restore_times(Task, "created_at", {task.id: archived.created_at})
+        restore_times(SubTask, "created_at", {s["id"]: s["created_at"] for s in data["subtasks"]})
+        restore_times(Comment, "created_at", {c["id"]: c["created_at"] for c in comments})
+        restore_times(Attachment, "uploaded_at", {a["id"]: a["uploaded_at"] for a in data["attachments"]})
+        Task.recount_subtasks([task.id])
+        reindex_tasks([task.id])
+        task.refresh_from_db()
+        # Drops the archive's blob references, taken over by the attachments above
+        archived.delete()
+        events.publish([(archived.board_id, {"type": "task_created", "task": task_card(task.id)})])
+    return task
+
+
+def restore_times(model, field, times):
+    """
+    Write ``{id: datetime or ISO string}`` into ``field`` with one
+    executemany; bulk_create stamps auto_now(_add) fields with the current time.
+    """
+    if not times:
+        return
+    conn = connections[router.db_for_write(model)]
+    table, column = conn.ops.quote_name(model._meta.db_table), conn.ops.quote_name(model._meta.get_field(field).column)
+    adapt = conn.ops.adapt_datetimefield_value
+    with conn.cursor() as cursor:
+        cursor.executemany(
+            f"UPDATE {table} SET {column} = %s WHERE id = %s",
+            [(adapt(_when(at)), pk) for pk, at in times.items()],
+        )
+
+
+@receiver(post_delete, sender=ArchivedTask)
+def release_archived_blobs(sender, instance, **kwargs):
+    counts = Counter(a["blob_id"] for a in instance.data.get("attachments", []) if a["blob_id"])
+    for blob_id, count in counts.items():
+        release_blob_refs(blob_id, count)
+
+
+def _by_task(queryset, *fields):
+    """``{task_id: [row, ...]}`` for ``queryset``, each row a JSON-ready dict of ``fields``."""
+    rows = {}
+    for row in queryset.order_by("id").values("task_id", *fields):
+        task_id = row.pop("task_id")
+        # Full ISO strings: JSON encoders cut datetimes to milliseconds
+        rows.setdefault(task_id, []).append({k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()})
+    return rows
+
+
+def _when(value):
+    # ``data`` holds ISO strings once it has been through the database
+    return parse_datetime(value) if isinstance(value, str) else value
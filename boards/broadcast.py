@@ -0,0 +1,75 @@
+"""
+Batching for board broadcasts.
+
+BoardConsumer buffers the board_update events it receives for a short window,
+merges repeats for the same card (two task_moved for one task become the
+later one) and sends the client a single JSON array per flush.
+"""
+import threading
+
+
+def coalesce_key(event):
+    """Events with the same key replace each other inside one batch."""
+    kind = event.get("type")
+    for field in ("task_id", "column_id"):
+        if field in event:
+            return (kind, field, str(event[field]))
+    if kind == "columns_reordered":
+        return (kind,)
+    # Anything else is never merged
+    return (kind, id(event))
+
+
+class EventBatch:
+    def __init__(self):
+        self.events = {}
+        self.received = 0
+
+    def add(self, event):
+        key = coalesce_key(event)
+        # Re-insert so the batch keeps the order of the latest occurrences
+        self.events.pop(key, None)
+        self.events[key] = event
+        self.received += 1
+
+    def drain(self):
+        events, received = list(self.events.values()), self.received
+        self.events, self.received = {}, 0
+        return events, received
+
+    def __bool__(self):
+        return bool(self.events)
+
+
+class BatchStats:
+    """Process-wide counters for how much batching saves."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.events_received = 0
+            self.events_sent = 0
+            self.frames_sent = 0
+
+    def record(self, received, sent):
+        with self._lock:
+            self.events_received += received
+            self.events_sent += sent
+            self.frames_sent += 1
+
+    def as_dict(self):
+        with self._lock:
+            frames = self.frames_sent or 1
+            return {
+                "events_received": self.events_received,
+                "events_sent": self.events_sent,
+                "events_merged": self.events_received - self.events_sent,
+                "frames_sent": self.frames_sent,
+                "events_per_frame": round(self.events_received / frames, 3),
+            }
+
+
+batch_stats = BatchStats()
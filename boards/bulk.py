@@ -0,0 +1,146 @@
+"""
+Bulk task operations.
+
+``apply`` runs one action over a list of tasks, which may span boards, in a
+single transaction. Membership is checked once per board. The change is one
+set-based statement (a CASE UPDATE for moves, a bulk insert or delete for
+assignees). Each affected board gets one ``tasks_bulk`` event in its log
+(boards.events), broadcast once the transaction commits, in place of an
+event per card.
+"""
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from . import events
+from .models import Board, Column, Task, TaskTransition
+from .ordering import ORDER_GAP, write_order
+
+# Keeps each statement's parameter list small for SQLite
+MAX_TASKS = 500
+
+
+class BulkError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def apply(user, task_ids, action, value=None):
+    """
+    Apply ``action`` to the tasks in ``task_ids`` on behalf of ``user``.
+    ``value`` is the column id for move, the priority, the user id for
+    assign/unassign, or an ISO date (empty clears it) for due_date.
+    Returns a summary dict for the response.
+    """
+    handler = ACTIONS.get(action)
+    if handler is None:
+        raise BulkError(f"Unknown action. Use one of: {', '.join(ACTIONS)}.")
+    try:
+        ids = list(dict.fromkeys(int(pk) for pk in task_ids))
+    except (TypeError, ValueError):
+        raise BulkError("Task ids must be integers.")
+    if not ids:
+        raise BulkError("No tasks given.")
+    if len(ids) > MAX_TASKS:
+        raise BulkError(f"At most {MAX_TASKS} tasks per request.")
+
+    with transaction.atomic():
+        # Board order, so a move keeps the cards' relative positions
+        rows = list(Task.objects.filter(id__in=ids).order_by("order", "id").values_list("id", "board_id"))
+        if len(rows) != len(ids):
+            raise BulkError("Unknown task ids.", status=404)
+        by_board = {}
+        for task_id, board_id in rows:
+            by_board.setdefault(board_id, []).append(task_id)
+        if Board.objects.filter(id__in=by_board, members=user).count() != len(by_board):
+            raise BulkError("You are not a member of every board these tasks are on.", status=403)
+
+        changes = handler(Task.objects.filter(id__in=ids), by_board, value)
+        events.publish([
+            (board_id, {"type": "tasks_bulk", "action": action, "task_ids": task_ids, **changes.get(board_id, {})})
+            for board_id, task_ids in by_board.items()
+        ])
+    return {"action": action, "updated": len(ids)}
+
+
+# --- Actions: each returns {board_id: extra event fields} ---
+
+def _move(tasks, by_board, value):
+    column = Column.objects.filter(id=_int(value, "column")).first()
+    if column is None or set(by_board) != {column.board_id}:
+        raise BulkError("Tasks can only be moved to a column on their own board.")
+    ids = by_board[column.board_id]
+    # Land at the bottom of the column, in their current order
+    base = Task.objects.filter(column=column).exclude(id__in=ids).aggregate(m=Max("order"))["m"] or 0
+    arriving = list(tasks.exclude(column=column).values_list("id", "column_id"))
+    write_order(tasks, ids, base=base, column=column, updated_at=timezone.now())
+    TaskTransition.record(column.board_id, [(task_id, old, column.id) for task_id, old in arriving])
+    orders = [base + (i + 1) * ORDER_GAP for i in range(len(ids))]
+    return {column.board_id: {"new_column_id": column.id, "orders": orders}}
+
+
+def _priority(tasks, by_board, value):
+    if value not in dict(Task.PRIORITY_CHOICES):
+        raise BulkError("Unknown priority.")
+    tasks.update(priority=value, updated_at=timezone.now())
+    return dict.fromkeys(by_board, {"priority": value})
+
+
+def _due_date(tasks, by_board, value):
+    due = parse_date(value) if value else None
+    if value and due is None:
+        raise BulkError("Due date must be YYYY-MM-DD.")
+    tasks.update(due_date=due, updated_at=timezone.now())
+    return dict.fromkeys(by_board, {"due_date": due.isoformat() if due else None})
+
+
+def _assign(tasks, by_board, value):
+    member = _member_of_all(value, by_board)
+    through = Task.assigned_to.through
+    through.objects.bulk_create(
+        [through(task_id=task_id, user_id=member.id) for ids in by_board.values() for task_id in ids],
+        ignore_conflicts=True,
+    )
+    tasks.update(updated_at=timezone.now())
+    user = {"id": member.id, "username": member.username, "initials": member.initials()}
+    return dict.fromkeys(by_board, {"user": user})
+
+
+def _unassign(tasks, by_board, value):
+    user_id = _int(value, "user")
+    Task.assigned_to.through.objects.filter(task__in=tasks, user_id=user_id).delete()
+    tasks.update(updated_at=timezone.now())
+    return dict.fromkeys(by_board, {"user": {"id": user_id}})
+
+
+def _delete(tasks, by_board, value):
+    # Per-row delete signals (search index, notification counters) still run
+    tasks.delete()
+    return {}
+
+
+def _int(value, name):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise BulkError(f"A {name} id is required.")
+
+
+def _member_of_all(value, by_board):
+    user = User.objects.filter(id=_int(value, "user")).first()
+    if user is None or Board.members.through.objects.filter(board_id__in=by_board, user=user).count() != len(by_board):
+        raise BulkError("Assignees must be members of every board involved.")
+    return user
+
+
+ACTIONS = {
+    "move": _move,
+    "priority": _priority,
+    "assign": _assign,
+    "unassign": _unassign,
+    "due_date": _due_date,
+    "delete": _delete,
+}
@@ -1,47 +1,99 @@
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.conf import settings
+import asyncio
 import json
+import time
+
+from . import telemetry
+from .broadcast import EventBatch, batch_stats
+
+
+def _kind(data):
+    return data.get("type") if isinstance(data, dict) else None
+
+
+class TimedSendMixin:
+    """Reports each outgoing frame to boards.telemetry as ``telemetry_name``."""
+
+    telemetry_name = None
+
+    async def send_frame(self, text, stamps, event_types):
+        began = time.perf_counter()
+        await self.send(text_data=text)
+        telemetry.delivered(
+            self.telemetry_name, self.room_group_name, stamps, event_types,
+            len(text.encode()), began, time.perf_counter(),
+        )
+
+
+class BoardConsumer(TimedSendMixin, AsyncWebsocketConsumer):
+    telemetry_name = "board"
 
-class BoardConsumer(AsyncWebsocketConsumer):
     async def connect(self):
         self.board_id = self.scope["url_route"]["kwargs"]["board_id"]
         self.room_group_name = f"board_{self.board_id}"
+        # Batching mode: buffer events for this many ms, 0 sends each one as it comes
+        self.batch_window = getattr(settings, "BOARD_BATCH_WINDOW_MS", 0) / 1000
+        self.batch = EventBatch()
+        self.stamps = []
+        self.flush_task = None
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         await self.accept()
+        telemetry.connected(self.telemetry_name, self.room_group_name)
 
     async def disconnect(self, close_code):
+        if self.flush_task:
+            self.flush_task.cancel()
+            telemetry.discarded(self.telemetry_name, len(self.stamps))
+        telemetry.disconnected(self.telemetry_name, self.room_group_name)
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
 
-    # receive message from JS client
-    async def receive(self, text_data):
-        data = json.loads(text_data)
-        # broadcast message to everyone in same room
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {"type": "board_update", "data": data}
-        )
+    # Clients only listen: every change goes through a view, which checks
+    # membership and records the event, so frames from the socket are ignored.
+    async def receive(self, text_data=None, bytes_data=None):
+        pass
 
     # message handler for group_send
     async def board_update(self, event):
-        await self.send(text_data=json.dumps(event["data"]))
+        stamp = telemetry.received(self.telemetry_name, event)
+        if not self.batch_window:
+            batch_stats.record(1, 1)
+            await self.send_frame(json.dumps(event["data"]), [stamp], [_kind(event["data"])])
+            return
+        self.batch.add(event["data"])
+        self.stamps.append(stamp)
+        if self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_later())
+
+    async def flush_later(self):
+        await asyncio.sleep(self.batch_window)
+        self.flush_task = None
+        events, received = self.batch.drain()
+        stamps, self.stamps = self.stamps, []
+        if events:
+            batch_stats.record(received, len(events))
+            # One array frame per flush
+            await self.send_frame(json.dumps(events), stamps, [_kind(e) for e in events])
 
 
 # --- Notifications updates for each user ---
-class NotificationConsumer(AsyncWebsocketConsumer):
+class NotificationConsumer(TimedSendMixin, AsyncWebsocketConsumer):
+    telemetry_name = "notification"
+
     async def connect(self):
         self.user_id = self.scope["url_route"]["kwargs"]["user_id"]
         self.room_group_name = f"notif_{self.user_id}"
         await self.channel_layer.group_add(self.room_group_name, self.channel_name)
         await self.accept()
+        telemetry.connected(self.telemetry_name, self.room_group_name)
 
     async def disconnect(self, close_code):
+        telemetry.disconnected(self.telemetry_name, self.room_group_name)
         await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
 
-    async def receive(self, text_data):
-        data = json.loads(text_data)
-        await self.channel_layer.group_send(
-            self.room_group_name,
-            {"type": "notification_update", "data": data}
-        )
+    async def receive(self, text_data=None, bytes_data=None):
+        pass
 
     async def notification_update(self, event):
-        await self.send(text_data=json.dumps(event["data"]))
\ No newline at end of file
+        stamp = telemetry.received(self.telemetry_name, event)
+        await self.send_frame(json.dumps(event["data"]), [stamp], [_kind(event["data"])])
@@ -1,11 +1,15 @@
-from .models import Team, Board
+from django.utils.functional import SimpleLazyObject
+
+from .sidebar import get_sidebar
 
 def sidebar_data(request):
     """Provide teams and boards for sidebar on every page."""
     if request.user.is_authenticated:
-        teams = request.user.teams.all().prefetch_related("boards")
-        boards = Board.objects.filter(members=request.user)
+        # Lazy, so pages that never draw the sidebar never look it up
+        data = SimpleLazyObject(lambda: get_sidebar(request.user.id))
+        teams = SimpleLazyObject(lambda: data["teams"])
+        boards = SimpleLazyObject(lambda: data["boards"])
     else:
         teams = []
         boards = []
-    return {"sidebar_teams": teams, "sidebar_boards": boards}
\ No newline at end of file
+    return {"sidebar_teams": teams, "sidebar_boards": boards}
@@ -0,0 +1,79 @@
+"""
+The "my work" dashboard: open tasks assigned to a user across every board
+they belong to, split into overdue, due this week and later.
+
+It is one query however many assignments the user has. The scan starts from
+the user's rows in the assignment table, read off the (user_id, task_id)
+index from migration 0014. It reaches each task by primary key and checks
+board membership on the members table's unique index. Tasks in their
+board's last column count as finished and are left out. Window functions
+number the tasks within each group and count them, so only the first
+``limit`` of each group come back.
+"""
+from datetime import timedelta
+
+from django.db.models import Case, Count, F, IntegerField, Value, When, Window
+from django.db.models.functions import RowNumber
+from django.utils import timezone
+
+from .models import Column, Task
+
+GROUPS = (
+    ("overdue", "Overdue"),
+    ("this_week", "Due this week"),
+    ("later", "Later"),
+)
+SORTS = ("due", "priority")
+# Tasks shown per group; the rest are counted
+LIMIT = 50
+
+PRIORITY_RANK = Case(
+    When(priority="high", then=Value(0)),
+    When(priority="medium", then=Value(1)),
+    default=Value(2),
+    output_field=IntegerField(),
+)
+
+
+def finished_columns(user):
+    """Ids of the last column (by order, then id) on each of the user's boards."""
+    return Column.last_per_board().filter(board__members=user).values("id")
+
+
+def my_work(user, sort="due", limit=LIMIT, today=None):
+    """
+    ``{group: {"total": n, "tasks": [...]}}`` for every group in GROUPS, with
+    the first ``limit`` tasks of each in ``sort`` order.
+    """
+    today = today or timezone.localdate()
+    week_end = today + timedelta(days=6 - today.weekday())
+    group = Case(
+        When(due_date__lt=today, then=Value(0)),
+        When(due_date__lte=week_end, then=Value(1)),
+        default=Value(2),
+        output_field=IntegerField(),
+    )
+    due = F("due_date").asc(nulls_last=True)
+    ordering = [due, PRIORITY_RANK.asc()] if sort == "due" else [PRIORITY_RANK.asc(), due]
+    rows = (
+        Task.objects.filter(assigned_to=user, board__members=user)
+        .exclude(column__in=finished_columns(user))
+        .annotate(
+            group=group,
+            position=Window(RowNumber(), partition_by=[group], order_by=[*ordering, F("id").asc()]),
+            group_total=Window(Count("id"), partition_by=[group]),
+        )
+        .filter(position__lte=limit)
+        .order_by("group", "position")
+        .values(
+            "id", "title", "priority", "due_date", "board_id", "subtasks_done", "subtasks_total",
+            "group", "group_total", board_name=F("board__name"), column_title=F("column__title"),
+        )
+    )
+    groups = {key: {"label": label, "total": 0, "tasks": []} for key, label in GROUPS}
+    keys = [key for key, _ in GROUPS]
+    for row in rows:
+        entry = groups[keys[row.pop("group")]]
+        entry["total"] = row.pop("group_total")
+        entry["tasks"].append(row)
+    return groups
@@ -0,0 +1,95 @@
+"""
+SQLite backend with WAL and per-process connection pools.
+
+Used as ENGINE "boards.db". Every connection runs in WAL mode with
+synchronous=NORMAL, so readers don't block the writer and the writer doesn't
+block readers. These OPTIONS are added to Django's sqlite3 ones:
+
+``pool_size``
+    Idle connections kept for reuse. Threads never wait for one; when none
+    is idle a new one is opened.
+``read_only``
+    Sets ``PRAGMA query_only``, so a stray write fails loudly.
+
+Writers are not queued in the process. SQLite's write lock is held only
+for one transaction or autocommit statement, not for as long as a request
+keeps its connection. With ``"transaction_mode": "IMMEDIATE"`` a transaction
+takes that lock at BEGIN, and ``timeout``, SQLite's busy timeout, is how
+long a writer waits for it.
+In-memory databases (the test database) are never pooled.
+"""
+import threading
+
+from django.db.backends.sqlite3 import base
+from django.utils.asyncio import async_unsafe
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class ConnectionPool:
+    def __init__(self, size):
+        self.size = size
+        self.idle = []
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """An idle connection, or None if the caller should open one."""
+        with self._lock:
+            return self.idle.pop() if self.idle else None
+
+    def release(self, conn):
+        """Take ``conn`` back, or close it if the pool is full."""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if len(self.idle) < self.size:
+                self.idle.append(conn)
+                return
+        conn.close()
+
+    def close_all(self):
+        with self._lock:
+            idle, self.idle = self.idle, []
+        for conn in idle:
+            conn.close()
+
+
+def get_pool(alias, name, size):
+    key = (alias, str(name))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(size)
+        return _pools[key]
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    pool = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        # Options for this backend, not for sqlite3.connect()
+        size = params.pop("pool_size", 0)
+        self.read_only = params.pop("read_only", False)
+        if size and not self.is_in_memory_db():
+            self.pool = get_pool(self.alias, self.settings_dict["NAME"], size)
+        return params
+
+    @async_unsafe
+    def get_new_connection(self, conn_params):
+        conn = self.pool.acquire() if self.pool is not None else None
+        return conn if conn is not None else self._open(conn_params)
+
+    def _open(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        if self.read_only:
+            conn.execute("PRAGMA query_only = ON")
+        return conn
+
+    def _close(self):
+        if self.pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            self.pool.release(self.connection)
@@ -0,0 +1,61 @@
+"""
+Send reads made while serving GET and HEAD requests to the "reader" alias.
+
+ReadRoutingMiddleware marks those requests. Everything else goes to
+"default", which can write:
+- all writes
+- reads in other requests, so a POST reads its own writes
+- reads inside a transaction on "default"
+"""
+import contextvars
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+READER = "reader"
+
+reading = contextvars.ContextVar("boards_read_only_request", default=False)
+
+
+class ReadWriteRouter:
+    def db_for_read(self, model, **hints):
+        if reading.get() and READER in settings.DATABASES and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return READER
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReadRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = reading.set(request.method in ("GET", "HEAD"))
+        try:
+            return self.get_response(request)
+        finally:
+            reading.reset(token)
+
+    async def __acall__(self, request):
+        token = reading.set(request.method in ("GET", "HEAD"))
+        try:
+            return await self.get_response(request)
+        finally:
+            reading.reset(token)
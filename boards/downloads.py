@@ -0,0 +1,115 @@
+"""
+Streaming file responses with HTTP Range support.
+
+Files go out through FileResponse, so they are read ``BLOCK_SIZE`` bytes at
+a time and never held whole in memory. Under a WSGI server that provides
+``wsgi.file_wrapper`` (gunicorn, for one), the server sends the file with
+``sendfile()`` straight from the descriptor. For a range, the descriptor is
+seeked to the start and Content-Length caps how much goes out.
+
+Conditional requests are handled too. If-None-Match and If-Modified-Since
+get a 304, and If-Range falls back to the whole file when the copy the
+client has is out of date.
+"""
+import os
+import re
+
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFile:
+    """Read-only view of ``length`` bytes of ``file`` from where it's positioned."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b""
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        # Lets the WSGI server sendfile() from the current offset
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single ``bytes=`` range, None to send the
+    whole file, or "unsatisfiable". Multi-range requests get the whole file,
+    which the spec allows.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if not match or not any(match.groups()) or size == 0:
+        return None
+    first, last = match.groups()
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return "unsatisfiable"
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, end
+
+
+def stream_file(request, path, filename, etag=None):
+    """
+    A 200, 206, 304 or 416 response for the file at ``path``. Without an
+    ``etag`` (a content hash, ideally) one is made from size and mtime.
+    """
+    stat = os.stat(path)
+    size, last_modified = stat.st_size, int(stat.st_mtime)
+    etag = quote_etag(etag or f"{size:x}-{stat.st_mtime_ns:x}")
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    byte_range = parse_range(request.headers.get("Range"), size)
+    if byte_range and not _if_range_matches(request.headers.get("If-Range"), etag, last_modified):
+        byte_range = None
+    if byte_range == "unsatisfiable":
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    file = open(path, "rb")
+    if byte_range:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(RangeFile(file, end - start + 1), filename=filename, status=206)
+        response["Content-Length"] = end - start + 1
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    else:
+        response = FileResponse(file, filename=filename)
+    response.block_size = BLOCK_SIZE
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def _if_range_matches(if_range, etag, last_modified):
+    if not if_range:
+        return True
+    if if_range.startswith(('"', "W/")):
+        # If-Range needs a strong match
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
@@ -0,0 +1,95 @@
+"""
+Versioned board event log.
+
+Each board has a ``version`` that goes up by one for every change to its
+tasks or columns. The change is kept as a BoardEvent row, and the
+board_update event that announces it carries the same ``version``. A client
+whose socket dropped asks ``events.json?since=N`` for just the events it
+missed. ``compact_board_events`` trims old rows (BOARD_EVENT_RETENTION per
+board). A client further behind than the oldest row kept gets a full
+snapshot instead.
+
+Every event here is safe to apply twice, so a client may replay events it
+has already seen.
+"""
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Min
+
+from .layers import group_send_many
+from .models import Board, BoardEvent
+
+RETENTION = getattr(settings, "BOARD_EVENT_RETENTION", 1000)
+
+
+def record(events):
+    """
+    Append ``events``, a list of (board_id, data) pairs, to their boards'
+    logs. Each data dict gets its ``version`` set in place. Call this inside
+    the transaction that makes the change.
+    """
+    by_board = {}
+    for board_id, data in events:
+        by_board.setdefault(board_id, []).append(data)
+    rows = []
+    with transaction.atomic():
+        for board_id, items in by_board.items():
+            # The UPDATE takes the write lock, so versions can't interleave
+            Board.objects.filter(id=board_id).update(version=F("version") + len(items))
+            last = Board.objects.filter(id=board_id).values_list("version", flat=True).get()
+            for version, data in enumerate(items, start=last - len(items) + 1):
+                data["version"] = version
+                rows.append(BoardEvent(board_id=board_id, version=version, data=data))
+        BoardEvent.objects.bulk_create(rows)
+
+
+def _messages(events):
+    return [(f"board_{board_id}", {"type": "board_update", "data": data}) for board_id, data in events]
+
+
+def publish(events):
+    """Record ``events`` and send them to their boards once the transaction commits."""
+    if not events:
+        return
+    record(events)
+    messages = _messages(events)
+    transaction.on_commit(lambda: async_to_sync(group_send_many)(get_channel_layer(), messages))
+
+
+async def asend(events):
+    """
+    Send events that record() has already logged, for async views. Call it
+    once the transaction that recorded them has committed.
+    """
+    if not events:
+        return
+    await group_send_many(get_channel_layer(), _messages(events))
+
+
+def since(board_id, version):
+    """
+    ``(current_version, events after version)``. The event list is None if
+    those events have been compacted away, or if ``version`` is from the
+    future (e.g. after a restore). Either way the caller needs a full snapshot.
+    """
+    # Read the version first: anything after it is replayed on top of what follows
+    current = Board.objects.filter(id=board_id).values_list("version", flat=True).get()
+    if version == current:
+        return current, []
+    oldest = BoardEvent.objects.filter(board_id=board_id).aggregate(v=Min("version"))["v"]
+    if version > current or oldest is None or version < oldest - 1:
+        return current, None
+    events = [
+        {**data, "version": v}
+        for v, data in BoardEvent.objects.filter(board_id=board_id, version__gt=version)
+        .order_by("version").values_list("version", "data")
+    ]
+    return (events[-1]["version"] if events else current), events
+
+
+def compact(keep=RETENTION):
+    """Drop all but the newest ``keep`` events of every board. Returns how many went."""
+    deleted, _ = BoardEvent.objects.filter(version__lte=F("board__version") - keep).delete()
+    return deleted
@@ -0,0 +1,397 @@
+"""
+SQLite channel layer.
+
+A channel layer that fans messages out across every worker process on one
+host through a shared SQLite database in WAL mode, for deployments that
+can't run Redis. It supports groups, message and group expiry, and
+per-channel capacity like channels.layers.InMemoryChannelLayer.
+
+Each process gets its own inbox. All of a process's specific channels are
+drained by one poller that wakes immediately on local sends and checks
+``PRAGMA data_version`` every ``poll_interval`` seconds for writes from other
+processes, so an idle layer costs one cheap pragma per tick. Messages wait
+in a per-channel queue between receive() calls; a queue nobody receives on
+is dropped once everything in it has expired.
+"""
+import asyncio
+import base64
+import json
+import random
+import sqlite3
+import string
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+from django.conf import settings
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS channel_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    inbox TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    expires REAL NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS channel_messages_inbox ON channel_messages (inbox, id);
+CREATE INDEX IF NOT EXISTS channel_messages_channel ON channel_messages (channel, expires);
+CREATE TABLE IF NOT EXISTS channel_groups (
+    group_name TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    inbox TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (group_name, channel)
+);
+"""
+
+
+def _encode(message):
+    def default(value):
+        if isinstance(value, (bytes, bytearray)):
+            return {"__bytes__": base64.b64encode(value).decode("ascii")}
+        raise TypeError(f"{type(value).__name__} can't be sent over the channel layer")
+    return json.dumps(message, default=default, separators=(",", ":"))
+
+
+def _decode(body):
+    def hook(obj):
+        if len(obj) == 1 and "__bytes__" in obj:
+            return base64.b64decode(obj["__bytes__"])
+        return obj
+    return json.loads(body, object_hook=hook)
+
+
+def _stamp(message):
+    # Consumers measure delivery latency from this (boards.telemetry)
+    return message if "sent_at" in message else {**message, "sent_at": time.time()}
+
+
+async def group_send_many(layer, messages):
+    """
+    Send each (group, message) pair, in one batch when the layer supports it
+    and otherwise concurrently on one event loop.
+    """
+    if hasattr(layer, "group_send_many"):
+        await layer.group_send_many(messages)
+    else:
+        await asyncio.gather(*(layer.group_send(group, message) for group, message in messages))
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    """
+    Channel layer backed by a SQLite file shared between processes.
+    """
+
+    extensions = ["groups", "flush"]
+
+    def __init__(
+        self,
+        path=None,
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        poll_interval=0.005,
+        batch_size=500,
+        **kwargs,
+    ):
+        super().__init__(expiry=expiry, capacity=capacity, **kwargs)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.path = str(path or settings.BASE_DIR / "channels.sqlite3")
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.client_prefix = "".join(random.choice(string.ascii_letters) for _ in range(12))
+
+        # One thread owns the connection, so every query is serialised on it
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-layer")
+        self._conn = None
+        self._data_version = None
+        self._local_writes = 0
+        self._last_cleanup = 0.0
+
+        # Receive side, bound to the event loop that first calls receive()
+        self._loop = None
+        self._queues = {}
+        # Latest expiry queued per channel, and receive() calls waiting on each
+        self._queue_expires = {}
+        self._receivers = {}
+        self._last_sweep = 0.0
+        self._wake = None
+        self._poller = None
+
+    # --- Database access (always on the executor thread) ---
+
+    def _connection(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _transaction(self, func, *args):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def _backlog(self, conn, channels, now):
+        placeholders = ",".join("?" * len(channels))
+        return dict(conn.execute(
+            f"SELECT channel, COUNT(*) FROM channel_messages "
+            f"WHERE channel IN ({placeholders}) AND expires > ? GROUP BY channel",
+            (*channels, now),
+        ).fetchall())
+
+    def _send(self, conn, channel, body):
+        now = time.time()
+        if self._backlog(conn, [channel], now).get(channel, 0) >= self.get_capacity(channel):
+            raise ChannelFull(channel)
+        conn.execute(
+            "INSERT INTO channel_messages (inbox, channel, expires, body) VALUES (?, ?, ?, ?)",
+            (self.non_local_name(channel), channel, now + self.expiry, body),
+        )
+        self._local_writes += 1
+
+    def _group_send(self, conn, group, body):
+        now = time.time()
+        members = conn.execute(
+            "SELECT channel, inbox FROM channel_groups WHERE group_name = ? AND expires > ?",
+            (group, now),
+        ).fetchall()
+        if not members:
+            return 0
+        backlog = self._backlog(conn, [channel for channel, _ in members], now)
+        # Full channels are skipped, same as the in-memory layer
+        rows = [
+            (inbox, channel, now + self.expiry, body)
+            for channel, inbox in members
+            if backlog.get(channel, 0) < self.get_capacity(channel)
+        ]
+        conn.executemany(
+            "INSERT INTO channel_messages (inbox, channel, expires, body) VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        self._local_writes += 1
+        return len(rows)
+
+    def _fetch(self, inboxes, force):
+        # data_version moves on commits from other processes, _local_writes on ours
+        conn = self._connection()
+        version = (conn.execute("PRAGMA data_version").fetchone()[0], self._local_writes)
+        if not force and version == self._data_version:
+            return []
+        self._data_version = version
+        return self._transaction(self._drain, inboxes)
+
+    def _drain(self, conn, inboxes):
+        now = time.time()
+        if now - self._last_cleanup > 1:
+            self._clean_expired(conn, now)
+        placeholders = ",".join("?" * len(inboxes))
+        rows = conn.execute(
+            f"SELECT id, channel, expires, body FROM channel_messages "
+            f"WHERE inbox IN ({placeholders}) AND expires > ? ORDER BY id LIMIT ?",
+            (*inboxes, now, self.batch_size),
+        ).fetchall()
+        if rows:
+            conn.execute(
+                f"DELETE FROM channel_messages WHERE id IN ({','.join('?' * len(rows))})",
+                [row[0] for row in rows],
+            )
+        return rows
+
+    def _clean_expired(self, conn, now):
+        """A channel that let a message expire is dead, so it leaves its groups."""
+        self._last_cleanup = now
+        conn.execute(
+            "DELETE FROM channel_groups WHERE expires <= ? OR channel IN "
+            "(SELECT channel FROM channel_messages WHERE expires <= ?)",
+            (now, now),
+        )
+        conn.execute("DELETE FROM channel_messages WHERE expires <= ?", (now,))
+
+    def _flush(self, conn):
+        conn.execute("DELETE FROM channel_messages")
+        conn.execute("DELETE FROM channel_groups")
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # --- Channel layer API ---
+
+    async def send(self, channel, message):
+        """
+        Send a message onto a (general or specific) channel.
+        """
+        assert isinstance(message, dict), "message is not a dict"
+        self.require_valid_channel_name(channel)
+        assert "__asgi_channel__" not in message
+        await self._run(self._transaction, self._send, channel, _encode(_stamp(message)))
+        self._notify()
+
+    async def receive(self, channel):
+        """
+        Receive the first message that arrives on the channel.
+        """
+        self.require_valid_channel_name(channel)
+        self._ensure_poller()
+        queue = self._queues.setdefault(channel, asyncio.Queue())
+        self._receivers[channel] = self._receivers.get(channel, 0) + 1
+        self._wake.set()
+        try:
+            while True:
+                expires, message = await queue.get()
+                if expires > time.time():
+                    return message
+        finally:
+            self._receivers[channel] -= 1
+            if not self._receivers[channel]:
+                del self._receivers[channel]
+                if queue.empty() and self._queues.get(channel) is queue:
+                    self._forget(channel)
+
+    async def new_channel(self, prefix="specific."):
+        """
+        Returns a new channel name that can be used by something in our
+        process as a specific channel.
+        """
+        return "%s.%s!%s" % (
+            prefix,
+            self.client_prefix,
+            "".join(random.choice(string.ascii_letters) for _ in range(12)),
+        )
+
+    # --- Flush extension ---
+
+    async def flush(self):
+        await self._run(self._transaction, self._flush)
+        self._queues = {}
+        self._queue_expires = {}
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+        await self._run(self._close)
+
+    # --- Groups extension ---
+
+    async def group_add(self, group, channel):
+        """
+        Adds the channel name to a group.
+        """
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._run(
+            self._execute,
+            "INSERT OR REPLACE INTO channel_groups (group_name, channel, inbox, expires) VALUES (?, ?, ?, ?)",
+            (group, channel, self.non_local_name(channel), time.time() + self.group_expiry),
+        )
+
+    async def group_discard(self, group, channel):
+        self.require_valid_channel_name(channel)
+        self.require_valid_group_name(group)
+        await self._run(
+            self._execute,
+            "DELETE FROM channel_groups WHERE group_name = ? AND channel = ?",
+            (group, channel),
+        )
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), "Message is not a dict"
+        self.require_valid_group_name(group)
+        sent = await self._run(self._transaction, self._group_send, group, _encode(_stamp(message)))
+        if sent:
+            self._notify()
+
+    async def group_send_many(self, messages):
+        """
+        group_send to several groups in one transaction, for a list of
+        (group, message) pairs.
+        """
+        payload = []
+        for group, message in messages:
+            assert isinstance(message, dict), "Message is not a dict"
+            self.require_valid_group_name(group)
+            payload.append((group, _encode(_stamp(message))))
+        sent = await self._run(self._transaction, self._group_send_many, payload)
+        if sent:
+            self._notify()
+
+    def _group_send_many(self, conn, payload):
+        return sum(self._group_send(conn, group, body) for group, body in payload)
+
+    def _execute(self, sql, params):
+        self._connection().execute(sql, params)
+
+    # --- Receive loop ---
+
+    def _ensure_poller(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._poller is None or self._poller.done():
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._poller = loop.create_task(self._poll())
+
+    def _notify(self):
+        """Wake our own poller after a local write, which data_version can't see."""
+        loop, wake = self._loop, self._wake
+        if loop is not None and wake is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(wake.set)
+
+    def _forget(self, channel):
+        self._queues.pop(channel, None)
+        self._queue_expires.pop(channel, None)
+
+    def _sweep(self, now):
+        """
+        Drop queues nobody is receiving on once everything in them has
+        expired, such as those of consumers that have disconnected.
+        Messages for a channel between two receive() calls are kept.
+        """
+        self._last_sweep = now
+        for channel in list(self._queues):
+            if channel not in self._receivers and self._queue_expires.get(channel, 0) <= now:
+                self._forget(channel)
+
+    async def _poll(self):
+        force, seen = True, set()
+        while True:
+            inboxes = {self.non_local_name(channel) for channel in self._queues}
+            if inboxes:
+                rows = await self._run(self._fetch, list(inboxes), force or inboxes != seen)
+                seen = inboxes
+                now = time.time()
+                for _, channel, expires, body in rows:
+                    if expires <= now:
+                        continue
+                    self._queues.setdefault(channel, asyncio.Queue()).put_nowait(
+                        (expires, _decode(body))
+                    )
+                    self._queue_expires[channel] = max(expires, self._queue_expires.get(channel, 0))
+                if now - self._last_sweep > 1:
+                    self._sweep(now)
+                # A full batch means there may be more waiting
+                force = len(rows) == self.batch_size
+                if force:
+                    continue
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
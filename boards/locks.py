@@ -0,0 +1,140 @@
+"""
+Editing leases for tasks.
+
+Opening a task for editing takes a lease that lasts TASK_LOCK_TTL seconds.
+The edit page renews it with a heartbeat while it stays open; saving the form
+or leaving the page releases it. A lease nobody renews simply runs out, and
+the ``expire_task_locks`` sweeper tells open boards the card is free again.
+
+Every state change is a single conditional UPDATE, so two users racing for
+the same task can't both win. The UPDATE and its board event are logged in
+one transaction; the async versions send the event once that has committed.
+"""
+from dataclasses import dataclass
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import events
+from .models import Task
+
+LOCK_TTL = getattr(settings, "TASK_LOCK_TTL", 120)
+
+
+@dataclass
+class Lease:
+    acquired: bool
+    holder: str | None = None
+    expires_at: object = None
+
+
+def is_held(is_locked, expires_at, now=None):
+    """Whether a lock read from a task row is still live."""
+    return bool(is_locked and expires_at and expires_at > (now or timezone.now()))
+
+
+def _claimable(task, user, now):
+    return Task.objects.filter(id=task.id).filter(
+        Q(is_locked=False) | Q(locked_by=user) | Q(locked_by__isnull=True)
+        | Q(lock_expires_at__isnull=True) | Q(lock_expires_at__lte=now)
+    )
+
+
+def _holder(task):
+    return Task.objects.filter(id=task.id).values_list("locked_by__username", flat=True)
+
+
+def _won(task, user, expires_at):
+    task.is_locked, task.locked_by, task.lock_expires_at = True, user, expires_at
+    return Lease(acquired=True, holder=user.username, expires_at=expires_at)
+
+
+def _locked_event(task, user):
+    return [(task.board_id, {"type": "task_locked", "task_id": task.id, "locked_by": user.username})]
+
+
+def _claim(task, user, log):
+    """
+    Take the lease and ``log`` its event (events.publish or events.record) in
+    one transaction. Returns the Lease and the events logged.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=LOCK_TTL)
+    was_held = task.locked_by_id == user.id and is_held(task.is_locked, task.lock_expires_at, now)
+    with transaction.atomic():
+        won = _claimable(task, user, now).update(is_locked=True, locked_by=user, lock_expires_at=expires_at)
+        if not won:
+            return Lease(acquired=False, holder=_holder(task).first()), []
+        changes = [] if was_held else _locked_event(task, user)
+        log(changes)
+    return _won(task, user, expires_at), changes
+
+
+def acquire(task, user):
+    """Take or renew the lease on ``task`` for ``user``."""
+    return _claim(task, user, events.publish)[0]
+
+
+async def aacquire(task, user):
+    """acquire() for async views: the event goes out after the claim commits."""
+    lease, changes = await sync_to_async(_claim)(task, user, events.record)
+    await events.asend(changes)
+    return lease
+
+
+def renew(task, user):
+    """Heartbeat: push the expiry out again, if ``user`` still holds the lease."""
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=LOCK_TTL)
+    renewed = Task.objects.filter(
+        id=task.id, is_locked=True, locked_by=user, lock_expires_at__gt=now
+    ).update(lock_expires_at=expires_at)
+    if renewed:
+        return Lease(acquired=True, holder=user.username, expires_at=expires_at)
+    return Lease(acquired=False)
+
+
+def _release(task, user, log):
+    with transaction.atomic():
+        released = Task.objects.filter(id=task.id, locked_by=user).update(
+            is_locked=False, locked_by=None, lock_expires_at=None
+        )
+        changes = [(task.board_id, {"type": "task_unlocked", "task_id": task.id})] if released else []
+        log(changes)
+    task.is_locked, task.locked_by, task.lock_expires_at = False, None, None
+    return bool(released), changes
+
+
+def release(task, user):
+    """Give the lease up early. Returns False if ``user`` didn't hold it."""
+    return _release(task, user, events.publish)[0]
+
+
+async def arelease(task, user):
+    """release() for async views."""
+    released, changes = await sync_to_async(_release)(task, user, events.record)
+    await events.asend(changes)
+    return released
+
+
+def expire_stale():
+    """Free every lease that has run out and tell the boards. Returns how many."""
+    now = timezone.now()
+    stale = Task.objects.filter(is_locked=True).filter(
+        Q(lock_expires_at__isnull=True) | Q(lock_expires_at__lte=now)
+    )
+    rows = list(stale.values_list("id", "board_id"))
+    if not rows:
+        return 0
+    ids = [task_id for task_id, _ in rows]
+    with transaction.atomic():
+        # Re-check expiry in the UPDATE so a lease renewed meanwhile survives
+        stale.filter(id__in=ids).update(is_locked=False, locked_by=None, lock_expires_at=None)
+        renewed = set(Task.objects.filter(id__in=ids, is_locked=True).values_list("id", flat=True))
+        expired = [(task_id, board_id) for task_id, board_id in rows if task_id not in renewed]
+        events.publish([(board_id, {"type": "task_unlocked", "task_id": task_id}) for task_id, board_id in expired])
+    return len(expired)
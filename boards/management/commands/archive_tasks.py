@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from boards.archive import AFTER_DAYS, BATCH_SIZE, archive_tasks
+
+
+class Command(BaseCommand):
+    help = "Move tasks that have sat in their board's last column for a while into the archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=AFTER_DAYS,
+            help="Archive tasks untouched for more than this many days.",
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=BATCH_SIZE,
+            help="Tasks moved per transaction.",
+        )
+        parser.add_argument(
+            "--board", type=int, action="append", dest="boards",
+            help="Only tasks on this board (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        archived = archive_tasks(options["days"], options["boards"], options["batch_size"])
+        self.stdout.write(f"Archived {archived} task(s)")
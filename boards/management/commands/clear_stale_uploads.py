@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from boards.uploads import SESSION_TTL, discard_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Delete chunked uploads nobody has resumed, with their partial files."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--max-age", type=int, default=SESSION_TTL,
+            help="Seconds since the last chunk before an upload counts as abandoned.",
+        )
+
+    def handle(self, *args, **options):
+        removed = discard_stale_uploads(options["max_age"])
+        self.stdout.write(f"Removed {removed} stale upload(s)")
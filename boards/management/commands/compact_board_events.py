@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from boards.events import RETENTION, compact
+
+
+class Command(BaseCommand):
+    help = "Trim each board's change log to its newest entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep", type=int, default=RETENTION,
+            help="Events to keep per board.",
+        )
+
+    def handle(self, *args, **options):
+        removed = compact(options["keep"])
+        self.stdout.write(f"Removed {removed} board event(s)")
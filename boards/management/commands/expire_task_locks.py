@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from boards.locks import expire_stale
+
+
+class Command(BaseCommand):
+    help = "Release task editing leases that have run out and tell open boards."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--every", type=float, default=0,
+            help="Keep running and sweep every N seconds instead of once.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            expired = expire_stale()
+            if expired or not options["every"]:
+                self.stdout.write(f"Released {expired} expired task lock(s)")
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
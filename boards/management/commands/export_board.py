@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from boards.models import Board
+from boards.ndjson import EXPORT_CHUNK_SIZE, export_board
+
+
+class Command(BaseCommand):
+    help = "Write a board, with everything on it, as NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("board", type=int, help="Board id.")
+        parser.add_argument("--output", help="File to write (default: stdout).")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="Rows read per query chunk.")
+
+    def handle(self, *args, **options):
+        board = Board.objects.filter(id=options["board"]).first()
+        if board is None:
+            raise CommandError(f"No board with id {options['board']}.")
+        chunks = export_board(board, options["chunk_size"])
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as out:
+                out.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
@@ -0,0 +1,36 @@
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from boards.ndjson import IMPORT_BATCH_SIZE, BoardImportError, import_board
+
+
+class Command(BaseCommand):
+    help = "Create a board from an NDJSON export (see export_board)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Export file, or - for stdin.")
+        parser.add_argument("--owner", required=True, help="Username that will own the new board.")
+        parser.add_argument("--name", help="Board name (default: the exported board's).")
+        parser.add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE, help="Rows per bulk insert.")
+
+    def handle(self, *args, **options):
+        owner = User.objects.filter(username=options["owner"]).first()
+        if owner is None:
+            raise CommandError(f"No user named {options['owner']}.")
+        start = time.perf_counter()
+        try:
+            if options["path"] == "-":
+                board, counts = import_board(sys.stdin, owner, options["name"], options["batch_size"])
+            else:
+                with open(options["path"], encoding="utf-8") as lines:
+                    board, counts = import_board(lines, owner, options["name"], options["batch_size"])
+        except BoardImportError as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - start
+        rows = sum(n for kind, n in counts.items() if kind != "skipped")
+        summary = ", ".join(f"{n} {kind}" for kind, n in counts.items())
+        self.stdout.write(f"Imported board {board.id} '{board.name}': {summary}")
+        self.stdout.write(f"{rows} rows in {elapsed:.2f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
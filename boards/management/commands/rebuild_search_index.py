@@ -0,0 +1,16 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from boards.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index over tasks, subtasks and comments."
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} documents in {time.perf_counter() - start:.2f}s"
+        ))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from boards.models import Task
+
+
+class Command(BaseCommand):
+    help = "Recompute every task's subtask counts, e.g. after a bulk import."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--board", type=int, action="append", dest="boards",
+            help="Only tasks on this board (repeatable).",
+        )
+
+    def handle(self, *args, **options):
+        task_ids = None
+        if options["boards"]:
+            task_ids = Task.objects.filter(board_id__in=options["boards"]).values_list("id", flat=True)
+        updated = Task.recount_subtasks(task_ids)
+        self.stdout.write(f"Recounted subtasks on {updated} task(s)")
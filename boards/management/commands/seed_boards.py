@@ -0,0 +1,236 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from boards.models import (
+    Attachment, Board, Column, Comment, Notification, NotificationCounter, SubTask, Task, TaskTransition, Team,
+)
+from boards.ordering import ORDER_GAP
+from boards.search import rebuild_index
+
+WORDS = (
+    "api auth backlog billing bug cache checkout client dashboard deploy docs export "
+    "feature import invoice login metrics migration mobile onboarding payment report "
+    "review search settings signup spec sprint sync test upload webhook"
+).split()
+VERBS = "add fix update refactor review test document remove migrate design".split()
+COLUMNS = ("To Do", "In Progress", "Done")
+EXTENSIONS = ("pdf", "png", "docx", "xlsx", "txt")
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a synthetic, reproducible dataset for load "
+        "testing: users, teams, boards, tasks and everything hanging off them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=200)
+        parser.add_argument("--teams", type=int, default=20)
+        parser.add_argument("--boards", type=int, default=100)
+        parser.add_argument("--tasks", type=int, default=10_000, help="Spread evenly over the boards.")
+        parser.add_argument("--team-size", type=int, default=20, help="Members per team.")
+        parser.add_argument("--board-size", type=int, default=8, help="Members per board, drawn from its team.")
+        parser.add_argument("--subtasks", type=float, default=2, help="Average per task.")
+        parser.add_argument("--comments", type=float, default=1, help="Average per task.")
+        parser.add_argument("--attachments", type=float, default=0.2, help="Average per task (metadata only).")
+        parser.add_argument("--notifications", type=int, default=20, help="Per user.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--prefix", default="seed", help="Prefix for usernames and team names.")
+        parser.add_argument("--password", default="password", help="Password for every seeded user.")
+        parser.add_argument("--skip-search-index", action="store_true")
+
+    def handle(self, *args, **options):
+        if options["boards"] and not options["teams"]:
+            raise CommandError("Boards are created inside teams; --teams must be at least 1.")
+        if options["users"] < 1:
+            raise CommandError("--users must be at least 1.")
+        if User.objects.filter(username__startswith=options["prefix"]).exists():
+            raise CommandError(f"Users prefixed '{options['prefix']}' already exist; pick another --prefix.")
+
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.counts, self.elapsed = {}, {}
+        started = time.perf_counter()
+
+        user_ids = self.seed_users()
+        team_members = self.seed_teams(user_ids)
+        board_members, board_columns = self.seed_boards(team_members)
+        task_ids = self.seed_tasks(board_members, board_columns)
+        self.seed_notifications(user_ids, task_ids)
+        if not options["skip_search_index"]:
+            began = time.perf_counter()
+            rebuild_index()
+            self.stdout.write(f"Rebuilt the search index in {time.perf_counter() - began:.1f}s")
+
+        total = time.perf_counter() - started
+        rows = sum(self.counts.values())
+        for name, count in self.counts.items():
+            rate = count / self.elapsed[name] if self.elapsed[name] else 0
+            self.stdout.write(f"  {name:<20} {count:>12,} rows  {rate:>12,.0f} rows/s")
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {rows:,} rows in {total:.1f}s ({rows / total:,.0f} rows/s)"
+        ))
+
+    # --- Bookkeeping ---
+
+    def insert(self, model, objs, name=None):
+        """bulk_create in batches, one transaction per batch. Returns the objects with ids."""
+        name = name or model._meta.verbose_name_plural
+        self.counts.setdefault(name, 0)
+        self.elapsed.setdefault(name, 0)
+        created = []
+        for start in range(0, len(objs), self.batch_size):
+            batch = objs[start:start + self.batch_size]
+            began = time.perf_counter()
+            with transaction.atomic():
+                created += model.objects.bulk_create(batch)
+            self.elapsed[name] += time.perf_counter() - began
+            self.counts[name] += len(batch)
+            if self.options["verbosity"] > 1:
+                self.stdout.write(f"{name}: {self.counts[name]:,}")
+        return created
+
+    def around(self, average):
+        """A whole number that averages out to ``average``."""
+        return int(average) + (self.rng.random() < average % 1)
+
+    def title(self):
+        return f"{self.rng.choice(VERBS).capitalize()} {self.rng.choice(WORDS)} {self.rng.choice(WORDS)}"
+
+    # --- Generators ---
+
+    def seed_users(self):
+        prefix, password = self.options["prefix"], make_password(self.options["password"])
+        users = self.insert(User, [
+            User(username=f"{prefix}{i:06d}", email=f"{prefix}{i:06d}@example.com", password=password,
+                 first_name=self.rng.choice(WORDS).capitalize(), last_name=self.rng.choice(WORDS).capitalize())
+            for i in range(self.options["users"])
+        ], "users")
+        return [u.id for u in users]
+
+    def seed_teams(self, user_ids):
+        team_size = min(max(self.options["team_size"], 1), len(user_ids))
+        teams, members = [], []
+        for i in range(self.options["teams"]):
+            members.append(self.rng.sample(user_ids, team_size))
+            teams.append(Team(name=f"{self.options['prefix']} team {i:05d}", owner_id=members[-1][0]))
+        teams = self.insert(Team, teams, "teams")
+        team_members = {team.id: ids for team, ids in zip(teams, members)}
+        self.insert(Team.members.through, [
+            Team.members.through(team_id=team_id, user_id=uid)
+            for team_id, ids in team_members.items() for uid in ids
+        ], "team members")
+        return team_members
+
+    def seed_boards(self, team_members):
+        team_ids = list(team_members)
+        boards, members = [], []
+        for i in range(self.options["boards"]):
+            team_id = team_ids[i % len(team_ids)]
+            pool = team_members[team_id]
+            members.append(self.rng.sample(pool, min(max(self.options["board_size"], 1), len(pool))))
+            boards.append(Board(
+                name=self.title(), description=f"Synthetic board {i}", owner_id=members[-1][0], team_id=team_id,
+            ))
+        # bulk_create skips the post_save receiver that adds default columns
+        boards = self.insert(Board, boards, "boards")
+        board_members = {board.id: ids for board, ids in zip(boards, members)}
+        self.insert(Board.members.through, [
+            Board.members.through(board_id=board_id, user_id=uid)
+            for board_id, ids in board_members.items() for uid in ids
+        ], "board members")
+
+        columns = self.insert(Column, [
+            Column(board_id=board.id, title=title, order=order)
+            for board in boards for order, title in enumerate(COLUMNS, 1)
+        ], "columns")
+        board_columns = {}
+        for column in columns:
+            board_columns.setdefault(column.board_id, []).append(column.id)
+        return board_members, board_columns
+
+    def seed_tasks(self, board_members, board_columns):
+        """Tasks go in batch by batch, each followed by its subtasks, comments, etc."""
+        board_ids = list(board_members)
+        total = self.options["tasks"] if board_ids else 0
+        task_ids, pending, next_order = [], [], {}
+        today = date.today()
+        for i in range(total):
+            board_id = board_ids[i % len(board_ids)]
+            column_id = self.rng.choice(board_columns[board_id])
+            next_order[column_id] = next_order.get(column_id, 0) + ORDER_GAP
+            members = board_members[board_id]
+            due = today + timedelta(days=self.rng.randint(-30, 90)) if self.rng.random() < 0.6 else None
+            pending.append((Task(
+                title=self.title(), description=" ".join(self.rng.choices(WORDS, k=12)),
+                board_id=board_id, column_id=column_id, order=next_order[column_id],
+                priority=self.rng.choice(("low", "medium", "high")), due_date=due,
+                created_by_id=self.rng.choice(members),
+            ), members))
+            if len(pending) == self.batch_size or i == total - 1:
+                task_ids += self.flush_tasks(pending)
+                pending = []
+        return task_ids
+
+    def flush_tasks(self, pending):
+        tasks = self.insert(Task, [task for task, _ in pending], "tasks")
+        assignments, subtasks, comments, attachments = [], [], [], []
+        for task, (_, members) in zip(tasks, pending):
+            for uid in self.rng.sample(members, min(len(members), self.rng.randint(0, 2))):
+                assignments.append(Task.assigned_to.through(task_id=task.id, user_id=uid))
+            for _ in range(self.around(self.options["subtasks"])):
+                subtasks.append(SubTask(task_id=task.id, title=self.title(), is_completed=self.rng.random() < 0.4))
+            for _ in range(self.around(self.options["comments"])):
+                comments.append(Comment(
+                    task_id=task.id, author_id=self.rng.choice(members),
+                    content=" ".join(self.rng.choices(WORDS, k=self.rng.randint(3, 20))),
+                ))
+            for _ in range(self.around(self.options["attachments"])):
+                name = f"{self.rng.choice(WORDS)}-{self.rng.randint(1, 999)}.{self.rng.choice(EXTENSIONS)}"
+                attachments.append(Attachment(
+                    task_id=task.id, file=f"attachments/{name}", name=name, uploaded_by_id=self.rng.choice(members),
+                ))
+        self.insert(TaskTransition, [
+            TaskTransition(task_id=task.id, board_id=task.board_id, to_column_id=task.column_id, created_at=task.created_at)
+            for task in tasks
+        ], "task transitions")
+        self.insert(Task.assigned_to.through, assignments, "task assignments")
+        self.insert(SubTask, subtasks, "subtasks")
+        # bulk_create skips SubTask.save, which keeps the task's counts
+        Task.recount_subtasks([task.id for task in tasks])
+        # bulk_create bypasses Comment.save, so these send no notifications
+        self.insert(Comment, comments, "comments")
+        self.insert(Attachment, attachments, "attachments")
+        return [task.id for task in tasks]
+
+    def seed_notifications(self, user_ids, task_ids):
+        unread, pending = {}, []
+
+        def flush():
+            self.insert(Notification, pending, "notifications")
+            pending.clear()
+
+        for uid in user_ids:
+            for _ in range(self.options["notifications"]):
+                task_id = self.rng.choice(task_ids) if task_ids else None
+                is_read = self.rng.random() < 0.7
+                pending.append(Notification(
+                    user_id=uid, task_id=task_id, is_read=is_read, message=f"Update on {self.title().lower()}",
+                ))
+                if not is_read:
+                    unread[uid] = unread.get(uid, 0) + 1
+                if len(pending) == self.batch_size:
+                    flush()
+        flush()
+        # Notification.save keeps these in step; bulk_create doesn't, so set them here
+        self.insert(NotificationCounter, [
+            NotificationCounter(user_id=uid, unread=n) for uid, n in unread.items()
+        ], "notification counters")
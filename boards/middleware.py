@@ -0,0 +1,204 @@
+"""
+Per-view query and latency instrumentation.
+
+QueryMetricsMiddleware times every request and, for a sampled fraction
+(METRICS_SAMPLE_RATE), also counts its queries, DB time and template render
+time. Views return TemplateResponses, which process_template_response
+renders and times. Every connection carries an execute wrapper that records into the
+current request's sample, found through a context variable; that follows the
+request into the threads async views run their ORM calls in. Everything is
+aggregated per URL name into the histograms in boards.metrics and served by
+``/metrics``.
+
+A query shape is the SQL with IN-lists collapsed, because parameters are
+already separate. The same shape running METRICS_NPLUSONE_THRESHOLD or more
+times in one request is counted as a likely N+1. The worst repeat count per
+view and shape is kept, with the SQL, for the metrics page.
+"""
+import contextvars
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import Counter as ShapeCounter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .metrics import COUNT_BUCKETS, Counter, Gauge, Histogram, registry
+
+_IN_LIST = re.compile(r"IN \((?:%s, )*%s\)")
+_SPACES = re.compile(r"\s+")
+
+requests_total = registry.add(Counter(
+    "boards_http_requests_total", "Requests handled, by URL name.", ["view"]))
+request_seconds = registry.add(Histogram(
+    "boards_http_request_duration_seconds", "Wall time per request.", ["view"]))
+sampled_total = registry.add(Counter(
+    "boards_http_sampled_requests_total", "Requests whose queries were recorded.", ["view"]))
+queries_per_request = registry.add(Histogram(
+    "boards_db_queries_per_request", "Queries per sampled request.", ["view"], buckets=COUNT_BUCKETS))
+db_seconds = registry.add(Histogram(
+    "boards_db_duration_seconds", "Total DB time per sampled request.", ["view"]))
+template_seconds = registry.add(Histogram(
+    "boards_template_render_seconds", "Template render time per sampled request.", ["view"]))
+nplusone_total = registry.add(Counter(
+    "boards_nplusone_requests_total", "Sampled requests that repeated one query shape too often.", ["view"]))
+nplusone_repeats = registry.add(Gauge(
+    "boards_nplusone_shape_repeats", "Most times a query shape ran in one request.", ["view", "shape"]))
+
+MAX_SHAPES_PER_VIEW = 20
+_shape_sql = {}  # (view, shape hash) -> SQL, printed as comments on /metrics
+_shape_lock = threading.Lock()
+
+_current = contextvars.ContextVar("boards_request_sample", default=None)
+
+
+def query_shape(sql):
+    return _SPACES.sub(" ", _IN_LIST.sub("IN (...)", sql)).strip()
+
+
+class RequestSample:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.shapes = ShapeCounter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        began = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - began
+            self.queries += 1
+            self.shapes[query_shape(sql)] += 1
+
+
+def _record_query(execute, sql, params, many, context):
+    sample = _current.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    return sample(execute, sql, params, many, context)
+
+
+def _instrument(connection):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    _instrument(connection)
+
+
+def _record_shapes(view, shapes, threshold):
+    flagged = False
+    for sql, n in shapes.items():
+        if n < threshold:
+            continue
+        flagged = True
+        digest = hashlib.sha1(sql.encode()).hexdigest()[:10]
+        with _shape_lock:
+            known = sum(1 for v, _ in _shape_sql if v == view)
+            if (view, digest) not in _shape_sql and known >= MAX_SHAPES_PER_VIEW:
+                continue
+            _shape_sql[(view, digest)] = sql
+        nplusone_repeats.set_max(view, digest, value=n)
+    if flagged:
+        nplusone_total.inc(view)
+
+
+def shape_comments():
+    with _shape_lock:
+        return [f"# N+1 candidate view={view} shape={digest}: {sql[:500]}" for (view, digest), sql in sorted(_shape_sql.items())]
+
+
+def reset():
+    registry.reset()
+    with _shape_lock:
+        _shape_sql.clear()
+
+
+registry.add_collector(shape_comments)
+
+
+class QueryMetricsMiddleware:
+    # Async-capable so async views run on the event loop instead of being
+    # pushed back into a thread by a sync middleware in the chain
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample = _start_sample()
+        began = time.perf_counter()
+        if sample is None:
+            response = self.get_response(request)
+        else:
+            with _sampling(sample):
+                response = self.get_response(request)
+        _record(request, sample, time.perf_counter() - began)
+        return response
+
+    def process_template_response(self, request, response):
+        # Render here, timed, rather than leaving it to the handler
+        sample = _current.get()
+        if sample is not None:
+            began = time.perf_counter()
+            response.render()
+            sample.template_time += time.perf_counter() - began
+        return response
+
+    async def __acall__(self, request):
+        sample = _start_sample()
+        began = time.perf_counter()
+        if sample is None:
+            response = await self.get_response(request)
+        else:
+            with _sampling(sample):
+                response = await self.get_response(request)
+        _record(request, sample, time.perf_counter() - began)
+        return response
+
+
+def _start_sample():
+    rate = getattr(settings, "METRICS_SAMPLE_RATE", 0.1)
+    return RequestSample() if rate and random.random() < rate else None
+
+
+@contextmanager
+def _sampling(sample):
+    # Connections opened before this module was imported missed the signal
+    for conn in connections.all(initialized_only=True):
+        _instrument(conn)
+    token = _current.set(sample)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+def _record(request, sample, elapsed):
+    match = getattr(request, "resolver_match", None)
+    view = (match.view_name if match else None) or "<unresolved>"
+    requests_total.inc(view)
+    request_seconds.observe(view, value=elapsed)
+    if sample is not None:
+        sampled_total.inc(view)
+        queries_per_request.observe(view, value=sample.queries)
+        db_seconds.observe(view, value=sample.db_time)
+        template_seconds.observe(view, value=sample.template_time)
+        _record_shapes(view, sample.shapes, getattr(settings, "METRICS_NPLUSONE_THRESHOLD", 5))
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-18 20:05
+
+from django.db import migrations
+
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE boards_search USING fts5(
+    title,
+    body,
+    kind UNINDEXED,
+    task_id UNINDEXED,
+    board_id UNINDEXED,
+    tokenize = 'porter unicode61 remove_diacritics 2'
+)
+"""
+
+FILL_INDEX = [
+    """
+    INSERT INTO boards_search (rowid, title, body, kind, task_id, board_id)
+    SELECT id * 4 + 1, title, description, 1, id, board_id FROM boards_task
+    """,
+    """
+    INSERT INTO boards_search (rowid, title, body, kind, task_id, board_id)
+    SELECT s.id * 4 + 2, s.title, '', 2, s.task_id, t.board_id
+    FROM boards_subtask s JOIN boards_task t ON t.id = s.task_id
+    """,
+    """
+    INSERT INTO boards_search (rowid, title, body, kind, task_id, board_id)
+    SELECT c.id * 4 + 3, '', c.content, 3, c.task_id, t.board_id
+    FROM boards_comment c JOIN boards_task t ON t.id = c.task_id
+    """,
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0005_notificationcounter"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [CREATE_INDEX, *FILL_INDEX],
+            "DROP TABLE boards_search",
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 6.0 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+def release_abandoned_locks(apps, schema_editor):
+    # Locks taken before leases existed never expire, so free them all
+    Task = apps.get_model("boards", "Task")
+    Task.objects.filter(is_locked=True).update(is_locked=False, locked_by=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0006_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="lock_expires_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(release_abandoned_locks, migrations.RunPython.noop),
+    ]
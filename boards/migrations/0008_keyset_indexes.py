@@ -0,0 +1,46 @@
+# Generated by Django 6.0 on 2026-10-18 21:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0007_task_lock_expires_at"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="board",
+            index=models.Index(fields=["created_at", "id"], name="board_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "created_at", "id"], name="notif_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="notification",
+            index=models.Index(
+                fields=["user", "is_read", "created_at"],
+                name="notif_user_read_created_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="team",
+            index=models.Index(fields=["created_at", "id"], name="team_created_idx"),
+        ),
+        # The auto-created membership tables only have (board_id, user_id)
+        # unique indexes; listings go user first.
+        migrations.RunSQL(
+            "CREATE INDEX board_members_user_board_idx ON boards_board_members (user_id, board_id)",
+            "DROP INDEX board_members_user_board_idx",
+        ),
+        migrations.RunSQL(
+            "CREATE INDEX team_members_user_team_idx ON boards_team_members (user_id, team_id)",
+            "DROP INDEX team_members_user_team_idx",
+        ),
+    ]
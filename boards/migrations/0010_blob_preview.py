@@ -0,0 +1,32 @@
+# Generated by Django 6.0 on 2026-10-18 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0009_attachment_blobs_uploads"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="blob",
+            name="preview",
+            field=models.FileField(blank=True, upload_to="blobs/"),
+        ),
+        migrations.AddField(
+            model_name="blob",
+            name="preview_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("pending", "Pending"),
+                    ("ready", "Ready"),
+                    ("unsupported", "Unsupported"),
+                    ("failed", "Failed"),
+                ],
+                max_length=12,
+            ),
+        ),
+    ]
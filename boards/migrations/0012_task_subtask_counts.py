@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-18 23:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subtasks(apps, schema_editor):
+    Task = apps.get_model("boards", "Task")
+    SubTask = apps.get_model("boards", "SubTask")
+
+    def count(**filters):
+        rows = (
+            SubTask.objects.filter(task=OuterRef("pk"), **filters)
+            .order_by().values("task").annotate(n=Count("id")).values("n")
+        )
+        return Coalesce(Subquery(rows), 0)
+
+    Task.objects.update(subtasks_total=count(), subtasks_done=count(is_completed=True))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0011_board_events"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="subtasks_done",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="task",
+            name="subtasks_total",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_subtasks, migrations.RunPython.noop),
+    ]
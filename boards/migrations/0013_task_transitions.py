@@ -0,0 +1,90 @@
+# Generated by Django 6.0 on 2026-10-18 23:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    # Existing tasks get one entry: their current column, since they were created
+    Task = apps.get_model("boards", "Task")
+    TaskTransition = apps.get_model("boards", "TaskTransition")
+    rows = Task.objects.values_list("id", "board_id", "column_id", "created_at").iterator(chunk_size=2000)
+    batch = []
+    for task_id, board_id, column_id, created_at in rows:
+        batch.append(TaskTransition(task_id=task_id, board_id=board_id, to_column_id=column_id, created_at=created_at))
+        if len(batch) == 2000:
+            TaskTransition.objects.bulk_create(batch)
+            batch = []
+    TaskTransition.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0012_task_subtask_counts"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TaskTransition",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(default=django.utils.timezone.now),
+                ),
+                (
+                    "board",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transitions",
+                        to="boards.board",
+                    ),
+                ),
+                (
+                    "from_column",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="boards.column",
+                    ),
+                ),
+                (
+                    "task",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="transitions",
+                        to="boards.task",
+                    ),
+                ),
+                (
+                    "to_column",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="boards.column",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["board", "task", "created_at", "to_column"],
+                        name="transition_board_task_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
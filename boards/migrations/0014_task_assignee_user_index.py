@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-19 00:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("boards", "0013_task_transitions"),
+    ]
+
+    operations = [
+        # The auto-created assignment table only has a (task_id, user_id) unique
+        # index and a bare user_id one; the "my work" dashboard goes user first
+        # and needs only task_id back.
+        migrations.RunSQL(
+            "CREATE INDEX task_assignees_user_task_idx ON boards_task_assigned_to (user_id, task_id)",
+            "DROP INDEX task_assignees_user_task_idx",
+        ),
+    ]
@@ -1,9 +1,17 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
+
+from .layers import group_send_many
 
 
 class Team(models.Model):
@@ -14,6 +22,12 @@ class Team(models.Model):
     members = models.ManyToManyField(User, related_name="teams", blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination cursor, see boards/pagination.py
+            models.Index(fields=["created_at", "id"], name="team_created_idx"),
+        ]
+
     def __str__(self):
         return self.name
 
@@ -29,11 +43,31 @@ class Board(models.Model):
     )
     members = models.ManyToManyField(User, related_name="boards", blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped once per logged change, see boards/events.py
+    version = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="board_created_idx"),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class BoardEvent(models.Model):
+    """One entry in a board's change log; ``version`` is the board version it produced."""
+    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name="events")
+    version = models.PositiveBigIntegerField()
+    data = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["board", "version"], name="board_event_version_uniq"),
+        ]
+
+
 class Column(models.Model):
     board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name="columns")
     title = models.CharField(max_length=100)
@@ -45,6 +79,14 @@ class Column(models.Model):
     def __str__(self):
         return f"{self.board.name} → {self.title}"
 
+    @classmethod
+    def last_per_board(cls):
+        """Each board's last column (by order, then id), where finished tasks sit."""
+        later = cls.objects.filter(board_id=OuterRef("board_id")).filter(
+            Q(order__gt=OuterRef("order")) | Q(order=OuterRef("order"), id__gt=OuterRef("id"))
+        )
+        return cls.objects.exclude(Exists(later))
+
 
 class Task(models.Model):
     PRIORITY_CHOICES = [
@@ -66,31 +108,146 @@ class Task(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # --- Locking fields (an editing lease, see boards/locks.py) ---
+    is_locked = models.BooleanField(default=False)
+    locked_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name="task_locks"
+    )
+    lock_expires_at = models.DateTimeField(null=True, blank=True)
+
+    # Subtask counts, kept in step by SubTask so cards need no extra query
+    subtasks_total = models.PositiveIntegerField(default=0)
+    subtasks_done = models.PositiveIntegerField(default=0)
+
     class Meta:
         ordering = ["order"]
 
     def __str__(self):
         return self.title
-    
-    # --- Locking fields ---
-    is_locked = models.BooleanField(default=False)
-    locked_by = models.ForeignKey(
-    User, on_delete=models.SET_NULL, null=True, blank=True, related_name="task_locks"
-)
-lock_timestamp = models.DateTimeField(null=True, blank=True)
+
+    @classmethod
+    def recount_subtasks(cls, task_ids=None):
+        """Recompute the subtask counts from scratch, e.g. after a bulk_create."""
+        tasks = cls.objects.all() if task_ids is None else cls.objects.filter(id__in=list(task_ids))
+
+        def count(**filters):
+            rows = (
+                SubTask.objects.filter(task=OuterRef("pk"), **filters)
+                .order_by().values("task").annotate(n=Count("id")).values("n")
+            )
+            return Coalesce(Subquery(rows), 0)
+
+        return tasks.update(subtasks_total=count(), subtasks_done=count(is_completed=True))
+
+
+class TaskTransition(models.Model):
+    """
+    A task entering a column, for flow analytics (boards.analytics).
+    ``from_column`` is empty for the task's first column.
+    """
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="transitions")
+    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name="transitions")
+    from_column = models.ForeignKey(Column, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    to_column = models.ForeignKey(Column, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # Covers the analytics scan, which reads a board's log in task and time order
+        indexes = [models.Index(fields=["board", "task", "created_at", "to_column"], name="transition_board_task_idx")]
+
+    def __str__(self):
+        return f"{self.task_id}: {self.from_column_id} -> {self.to_column_id}"
+
+    @classmethod
+    def record(cls, board_id, moves):
+        """Log ``moves``, (task_id, from_column_id, to_column_id) triples, skipping any that stayed put."""
+        now = timezone.now()
+        cls.objects.bulk_create([
+            cls(task_id=task_id, board_id=board_id, from_column_id=old, to_column_id=new, created_at=now)
+            for task_id, old, new in moves if old != new
+        ])
+
+
+class ArchivedTask(models.Model):
+    """
+    A finished task moved out of the live tables by boards.archive. ``data``
+    carries its assignees, subtasks, comments, attachments and column
+    history; ``task_id`` is the original id, which a restore reuses.
+    """
+    task_id = models.BigIntegerField(unique=True)
+    board = models.ForeignKey(Board, on_delete=models.CASCADE, related_name="archived_tasks")
+    column = models.ForeignKey(Column, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    priority = models.CharField(max_length=10, choices=Task.PRIORITY_CHOICES, default="medium")
+    due_date = models.DateField(null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    created_at = models.DateTimeField()
+    # When it reached the column it was archived from
+    done_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+    data = models.JSONField(default=dict)
+
+    class Meta:
+        # The archive browser pages through a board newest-finished first
+        indexes = [models.Index(fields=["board", "done_at", "id"], name="archived_board_done_idx")]
+
+    def __str__(self):
+        return f"{self.title} (archived)"
+
+
+class Blob(models.Model):
+    """
+    Stored file content, named by its SHA-256 and shared by every attachment
+    with the same bytes. The file is removed when the last reference goes.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    file = models.FileField(upload_to="blobs/")
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Thumbnail, rendered once per blob by boards.previews
+    preview = models.FileField(upload_to="blobs/", blank=True)
+    preview_status = models.CharField(max_length=12, blank=True, choices=[
+        ("pending", "Pending"), ("ready", "Ready"), ("unsupported", "Unsupported"), ("failed", "Failed"),
+    ])
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
 
 class Attachment(models.Model):
     task = models.ForeignKey(
         Task, on_delete=models.CASCADE, related_name="attachments"
     )
+    # For content-addressed uploads this points at the blob's file
     file = models.FileField(upload_to="attachments/")
+    blob = models.ForeignKey(
+        Blob, on_delete=models.PROTECT, null=True, blank=True, related_name="attachments"
+    )
+    name = models.CharField(max_length=255, blank=True)
     uploaded_by = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, blank=True
     )
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.file.name.split('/')[-1]}"
+        return self.name or f"{self.file.name.split('/')[-1]}"
+
+
+class UploadSession(models.Model):
+    """A chunked upload in progress; ``received`` is where the client resumes."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="upload_sessions")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
 
 class SubTask(models.Model):
     task = models.ForeignKey(
@@ -103,6 +260,31 @@ class SubTask(models.Model):
     def __str__(self):
         return f"{self.title} ({'Done' if self.is_completed else 'Pending'})"
 
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        with transaction.atomic():
+            if created:
+                super().save(*args, **kwargs)
+                Task.objects.filter(id=self.task_id).update(
+                    subtasks_total=F("subtasks_total") + 1,
+                    subtasks_done=F("subtasks_done") + int(self.is_completed),
+                )
+                return
+            # Only the save that actually flips the stored flag moves the count
+            flipped = (
+                SubTask.objects.filter(id=self.id).exclude(is_completed=self.is_completed)
+                .update(is_completed=self.is_completed)
+            )
+            super().save(*args, **kwargs)
+            if flipped:
+                Task.objects.filter(id=self.task_id).update(
+                    subtasks_done=Greatest(F("subtasks_done") + (1 if self.is_completed else -1), 0)
+                )
+
+    def toggle(self):
+        self.is_completed = not self.is_completed
+        self.save(update_fields=["is_completed"])
+
 class Comment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name="comments")
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
@@ -113,9 +295,21 @@ class Comment(models.Model):
         return f"{self.author.username}: {self.content[:20]}"
     
     def save(self, *args, **kwargs):
-        channel_layer = get_channel_layer()
-        for u in self.task.assigned_to.exclude(id=self.author.id):
-            async_to_sync(channel_layer.group_send)(f"notif_{u.id}",{"type": "notification_update","data": {"unread": u.notifications.filter(is_read=False).count()}})
+        created = self._state.adding
+        # The comment, its notifications and the counters land together or not at all
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if created:
+                # One bulk insert and one badge push however many assignees there are
+                recipients = list(
+                    self.task.assigned_to.exclude(id=self.author_id).values_list("id", flat=True)
+                )
+                Notification.objects.bulk_create([
+                    Notification(user_id=uid, task=self.task, message=f"{self.author.username} commented on {self.task.title}")
+                    for uid in recipients
+                ])
+                NotificationCounter.add(recipients)
+                transaction.on_commit(lambda: NotificationCounter.push(recipients))
 
 
 class Notification(models.Model):
@@ -125,9 +319,77 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Cursors over all of a user's notifications, and over just the unread ones
+            models.Index(fields=["user", "created_at", "id"], name="notif_user_created_idx"),
+            models.Index(fields=["user", "is_read", "created_at"], name="notif_user_read_created_idx"),
+        ]
+
     def __str__(self):
         return f"To {self.user.username}: {self.message}"
-    
+
+    def save(self, *args, **kwargs):
+        created = self._state.adding
+        super().save(*args, **kwargs)
+        if created and not self.is_read:
+            NotificationCounter.add([self.user_id])
+            transaction.on_commit(lambda: NotificationCounter.push([self.user_id]))
+
+    def mark_read(self):
+        """Mark as read, counting it off the unread badge only the first time."""
+        if Notification.objects.filter(id=self.id, is_read=False).update(is_read=True):
+            NotificationCounter.add([self.user_id], -1)
+            transaction.on_commit(lambda: NotificationCounter.push([self.user_id]))
+        self.is_read = True
+
+
+class NotificationCounter(models.Model):
+    """Each user's unread notification count, kept in step with Notification."""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="notification_counter"
+    )
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.unread} unread"
+
+    @classmethod
+    def add(cls, user_ids, amount=1):
+        """Atomically add ``amount`` (which may be negative) to each user's count."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        cls.objects.bulk_create([cls(user_id=uid) for uid in user_ids], ignore_conflicts=True)
+        cls.objects.filter(user_id__in=user_ids).update(unread=Greatest(F("unread") + amount, 0))
+
+    @classmethod
+    def subtract(cls, amounts):
+        """Take a different amount off each user, given as {user_id: amount}."""
+        if not amounts:
+            return
+        cls.objects.filter(user_id__in=amounts).update(unread=Greatest(
+            F("unread") - Case(*[When(user_id=uid, then=Value(n)) for uid, n in amounts.items()], output_field=models.IntegerField()),
+            0,
+        ))
+
+    @classmethod
+    def reset(cls, user_id):
+        cls.objects.update_or_create(user_id=user_id, defaults={"unread": 0})
+
+    @classmethod
+    def push(cls, user_ids):
+        """Send the current badge counts to every user in one channel layer batch."""
+        counts = dict(cls.objects.filter(user_id__in=list(user_ids)).values_list("user_id", "unread"))
+        if not counts:
+            return
+        messages = [
+            (f"notif_{uid}", {"type": "notification_update", "data": {"unread": unread}})
+            for uid, unread in counts.items()
+        ]
+        async_to_sync(group_send_many)(get_channel_layer(), messages)
+
+
 def user_initials(self):
     parts = (self.first_name + " " + self.last_name).strip().split()
     if parts:
@@ -151,4 +413,25 @@ def ensure_board_has_columns(sender, instance, created, **kwargs):
     if created:
         Column.objects.get_or_create(board=instance, title="To Do", defaults={'order': 1})
         Column.objects.get_or_create(board=instance, title="In Progress", defaults={'order': 2})
-        Column.objects.get_or_create(board=instance, title="Done", defaults={'order': 3})
\ No newline at end of file
+        Column.objects.get_or_create(board=instance, title="Done", defaults={'order': 3})
+
+
+@receiver(pre_delete, sender=Task)
+def discount_unread_task_notifications(sender, instance, **kwargs):
+    """Notifications go with their task, so take their unread ones off the counters."""
+    amounts = dict(
+        Notification.objects.filter(task=instance, is_read=False)
+        .values("user_id").annotate(n=Count("id")).values_list("user_id", "n")
+    )
+    NotificationCounter.subtract(amounts)
+
+
+@receiver(post_delete, sender=SubTask)
+def discount_deleted_subtask(sender, instance, origin=None, **kwargs):
+    """Take a deleted subtask off its task's counts, unless the task is going too."""
+    if not (isinstance(origin, SubTask) or getattr(origin, "model", None) is SubTask):
+        return
+    Task.objects.filter(id=instance.task_id).update(
+        subtasks_total=Greatest(F("subtasks_total") - 1, 0),
+        subtasks_done=Greatest(F("subtasks_done") - int(instance.is_completed), 0),
+    )
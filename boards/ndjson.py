@@ -0,0 +1,340 @@
+"""
+Board export and import as NDJSON: one JSON object per line, each with a
+``type``.
+
+An export is a ``board`` line followed by the board's columns, tasks,
+assignees, subtasks, comments, attachments and column history, in that
+order. Each section is read with ``iterator(chunk_size=EXPORT_CHUNK_SIZE)``,
+or ``aiterator`` for the streaming view, and written out a chunk at a time,
+so memory stays flat however big the board is. People are named by
+username, so a file can move between installations. Attachments are
+metadata only: the importer links a blob-backed one when a blob with the
+same SHA-256 is stored here and skips it otherwise, and keeps the file name
+of an older file-only one.
+
+The import builds a new board in one transaction. Lines are buffered per
+type and written with ``bulk_create``, IMPORT_BATCH_SIZE at a time; columns
+and tasks get new ids and every reference to them is remapped. Timestamps
+are kept. Ids, dates and file names are checked as each line is read, so a
+bad file fails with its line number. Rows that point at a task, column or
+author that isn't there are skipped and counted. Subtask counts and the search index are rebuilt for
+the new tasks at the end.
+"""
+import json
+from collections import Counter
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.utils import validate_file_name
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .archive import restore_times
+from .models import Attachment, Blob, Board, Column, Comment, SubTask, Task, TaskTransition
+from .search import reindex_tasks
+from .uploads import take_blob_refs
+
+FORMAT = 1
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 1000
+
+# Fields every line of a type must have
+REQUIRED = {
+    "column": ("id", "title", "order"),
+    "task": ("id", "column_id", "title"),
+    "assignee": ("task_id", "username"),
+    "subtask": ("task_id", "title"),
+    "comment": ("task_id", "author_username", "content"),
+    "attachment": ("task_id", "file"),
+    "transition": ("task_id", "to_column_id", "created_at"),
+}
+# Checked on every line that has them; only required ones may not be null
+IDS = ("id", "task_id", "column_id", "to_column_id", "from_column_id", "order")
+DATES = {"due_date": parse_date, "created_at": parse_datetime, "updated_at": parse_datetime, "uploaded_at": parse_datetime}
+
+
+class BoardImportError(Exception):
+    def __init__(self, line_no, message):
+        super().__init__(f"Line {line_no}: {message}")
+
+
+# --- Export ---
+
+def _sections(board):
+    """(type, queryset of dicts) for each section, in the order the importer needs them."""
+    return [
+        ("column", Column.objects.filter(board=board).order_by("order", "id").values("id", "title", "order")),
+        ("task", Task.objects.filter(board=board).order_by("id").values(
+            "id", "column_id", "title", "description", "priority", "due_date", "order", "created_at", "updated_at",
+            created_by_username=F("created_by__username"),
+        )),
+        ("assignee", Task.assigned_to.through.objects.filter(task__board=board).order_by("id").values(
+            "task_id", username=F("user__username"),
+        )),
+        ("subtask", SubTask.objects.filter(task__board=board).order_by("id").values(
+            "id", "task_id", "title", "is_completed", "created_at",
+        )),
+        ("comment", Comment.objects.filter(task__board=board).order_by("id").values(
+            "id", "task_id", "content", "created_at", author_username=F("author__username"),
+        )),
+        ("attachment", Attachment.objects.filter(task__board=board).order_by("id").values(
+            "id", "task_id", "name", "file", "uploaded_at",
+            sha256=F("blob__sha256"), size=F("blob__size"), uploaded_by_username=F("uploaded_by__username"),
+        )),
+        ("transition", TaskTransition.objects.filter(board=board).order_by("id").values(
+            "task_id", "from_column_id", "to_column_id", "created_at",
+        )),
+    ]
+
+
+def _header(board):
+    return _line("board", {
+        "format": FORMAT, "id": board.id, "name": board.name, "description": board.description,
+        "exported_at": timezone.now(),
+    })
+
+
+def _line(kind, row):
+    return json.dumps({"type": kind, **row}, default=_iso) + "\n"
+
+
+def _iso(value):
+    # Full precision; DjangoJSONEncoder cuts datetimes to milliseconds
+    if isinstance(value, date):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def export_board(board, chunk_size=EXPORT_CHUNK_SIZE):
+    """The board as NDJSON text, up to ``chunk_size`` lines per string."""
+    yield _header(board)
+    for kind, rows in _sections(board):
+        lines = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            lines.append(_line(kind, row))
+            if len(lines) == chunk_size:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+
+
+async def aexport_board(board, chunk_size=EXPORT_CHUNK_SIZE):
+    """export_board for async views; StreamingHttpResponse would buffer a sync iterator under ASGI."""
+    yield _header(board)
+    for kind, rows in _sections(board):
+        lines = []
+        async for row in rows.aiterator(chunk_size=chunk_size):
+            lines.append(_line(kind, row))
+            if len(lines) == chunk_size:
+                yield "".join(lines)
+                lines = []
+        if lines:
+            yield "".join(lines)
+
+
+# --- Import ---
+
+def import_board(lines, owner, name=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Build a new board owned by ``owner`` from NDJSON ``lines`` (any iterable
+    of str or bytes, such as an open file). Returns ``(board, counts)``, the
+    counts being rows written per type plus ``skipped``.
+    """
+    importer = _Importer(owner, name, batch_size)
+    with transaction.atomic():
+        for line_no, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                raise BoardImportError(line_no, "not valid JSON.")
+            if not isinstance(record, dict):
+                raise BoardImportError(line_no, "expected a JSON object.")
+            importer.add(line_no, record)
+        if importer.board is None:
+            raise BoardImportError(0, "no board line.")
+        importer.finish()
+    return importer.board, dict(importer.counts)
+
+
+class _Importer:
+    def __init__(self, owner, name, batch_size):
+        self.owner = owner
+        self.name = name
+        self.batch_size = batch_size
+        self.board = None
+        # Old id -> new id
+        self.columns, self.tasks = {}, {}
+        # Username -> user id, or None for someone who isn't here
+        self.users = {}
+        self.kind, self.pending = None, []
+        self.counts = Counter()
+
+    def add(self, line_no, record):
+        kind = record.pop("type", None)
+        if self.board is None:
+            if kind != "board":
+                raise BoardImportError(line_no, "the first line must be the board.")
+            if record.get("format") != FORMAT:
+                raise BoardImportError(line_no, f"unsupported format {record.get('format')!r}.")
+            self._create_board(record)
+            return
+        if kind not in REQUIRED:
+            raise BoardImportError(line_no, f"unknown type {kind!r}.")
+        missing = [field for field in REQUIRED[kind] if field not in record]
+        if missing:
+            raise BoardImportError(line_no, f"{kind} is missing {', '.join(missing)}.")
+        self._check(line_no, kind, record)
+        # Sections arrive in dependency order, so a type change means the last one is complete
+        if kind != self.kind:
+            self._flush()
+            self.kind = kind
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self._flush()
+
+    def _check(self, line_no, kind, record):
+        """Reject what would otherwise fail half way through a batch."""
+        for field, value in record.items():
+            if value is None and field not in REQUIRED[kind]:
+                continue
+            if field in IDS and (not isinstance(value, int) or isinstance(value, bool)):
+                raise BoardImportError(line_no, f"{kind} {field} must be a whole number.")
+            if field in DATES and not _parses(DATES[field], value):
+                raise BoardImportError(line_no, f"{kind} {field} is not a valid date.")
+        if kind == "attachment" and not record.get("sha256"):
+            # A file-only attachment's path is used as is, so it must stay under MEDIA_ROOT
+            try:
+                validate_file_name(record["file"], allow_relative_path=True)
+            except (SuspiciousFileOperation, TypeError):
+                raise BoardImportError(line_no, f"attachment file {record['file']!r} is not allowed.")
+
+    def finish(self):
+        self._flush()
+        new_ids = list(self.tasks.values())
+        for start in range(0, len(new_ids), self.batch_size):
+            chunk = new_ids[start:start + self.batch_size]
+            Task.recount_subtasks(chunk)
+            reindex_tasks(chunk)
+
+    def _create_board(self, record):
+        self.board = Board.objects.create(
+            name=self.name or record.get("name") or "Imported board",
+            description=record.get("description") or "", owner=self.owner,
+        )
+        self.board.members.add(self.owner)
+        # The columns come from the file, not the defaults every new board gets
+        self.board.columns.all().delete()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        rows = self.pending
+        self.pending = []
+        written = getattr(self, f"_write_{self.kind}s")(rows)
+        self.counts[self.kind] += written
+        self.counts["skipped"] += len(rows) - written
+
+    def _user_ids(self, names):
+        """Resolve usernames in one query, remembering them for later batches."""
+        unknown = {name for name in names if name and name not in self.users}
+        if unknown:
+            found = dict(User.objects.filter(username__in=unknown).values_list("username", "id"))
+            self.users.update({name: found.get(name) for name in unknown})
+        return self.users
+
+    def _write_columns(self, rows):
+        created = Column.objects.bulk_create([
+            Column(board=self.board, title=r["title"], order=r["order"]) for r in rows
+        ])
+        self.columns.update({r["id"]: c.id for r, c in zip(rows, created)})
+        return len(created)
+
+    def _write_tasks(self, rows):
+        rows = [r for r in rows if r["column_id"] in self.columns]
+        users = self._user_ids(r.get("created_by_username") for r in rows)
+        created = Task.objects.bulk_create([
+            Task(
+                board=self.board, column_id=self.columns[r["column_id"]], title=r["title"],
+                description=r.get("description") or "", priority=r.get("priority") or "medium",
+                due_date=parse_date(r["due_date"]) if r.get("due_date") else None, order=r.get("order") or 0,
+                created_by_id=users.get(r.get("created_by_username")),
+            )
+            for r in rows
+        ])
+        self.tasks.update({r["id"]: t.id for r, t in zip(rows, created)})
+        self._keep_times(Task, "created_at", rows, created)
+        self._keep_times(Task, "updated_at", rows, created)
+        return len(created)
+
+    def _write_assignees(self, rows):
+        users = self._user_ids(r["username"] for r in rows)
+        links = {
+            (self.tasks[r["task_id"]], users[r["username"]])
+            for r in rows if r["task_id"] in self.tasks and users.get(r["username"])
+        }
+        Through = Task.assigned_to.through
+        Through.objects.bulk_create([Through(task_id=t, user_id=u) for t, u in links], ignore_conflicts=True)
+        return len(links)
+
+    def _write_subtasks(self, rows):
+        rows = [r for r in rows if r["task_id"] in self.tasks]
+        created = SubTask.objects.bulk_create([
+            SubTask(task_id=self.tasks[r["task_id"]], title=r["title"], is_completed=bool(r.get("is_completed")))
+            for r in rows
+        ])
+        self._keep_times(SubTask, "created_at", rows, created)
+        return len(created)
+
+    def _write_comments(self, rows):
+        users = self._user_ids(r["author_username"] for r in rows)
+        rows = [r for r in rows if r["task_id"] in self.tasks and users.get(r["author_username"])]
+        created = Comment.objects.bulk_create([
+            Comment(task_id=self.tasks[r["task_id"]], author_id=users[r["author_username"]], content=r["content"])
+            for r in rows
+        ])
+        self._keep_times(Comment, "created_at", rows, created)
+        return len(created)
+
+    def _write_attachments(self, rows):
+        wanted = {r["sha256"] for r in rows if r.get("sha256")}
+        blobs = {b.sha256: b for b in Blob.objects.filter(sha256__in=wanted)} if wanted else {}
+        rows = [r for r in rows if r["task_id"] in self.tasks and (not r.get("sha256") or r["sha256"] in blobs)]
+        users = self._user_ids(r.get("uploaded_by_username") for r in rows)
+        attachments = []
+        for r in rows:
+            blob = blobs.get(r.get("sha256"))
+            attachments.append(Attachment(
+                task_id=self.tasks[r["task_id"]], file=blob.file.name if blob else r["file"], blob=blob,
+                name=r.get("name") or "", uploaded_by_id=users.get(r.get("uploaded_by_username")),
+            ))
+        created = Attachment.objects.bulk_create(attachments)
+        take_blob_refs(a.blob_id for a in created)
+        self._keep_times(Attachment, "uploaded_at", rows, created)
+        return len(created)
+
+    def _write_transitions(self, rows):
+        rows = [r for r in rows if r["task_id"] in self.tasks and r["to_column_id"] in self.columns]
+        created = TaskTransition.objects.bulk_create([
+            TaskTransition(
+                task_id=self.tasks[r["task_id"]], board=self.board, to_column_id=self.columns[r["to_column_id"]],
+                from_column_id=self.columns.get(r.get("from_column_id")), created_at=parse_datetime(r["created_at"]),
+            )
+            for r in rows
+        ])
+        return len(created)
+
+    def _keep_times(self, model, field, rows, created):
+        restore_times(model, field, {obj.id: r[field] for r, obj in zip(rows, created) if r.get(field)})
+
+
+def _parses(parse, value):
+    try:
+        return isinstance(value, str) and parse(value) is not None
+    except ValueError:
+        return False
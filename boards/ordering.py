@@ -0,0 +1,139 @@
+"""
+Gap-based ordering for tasks and columns.
+
+Siblings are numbered ORDER_GAP apart, so dropping a card between two others
+only has to write the moved row: it takes the midpoint of its neighbours.
+When a spot runs out of room the column is renumbered in a single UPDATE,
+in the background if there is still space for this drop, inline if not.
+Either way the new numbering goes out as a ``column_reordered`` event.
+"""
+import threading
+
+from django.db import connection, transaction
+from django.db.models import Case, IntegerField, Max, Value, When
+
+from . import events
+from .models import Column, Task
+
+ORDER_GAP = 1024
+
+# Largest id list written by one CASE statement, well under SQLite's
+# bound-parameter limit.
+REORDER_BATCH_SIZE = 2000
+
+_pending_rebalances = set()
+_pending_lock = threading.Lock()
+
+
+def next_order(queryset):
+    """Order value that puts a new row after everything in ``queryset``."""
+    current = queryset.aggregate(m=Max("order"))["m"] or 0
+    return current + ORDER_GAP
+
+
+def write_order(queryset, ids, base=0, **extra):
+    """Renumber ``ids`` (already in their new order) with one UPDATE, counting up from ``base``."""
+    ids = [int(pk) for pk in ids]
+    updated = 0
+    with transaction.atomic():
+        for start in range(0, len(ids), REORDER_BATCH_SIZE):
+            chunk = ids[start:start + REORDER_BATCH_SIZE]
+            position = Case(
+                *[When(id=pk, then=Value(base + (start + i + 1) * ORDER_GAP)) for i, pk in enumerate(chunk)],
+                output_field=IntegerField(),
+            )
+            updated += queryset.filter(id__in=chunk).update(order=position, **extra)
+    return updated
+
+
+def rebalance_column(column_id, exclude=None):
+    """Spread a column's tasks back out to ORDER_GAP spacing and publish the new order."""
+    with transaction.atomic():
+        tasks = Task.objects.filter(column_id=column_id)
+        if exclude is not None:
+            tasks = tasks.exclude(id=exclude)
+        ids = list(tasks.order_by("order", "id").values_list("id", flat=True))
+        updated = write_order(Task.objects.all(), ids)
+        board_id = Column.objects.filter(id=column_id).values_list("board_id", flat=True).first()
+        if board_id is not None:
+            events.publish([(board_id, {"type": "column_reordered", "column_id": column_id, "task_ids": ids})])
+    return updated
+
+
+def schedule_rebalance(column_id):
+    """Rebalance a column in a background thread once the current transaction commits."""
+    with _pending_lock:
+        if column_id in _pending_rebalances:
+            return
+        _pending_rebalances.add(column_id)
+
+    def run():
+        try:
+            rebalance_column(column_id)
+        finally:
+            with _pending_lock:
+                _pending_rebalances.discard(column_id)
+            connection.close()
+
+    transaction.on_commit(lambda: threading.Thread(target=run, daemon=True).start())
+
+
+def _order_between(lower, upper):
+    if upper is None:
+        return lower + ORDER_GAP
+    middle = (lower + upper) // 2
+    return middle if lower < middle < upper else None
+
+
+def place_task(task, column, prev_id=None, next_id=None):
+    """
+    Move ``task`` into ``column`` between the cards ``prev_id`` and ``next_id``
+    (either may be empty) and save it. Only the moved row is written unless
+    the gap between its neighbours has run out.
+    """
+    prev_id, next_id = _as_int(prev_id), _as_int(next_id)
+    neighbour_ids = [pk for pk in (prev_id, next_id) if pk]
+    orders = dict(
+        Task.objects.filter(id__in=neighbour_ids, column=column)
+        .exclude(id=task.id)
+        .values_list("id", "order")
+    )
+    if len(orders) < len(neighbour_ids) or not neighbour_ids:
+        # No neighbours given, or one has left the column since the client
+        # looked: drop after the current last card
+        lower = _last_order(column, task)
+        upper = None
+    else:
+        lower = orders.get(prev_id, 0)
+        upper = orders.get(next_id)
+
+    order = _order_between(lower, upper)
+    if order is None:
+        # Neighbours are adjacent: renumber the column now, then retry once
+        rebalance_column(column.id, exclude=task.id)
+        orders = dict(Task.objects.filter(id__in=neighbour_ids).values_list("id", "order"))
+        lower = orders.get(prev_id, 0)
+        upper = orders.get(next_id)
+        order = _order_between(lower, upper)
+        if order is None:
+            # Neighbours were sent the wrong way round: drop at the bottom
+            order = _last_order(column, task) + ORDER_GAP
+    elif upper is not None and min(order - lower, upper - order) < 2:
+        # This drop fits, the next one here won't
+        schedule_rebalance(column.id)
+
+    task.column = column
+    task.order = order
+    task.save(update_fields=["column", "order", "updated_at"])
+    return order
+
+
+def _last_order(column, task):
+    return Task.objects.filter(column=column).exclude(id=task.id).aggregate(m=Max("order"))["m"] or 0
+
+
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
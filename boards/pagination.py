@@ -0,0 +1,64 @@
+"""
+Keyset (cursor) pagination, newest first on ``(created_at, id)`` or another
+timestamp field.
+
+Unlike OFFSET paging, every page is one indexed range scan, however deep
+into the history it is, and rows added meanwhile don't shift the pages.
+"""
+import base64
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+PAGE_SIZE = getattr(settings, "LIST_PAGE_SIZE", 50)
+
+
+@dataclass
+class Page:
+    items: list
+    next_cursor: str | None
+
+    @property
+    def has_more(self):
+        return self.next_cursor is not None
+
+
+def next_page_url(request, page):
+    """This URL with the cursor moved on, or None on the last page."""
+    if not page.has_more:
+        return None
+    params = request.GET.copy()
+    params["cursor"] = page.next_cursor
+    return f"{request.path}?{params.urlencode()}"
+
+
+def encode_cursor(obj, field="created_at"):
+    raw = f"{getattr(obj, field).isoformat()}|{obj.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) from a cursor, or None if it's missing or mangled."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        at, pk = raw.split("|")
+        at = parse_datetime(at)
+        return (at, int(pk)) if at else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(queryset, cursor=None, size=PAGE_SIZE, field="created_at"):
+    """The page of ``queryset`` after ``cursor``, newest first on ``(field, id)``."""
+    position = decode_cursor(cursor)
+    if position:
+        at, pk = position
+        queryset = queryset.filter(Q(**{f"{field}__lt": at}) | Q(**{field: at, "id__lt": pk}))
+    # One extra row tells us whether there is a next page
+    items = list(queryset.order_by(f"-{field}", "-id")[:size + 1])
+    next_cursor = encode_cursor(items[size - 1], field) if len(items) > size else None
+    return Page(items=items[:size], next_cursor=next_cursor)
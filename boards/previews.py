@@ -0,0 +1,138 @@
+"""
+Attachment previews.
+
+A newly saved attachment queues its blob for a thumbnail. Rendering runs in
+a small ProcessPoolExecutor, so a slow or hostile file can't hold up a
+request or bloat the web process. Workers refuse oversized sources and
+images, and give up after PREVIEW_TIMEOUT seconds.
+
+Each blob is rendered at most once. The "pending" claim is a conditional
+UPDATE on ``preview_status``, and later attachments of the same bytes reuse
+whatever came of it. The PNG is stored next to the blob as
+``<sha256>.preview.png``. When it's ready, every board the blob is attached
+on gets a ``board_update`` push.
+"""
+import logging
+import mimetypes
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.urls import reverse
+
+from . import thumbnails
+from .layers import group_send_many
+from .models import Attachment, Blob
+
+logger = logging.getLogger(__name__)
+
+BOX = getattr(settings, "PREVIEW_SIZE", 320)
+MAX_SOURCE_BYTES = getattr(settings, "PREVIEW_MAX_SOURCE_BYTES", 50 * 1024 * 1024)
+MAX_PIXELS = getattr(settings, "PREVIEW_MAX_PIXELS", 50_000_000)
+TIMEOUT = getattr(settings, "PREVIEW_TIMEOUT", 30)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the web process has threads (channel layer, etc.)
+            _pool = ProcessPoolExecutor(
+                max_workers=getattr(settings, "PREVIEW_WORKERS", 2),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def preview_kind(filename):
+    content_type, _ = mimetypes.guess_type(filename)
+    if content_type == "application/pdf":
+        return "pdf"
+    if content_type and content_type.startswith("image/") and content_type != "image/svg+xml":
+        return "image"
+    return None
+
+
+def preview_name(blob_file_name):
+    return f"{blob_file_name}.preview.png"
+
+
+def queue_preview(attachment):
+    """Queue a thumbnail for ``attachment``'s blob. False if there's nothing to do."""
+    blob = attachment.blob
+    kind = preview_kind(attachment.name)
+    if blob is None or kind is None or blob.preview_status:
+        return False
+    if blob.size > MAX_SOURCE_BYTES:
+        Blob.objects.filter(id=blob.id, preview_status="").update(preview_status="unsupported")
+        return False
+    if not Blob.objects.filter(id=blob.id, preview_status="").update(preview_status="pending"):
+        return False  # someone else queued it first
+
+    args = (blob.file.path, default_storage.path(preview_name(blob.file.name)), kind, BOX, MAX_PIXELS, TIMEOUT)
+    if not getattr(settings, "PREVIEW_WORKERS", 2):
+        # No pool configured: render in this process
+        try:
+            status = thumbnails.render(*args)
+        except Exception:
+            logger.exception("Preview failed for blob %s", blob.id)
+            status = "failed"
+        _finish(blob.id, status)
+    else:
+        future = get_pool().submit(thumbnails.render, *args)
+        future.add_done_callback(lambda f: _rendered(blob.id, f))
+    return True
+
+
+def _rendered(blob_id, future):
+    # Runs on the executor's management thread
+    try:
+        status = future.result()
+    except Exception:
+        logger.exception("Preview failed for blob %s", blob_id)
+        status = "failed"
+    try:
+        _finish(blob_id, status)
+    finally:
+        connections.close_all()
+
+
+def _finish(blob_id, status):
+    blob = Blob.objects.filter(id=blob_id).only("file").first()
+    if blob is None:
+        return
+    fields = {"preview_status": status}
+    if status == "ready":
+        fields["preview"] = preview_name(blob.file.name)
+    Blob.objects.filter(id=blob_id, preview_status="pending").update(**fields)
+    if status == "ready":
+        _broadcast(blob_id)
+
+
+def _broadcast(blob_id):
+    rows = Attachment.objects.filter(blob_id=blob_id).values_list("id", "task_id", "task__board_id")
+    if not rows:
+        return
+    async_to_sync(group_send_many)(get_channel_layer(), [
+        (f"board_{board_id}", {"type": "board_update", "data": {
+            "type": "attachment_preview", "attachment_id": attach_id, "task_id": task_id,
+            "preview_url": reverse("attachment_preview", args=[attach_id]),
+        }})
+        for attach_id, task_id, board_id in rows
+    ])
+
+
+@receiver(post_save, sender=Attachment)
+def attachment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(lambda: queue_preview(instance))
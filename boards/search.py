@@ -0,0 +1,167 @@
+"""
+Full-text search over tasks, subtasks and comments.
+
+Everything lives in one SQLite FTS5 table, ``boards_search``, created by
+migration 0006. Rows are kept in sync by the signal receivers below and can
+be rebuilt from scratch with ``manage.py rebuild_search_index``.
+
+Each row's rowid encodes what it indexes (``id * 4 + kind``), so updating or
+removing one document is a point write rather than a scan of the index.
+"""
+import re
+
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.html import escape
+
+from .models import Comment, SubTask, Task
+
+TABLE = "boards_search"
+
+KIND_TASK, KIND_SUBTASK, KIND_COMMENT = 1, 2, 3
+KIND_NAMES = {KIND_TASK: "task", KIND_SUBTASK: "subtask", KIND_COMMENT: "comment"}
+
+# Snippet markers that can't appear in user text, swapped for <mark> after escaping
+_OPEN, _CLOSE = "\x02", "\x03"
+
+
+def doc_id(kind, pk):
+    return pk * 4 + kind
+
+
+def _upsert(kind, pk, title, body, task_id, board_id):
+    # One statement, so two requests saving the same row can't interleave
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {TABLE} (rowid, title, body, kind, task_id, board_id) "
+            f"VALUES (%s, %s, %s, %s, %s, %s)",
+            [doc_id(kind, pk), title, body, kind, task_id, board_id],
+        )
+
+
+def _remove(kind, pk):
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE rowid = %s", [doc_id(kind, pk)])
+
+
+# --- Keeping the index in sync ---
+
+@receiver(post_save, sender=Task)
+def index_task(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _upsert(KIND_TASK, instance.id, instance.title, instance.description, instance.id, instance.board_id)
+
+
+@receiver(post_save, sender=SubTask)
+def index_subtask(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _upsert(KIND_SUBTASK, instance.id, instance.title, "", instance.task_id, instance.task.board_id)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _upsert(KIND_COMMENT, instance.id, "", instance.content, instance.task_id, instance.task.board_id)
+
+
+@receiver(post_delete, sender=Task)
+def unindex_task(sender, instance, **kwargs):
+    _remove(KIND_TASK, instance.id)
+
+
+@receiver(post_delete, sender=SubTask)
+def unindex_subtask(sender, instance, **kwargs):
+    _remove(KIND_SUBTASK, instance.id)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    _remove(KIND_COMMENT, instance.id)
+
+
+def rebuild_index():
+    """Throw the index away and rebuild it with three INSERT ... SELECTs."""
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+        _insert_documents(cursor)
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLE}")
+        return cursor.fetchone()[0]
+
+
+def reindex_tasks(task_ids):
+    """Index ``task_ids`` with their subtasks and comments, e.g. rows written by bulk_create."""
+    task_ids = [int(pk) for pk in task_ids]
+    if task_ids:
+        with connection.cursor() as cursor:
+            _insert_documents(cursor, f"IN ({', '.join(map(str, task_ids))})")
+
+
+def _insert_documents(cursor, task_filter=None):
+    """Index every task, subtask and comment, or those whose task id matches ``task_filter``."""
+    task_table = Task._meta.db_table
+    where = f"WHERE t.id {task_filter}" if task_filter else ""
+    cursor.execute(
+        f"INSERT OR REPLACE INTO {TABLE} (rowid, title, body, kind, task_id, board_id) "
+        f"SELECT t.id * 4 + {KIND_TASK}, t.title, t.description, {KIND_TASK}, t.id, t.board_id "
+        f"FROM {task_table} t {where}"
+    )
+    cursor.execute(
+        f"INSERT OR REPLACE INTO {TABLE} (rowid, title, body, kind, task_id, board_id) "
+        f"SELECT s.id * 4 + {KIND_SUBTASK}, s.title, '', {KIND_SUBTASK}, s.task_id, t.board_id "
+        f"FROM {SubTask._meta.db_table} s JOIN {task_table} t ON t.id = s.task_id {where}"
+    )
+    cursor.execute(
+        f"INSERT OR REPLACE INTO {TABLE} (rowid, title, body, kind, task_id, board_id) "
+        f"SELECT c.id * 4 + {KIND_COMMENT}, '', c.content, {KIND_COMMENT}, c.task_id, t.board_id "
+        f"FROM {Comment._meta.db_table} c JOIN {task_table} t ON t.id = c.task_id {where}"
+    )
+
+
+# --- Querying ---
+
+def build_match(query):
+    """
+    Turn free text into a safe FTS5 query: every word must match, the last
+    one as a prefix so results show up while the user is still typing.
+    """
+    terms = re.findall(r"\w+", query or "")
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _highlight(snippet):
+    return escape(snippet).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
+
+
+def search_board(board, query, limit=50):
+    """Best matches on one board, titles weighted ten times over body text."""
+    match = build_match(query)
+    if match is None:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT kind, task_id, rowid, "
+            f"snippet({TABLE}, -1, %s, %s, '…', 12), bm25({TABLE}, 10.0, 1.0) AS score "
+            f"FROM {TABLE} WHERE {TABLE} MATCH %s AND board_id = %s "
+            f"ORDER BY score LIMIT %s",
+            [_OPEN, _CLOSE, match, board.id, limit],
+        )
+        rows = cursor.fetchall()
+
+    titles = dict(Task.objects.filter(id__in={row[1] for row in rows}).values_list("id", "title"))
+    return [
+        {
+            "kind": KIND_NAMES[kind],
+            "id": rowid // 4,
+            "task_id": task_id,
+            "task_title": titles.get(task_id, ""),
+            "snippet": _highlight(snippet),
+            "score": round(-score, 4),
+        }
+        for kind, task_id, rowid, snippet, score in rows
+    ]
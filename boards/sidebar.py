@@ -0,0 +1,165 @@
+"""
+Per-user sidebar cache.
+
+The sidebar (your teams, and the boards in them you belong to) is stored as
+a compact list of ids and names in two layers: an in-process LRU, and the
+Django cache so other workers can reuse it. Each user also has a version
+token in the Django cache. Invalidating a user swaps the token, so every
+process's LRU entry for them goes stale at once. That only holds if the
+Django cache is shared between processes (see CACHES in settings); with a
+per-process backend such as LocMemCache other workers keep their old entry.
+
+The receivers at the bottom invalidate exactly the users whose sidebar
+changed: membership changes on Team.members and Board.members, and boards
+or teams being created, renamed or deleted.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+
+from .models import Board, Team
+
+LRU_SIZE = getattr(settings, "SIDEBAR_CACHE_SIZE", 1024)
+TIMEOUT = getattr(settings, "SIDEBAR_CACHE_TIMEOUT", 3600)
+
+
+class LRUCache:
+    def __init__(self, size):
+        self.size = size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LRUCache(LRU_SIZE)
+
+
+def _version_key(user_id):
+    return f"sidebar:version:{user_id}"
+
+
+def _data_key(user_id, version):
+    return f"sidebar:{user_id}:{version}"
+
+
+def load_sidebar(user_id):
+    """The two queries the sidebar needs, flattened to plain data."""
+    teams = [
+        {"id": t["id"], "name": t["name"], "boards": []}
+        for t in Team.objects.filter(members=user_id).order_by("name").values("id", "name")
+    ]
+    boards = list(
+        Board.objects.filter(members=user_id).order_by("name").values("id", "name", "team_id")
+    )
+    by_team = {team["id"]: team for team in teams}
+    for board in boards:
+        if board["team_id"] in by_team:
+            by_team[board["team_id"]]["boards"].append({"id": board["id"], "name": board["name"]})
+    return {
+        "teams": teams,
+        "boards": [{"id": b["id"], "name": b["name"]} for b in boards],
+    }
+
+
+def get_sidebar(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = time.time_ns()
+        cache.set(_version_key(user_id), version, None)
+
+    cached = local_cache.get(user_id)
+    if cached and cached[0] == version:
+        return cached[1]
+
+    data = cache.get(_data_key(user_id, version))
+    if data is None:
+        data = load_sidebar(user_id)
+        cache.set(_data_key(user_id, version), data, TIMEOUT)
+    local_cache.set(user_id, (version, data))
+    return data
+
+
+def invalidate(user_ids):
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    _bump(user_ids)
+    # Again after commit, in case another request cached the old rows meanwhile
+    transaction.on_commit(lambda: _bump(user_ids))
+
+
+def _bump(user_ids):
+    version = time.time_ns()
+    cache.set_many({_version_key(uid): version for uid in user_ids}, None)
+    for uid in user_ids:
+        local_cache.pop(uid)
+
+
+# --- Invalidation ---
+
+def _member_ids(model, instance):
+    return model.members.through.objects.filter(
+        **{model._meta.model_name: instance}
+    ).values_list("user_id", flat=True)
+
+
+def _membership_changed(model, instance, action, reverse, pk_set):
+    if reverse:
+        # user.teams.add(...) / user.boards.remove(...): only that user changes
+        if action in ("post_add", "post_remove", "pre_clear"):
+            invalidate([instance.pk])
+    elif action in ("post_add", "post_remove"):
+        invalidate(pk_set or [])
+    elif action == "pre_clear":
+        invalidate(_member_ids(model, instance))
+
+
+@receiver(m2m_changed, sender=Team.members.through)
+def team_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _membership_changed(Team, instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Board.members.through)
+def board_members_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _membership_changed(Board, instance, action, reverse, pk_set)
+
+
+@receiver(post_save, sender=Board)
+@receiver(post_save, sender=Team)
+def sidebar_entry_saved(sender, instance, created, raw=False, **kwargs):
+    # A new board or team has no members until they're added, which invalidates
+    if not created and not raw:
+        invalidate(_member_ids(sender, instance))
+
+
+@receiver(pre_delete, sender=Board)
+@receiver(pre_delete, sender=Team)
+def sidebar_entry_deleted(sender, instance, **kwargs):
+    invalidate(_member_ids(sender, instance))
@@ -0,0 +1,157 @@
+"""
+Board snapshots.
+
+A snapshot is everything needed to draw one board (columns, cards, assignees,
+lock holders and subtask counts) loaded in a fixed number of queries, no
+matter how many columns, tasks or assignees the board has. Both the HTML
+board page and the JSON snapshot endpoint are rendered from it.
+"""
+from dataclasses import dataclass, field, asdict
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .locks import is_held
+from .models import Board, Column, Task, user_initials
+
+
+@dataclass
+class UserCard:
+    id: int
+    username: str
+    initials: str
+
+
+@dataclass
+class TaskCard:
+    id: int
+    title: str
+    priority: str
+    due_date: object
+    order: int
+    column_id: int
+    is_locked: bool
+    locked_by: str | None
+    subtasks_total: int
+    subtasks_done: int
+    assignees: list = field(default_factory=list)
+
+
+@dataclass
+class ColumnCard:
+    id: int
+    title: str
+    order: int
+    tasks: list = field(default_factory=list)
+
+
+@dataclass
+class BoardSnapshot:
+    id: int
+    name: str
+    description: str
+    owner_id: int
+    columns: list = field(default_factory=list)
+    members: list = field(default_factory=list)
+
+    @property
+    def member_ids(self):
+        return {m.id for m in self.members}
+
+    def as_dict(self):
+        return asdict(self)
+
+
+CARD_FIELDS = (
+    "id", "title", "priority", "due_date", "order", "column_id", "is_locked",
+    "lock_expires_at", "locked_by__username", "subtasks_total", "subtasks_done",
+)
+
+
+def _task_card(row, assignees, now):
+    # Expired leases read as unlocked without waiting for the sweeper
+    locked = is_held(row["is_locked"], row["lock_expires_at"], now)
+    return TaskCard(
+        id=row["id"],
+        title=row["title"],
+        priority=row["priority"],
+        due_date=row["due_date"],
+        order=row["order"],
+        column_id=row["column_id"],
+        is_locked=locked,
+        locked_by=row["locked_by__username"] if locked else None,
+        subtasks_total=row["subtasks_total"],
+        subtasks_done=row["subtasks_done"],
+        assignees=sorted(assignees, key=lambda u: u.id),
+    )
+
+
+def task_card(task_id):
+    """
+    One task's card as a JSON-ready dict, for board events that add or
+    redraw a single card.
+    """
+    row = Task.objects.filter(id=task_id).values(*CARD_FIELDS).get()
+    assignees = [
+        UserCard(id=u.id, username=u.username, initials=user_initials(u))
+        for u in User.objects.filter(tasks=task_id).only("id", "username", "first_name", "last_name")
+    ]
+    card = asdict(_task_card(row, assignees, timezone.now()))
+    card["due_date"] = card["due_date"].isoformat() if card["due_date"] else None
+    return card
+
+
+def build_board_snapshot(board):
+    """Load a board into a BoardSnapshot using five queries."""
+    if not isinstance(board, Board):
+        board = Board.objects.get(id=board)
+
+    # 1. Columns
+    columns = {
+        c["id"]: ColumnCard(id=c["id"], title=c["title"], order=c["order"])
+        for c in Column.objects.filter(board=board)
+        .order_by("order", "id")
+        .values("id", "title", "order")
+    }
+
+    # 2. Tasks, with lock holder joined in; subtask counts are kept on the row
+    task_rows = Task.objects.filter(board=board).values(*CARD_FIELDS).order_by("order", "id")
+
+    # 3. Assignments and 4. board membership, straight from the M2M tables
+    assignments = list(
+        Task.assigned_to.through.objects.filter(task__board=board)
+        .values_list("task_id", "user_id")
+    )
+    member_ids = list(
+        Board.members.through.objects.filter(board=board)
+        .values_list("user_id", flat=True)
+    )
+
+    # 5. Every user referenced by the board, fetched once
+    user_ids = {uid for _, uid in assignments} | set(member_ids)
+    users = {
+        u.id: UserCard(id=u.id, username=u.username, initials=user_initials(u))
+        for u in User.objects.filter(id__in=user_ids).only(
+            "id", "username", "first_name", "last_name"
+        )
+    }
+
+    assignees_by_task = {}
+    for task_id, user_id in assignments:
+        assignees_by_task.setdefault(task_id, []).append(users[user_id])
+
+    now = timezone.now()
+    for row in task_rows:
+        column = columns.get(row["column_id"])
+        if column is None:
+            continue
+        column.tasks.append(_task_card(row, assignees_by_task.get(row["id"], []), now))
+
+    return BoardSnapshot(
+        id=board.id,
+        name=board.name,
+        description=board.description,
+        owner_id=board.owner_id,
+        columns=list(columns.values()),
+        members=sorted((users[uid] for uid in member_ids), key=lambda u: u.username),
+    )
@@ -17,13 +17,18 @@ function dropTask(ev) {
     const columnId = columnElement.getAttribute("data-column-id");
     const taskList = columnElement.querySelector(".kanban-tasks");
 
-    // Move visually immediately for the current user
-    taskList.appendChild(taskElement);
+    // Move visually immediately for the current user, at the drop position
+    const below = cardBelow(taskList, ev.clientY, taskElement);
+    taskList.insertBefore(taskElement, below);
 
-    // Save to Database via AJAX
+    // Save to Database via AJAX, with the cards it now sits between
     const formData = new FormData();
     formData.append("task_id", taskId);
     formData.append("new_column_id", columnId);
+    const prev = siblingCard(taskElement, "previousElementSibling");
+    const next = siblingCard(taskElement, "nextElementSibling");
+    if (prev) formData.append("prev_id", prev.dataset.taskId);
+    if (next) formData.append("next_id", next.dataset.taskId);
 
     fetch("/boards/move-task/", {
         method: "POST",
@@ -36,19 +41,30 @@ function dropTask(ev) {
     .then(data => {
         if (data.success) {
             console.log("Task moved and saved to DB");
-            // TRIGGER WEBSOCKET BROADCAST (Step 7 Logic)
-            if (window.boardSocket) {
-                window.boardSocket.send(JSON.stringify({
-                    'type': 'task_moved',
-                    'task_id': taskId,
-                    'new_column_id': columnId
-                }));
-            }
+            taskElement.dataset.order = data.order;
+            // The server broadcasts task_moved to everyone else on the board
         }
     })
     .catch(error => console.error("Error moving task:", error));
 }
 
+// First card whose middle is below the cursor, or null to append at the end
+function cardBelow(taskList, y, dragged) {
+    const cards = [...taskList.querySelectorAll(".kanban-task")].filter(el => el !== dragged);
+    return cards.find(el => {
+        const box = el.getBoundingClientRect();
+        return y < box.top + box.height / 2;
+    }) || null;
+}
+
+function siblingCard(el, direction) {
+    let sibling = el[direction];
+    while (sibling && !sibling.classList.contains("kanban-task")) {
+        sibling = sibling[direction];
+    }
+    return sibling;
+}
+
 function getCSRFToken() {
     let cookieValue = null;
     if (document.cookie && document.cookie !== '') {
@@ -4,13 +4,65 @@ const board_id = typeof boardId !== 'undefined' ? boardId : null;
 
 if (board_id) {
     const ws_scheme = window.location.protocol === "https:" ? "wss" : "ws";
-    window.boardSocket = new WebSocket(
-        ws_scheme + '://' + window.location.host + '/ws/boards/' + board_id + '/'
-    );
+    // Highest board version applied so far; logged events carry one
+    let boardVersion = typeof initialBoardVersion !== 'undefined' ? initialBoardVersion : 0;
+    // Live events held back while a catch-up request is in flight
+    let heldEvents = null;
+    let retryDelay = 1000;
 
-    window.boardSocket.onmessage = function(e) {
-        const data = JSON.parse(e.data);
-        console.log("WebSocket Message Received:", data);
+    function connectBoardSocket() {
+        window.boardSocket = new WebSocket(
+            ws_scheme + '://' + window.location.host + '/ws/boards/' + board_id + '/'
+        );
+
+        window.boardSocket.onopen = function() {
+            retryDelay = 1000;
+            catchUp();
+        };
+
+        window.boardSocket.onmessage = function(e) {
+            const payload = JSON.parse(e.data);
+            console.log("WebSocket Message Received:", payload);
+            // Batched frames carry an array of events, unbatched ones a single event
+            const events = Array.isArray(payload) ? payload : [payload];
+            if (heldEvents) heldEvents.push(...events);
+            else events.forEach(handleBoardEvent);
+        };
+
+        window.boardSocket.onclose = function(e) {
+            console.error('Board socket closed, reconnecting');
+            setTimeout(connectBoardSocket, retryDelay);
+            retryDelay = Math.min(retryDelay * 2, 30000);
+        };
+    }
+
+    // Fetch only what changed since the last version we applied
+    function catchUp() {
+        heldEvents = [];
+        const since = boardVersion;
+        fetch(`/boards/${board_id}/events.json?since=${since}`, { credentials: "same-origin" })
+            .then(r => r.json())
+            .then(body => {
+                if (body.snapshot) {
+                    // Too far behind for the log: start from a fresh page
+                    window.location.reload();
+                    return;
+                }
+                body.events.forEach(handleBoardEvent);
+                releaseHeld(body.version);
+            })
+            .catch(() => releaseHeld(since));
+    }
+
+    function releaseHeld(version) {
+        const held = heldEvents;
+        heldEvents = null;
+        // The catch-up already covered anything up to its version
+        held.filter(data => !data.version || data.version > version).forEach(handleBoardEvent);
+    }
+
+    function handleBoardEvent(data) {
+        if (data.version) boardVersion = Math.max(boardVersion, data.version);
 
         // Handle Task Moved
         if (data.type === "task_moved") {
@@ -18,10 +70,45 @@ if (board_id) {
             const taskEl = document.querySelector(`[data-task-id='${data.task_id}']`);
             const targetCol = document.querySelector(`[data-column-id='${data.new_column_id}'] .kanban-tasks`);
             if (taskEl && targetCol) {
-                targetCol.appendChild(taskEl);
+                taskEl.dataset.order = data.order;
+                placeCard(taskEl, targetCol);
+            }
+        }
+
+        // Handle a card being added or edited (fields, assignees, subtask progress)
+        if (data.type === "task_created" || data.type === "task_updated") {
+            const targetCol = document.querySelector(`[data-column-id='${data.task.column_id}'] .kanban-tasks`);
+            const existing = document.querySelector(`[data-task-id='${data.task.id}']`);
+            const card = renderCard(data.task);
+            if (existing) existing.replaceWith(card);
+            if (targetCol) placeCard(card, targetCol);
+        }
+
+        // Handle Task Deleted
+        if (data.type === "task_deleted") {
+            const el = document.querySelector(`[data-task-id='${data.task_id}']`);
+            if (el) el.remove();
+        }
+
+        // Handle a whole column being renumbered
+        if (data.type === "column_reordered") {
+            const targetCol = document.querySelector(`[data-column-id='${data.column_id}'] .kanban-tasks`);
+            if (targetCol) {
+                data.task_ids.forEach((id, i) => {
+                    const el = document.querySelector(`[data-task-id='${id}']`);
+                    if (el) {
+                        el.dataset.order = (i + 1) * 1024;
+                        targetCol.appendChild(el);
+                    }
+                });
             }
         }
 
+        // Handle one action applied to many cards at once
+        if (data.type === "tasks_bulk") {
+            applyBulk(data);
+        }
+
         // Handle Task Locking
         if (data.type === "task_locked") {
             const el = document.querySelector(`[data-task-id='${data.task_id}']`);
@@ -33,9 +120,116 @@ if (board_id) {
             const el = document.querySelector(`[data-task-id='${data.task_id}']`);
             if (el) el.classList.remove("locked");
         }
-    };
+    }
+
+    // Keep cards sorted by their order value
+    function placeCard(card, targetCol) {
+        // Drop the "No tasks" placeholder of an empty column
+        targetCol.querySelectorAll(":scope > :not(.kanban-task)").forEach(el => el.remove());
+        const order = Number(card.dataset.order);
+        const after = [...targetCol.querySelectorAll(".kanban-task")]
+            .find(el => el !== card && Number(el.dataset.order) > order);
+        targetCol.insertBefore(card, after || null);
+    }
+
+    function avatarFor(user) {
+        const avatar = document.createElement("div");
+        avatar.className = "avatar";
+        avatar.dataset.userId = user.id;
+        avatar.title = user.username;
+        avatar.textContent = user.initials;
+        avatar.style.cssText = "width: 24px; height: 24px; background: #004aad; color: white; " +
+            "border-radius: 50%; display: flex; align-items: center; justify-content: center; font-size: 0.7rem;";
+        return avatar;
+    }
+
+    // The same markup board_detail.html draws for a card
+    function renderCard(task) {
+        const card = document.createElement("div");
+        card.className = `kanban-task priority-${task.priority}` + (task.is_locked ? " locked" : "");
+        card.draggable = true;
+        card.dataset.taskId = task.id;
+        card.dataset.order = task.order;
+        card.setAttribute("ondragstart", "dragTask(event)");
+
+        const avatars = document.createElement("div");
+        avatars.className = "avatars";
+        avatars.style.cssText = "display: flex; gap: 4px; margin-bottom: 8px";
+        task.assignees.forEach(user => avatars.appendChild(avatarFor(user)));
+        card.appendChild(avatars);
+
+        const title = document.createElement("strong");
+        const link = document.createElement("a");
+        link.href = `/boards/task/${task.id}/`;
+        link.style.cssText = "color: #333; text-decoration: none";
+        link.textContent = task.title;
+        title.appendChild(link);
+        card.appendChild(title);
+
+        const footer = document.createElement("div");
+        footer.style.cssText = "margin-top: 10px; display: flex; justify-content: space-between; align-items: center";
+        const due = document.createElement("span");
+        due.style.cssText = "font-size: 0.7rem; color: #888";
+        due.textContent = `Due: ${task.due_date || "—"}`;
+        const edit = document.createElement("a");
+        edit.href = `/boards/task/${task.id}/edit/`;
+        edit.className = "btn-small";
+        edit.style.cssText = "padding: 2px 8px; font-size: 0.7rem";
+        edit.textContent = "Edit";
+        footer.append(due, edit);
+        card.appendChild(footer);
+
+        if (task.subtasks_total) {
+            const progress = document.createElement("div");
+            progress.className = "progress-bar-container";
+            progress.title = `${task.subtasks_done}/${task.subtasks_total} subtasks done`;
+            const bar = document.createElement("div");
+            bar.className = "progress-bar";
+            bar.style.width = `${Math.round(task.subtasks_done / task.subtasks_total * 100)}%`;
+            progress.appendChild(bar);
+            card.appendChild(progress);
+        }
+        return card;
+    }
+
+    function applyBulk(data) {
+        const cards = data.task_ids
+            .map(id => document.querySelector(`[data-task-id='${id}']`))
+            .filter(Boolean);
+
+        if (data.action === "move") {
+            const targetCol = document.querySelector(`[data-column-id='${data.new_column_id}'] .kanban-tasks`);
+            cards.forEach((el, i) => {
+                el.dataset.order = data.orders[i];
+                if (targetCol) targetCol.appendChild(el);
+            });
+        }
+        if (data.action === "delete") {
+            cards.forEach(el => el.remove());
+        }
+        if (data.action === "priority") {
+            cards.forEach(el => {
+                el.classList.remove("priority-low", "priority-medium", "priority-high");
+                el.classList.add(`priority-${data.priority}`);
+            });
+        }
+        if (data.action === "due_date") {
+            cards.forEach(el => {
+                const due = [...el.querySelectorAll("span")].find(s => s.textContent.startsWith("Due:"));
+                if (due) due.textContent = `Due: ${data.due_date || "—"}`;
+            });
+        }
+        if (data.action === "assign" || data.action === "unassign") {
+            cards.forEach(el => {
+                const avatars = el.querySelector(".avatars");
+                const existing = avatars && avatars.querySelector(`[data-user-id='${data.user.id}']`);
+                if (data.action === "unassign" && existing) existing.remove();
+                if (data.action === "assign" && avatars && !existing) {
+                    avatars.appendChild(avatarFor(data.user));
+                }
+            });
+        }
+    }
 
-    window.boardSocket.onclose = function(e) {
-        console.error('Board socket closed unexpectedly');
-    };
+    connectBoardSocket();
 }
\ No newline at end of file
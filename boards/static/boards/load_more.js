@@ -0,0 +1,28 @@
+// --- "Load more" for paginated lists ---
+// The link points at the next page of the same view, so without JavaScript
+// it simply navigates. With it, we fetch that page and append its items.
+document.addEventListener("click", function (ev) {
+    const link = ev.target.closest("a.load-more");
+    if (!link) return;
+    ev.preventDefault();
+    link.textContent = "Loading…";
+
+    fetch(link.href)
+        .then(response => response.text())
+        .then(html => {
+            const next = new DOMParser().parseFromString(html, "text/html");
+            const list = document.querySelector("[data-page-list]");
+            const nextList = next.querySelector("[data-page-list]");
+            if (list && nextList) {
+                list.append(...nextList.children);
+            }
+            const nextLink = next.querySelector("a.load-more");
+            if (nextLink) {
+                link.href = nextLink.getAttribute("href");
+                link.textContent = "Load more";
+            } else {
+                link.remove();
+            }
+        })
+        .catch(() => { link.textContent = "Load more"; });
+});
@@ -0,0 +1,135 @@
+"""
+WebSocket consumer telemetry.
+
+The consumers report connects and disconnects, and how long each event took
+to reach the socket. That splits into time in the channel layer (from the
+group_send stamp to the consumer's handler) and time in the socket write.
+They also report how many events were waiting per connection when a frame
+went out, and how big the frames were. Everything lands in the shared
+registry, so it shows up on ``/metrics``.
+
+Deliveries slower than WS_SLOW_DELIVERY_MS go into a small ring buffer,
+served as JSON by the ``websocket_slow_deliveries`` view.
+
+Connection metrics are labelled by group kind (``board``, ``notif``), not by
+the group itself. Every board and user has its own group, so labelling by
+group would add a time series per board or user ever connected and grow
+without bound. The cost is that /metrics can't say which board is busy; the
+slow-delivery log keeps the full group name for that.
+"""
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from .metrics import Counter, Gauge, Histogram, registry
+
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+DEPTH_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 500)
+
+connects = registry.add(Counter(
+    "boards_ws_connects_total", "WebSocket connections accepted, by group kind.", ["consumer", "group_kind"]))
+disconnects = registry.add(Counter(
+    "boards_ws_disconnects_total", "WebSocket connections closed, by group kind.", ["consumer", "group_kind"]))
+open_connections = registry.add(Gauge(
+    "boards_ws_open_connections", "Connections currently open, by group kind.", ["group_kind"]))
+layer_seconds = registry.add(Histogram(
+    "boards_ws_layer_latency_seconds", "From group_send to the consumer handling the event.", ["consumer"]))
+send_seconds = registry.add(Histogram(
+    "boards_ws_send_seconds", "Time spent writing one frame to the socket.", ["consumer"]))
+delivery_seconds = registry.add(Histogram(
+    "boards_ws_delivery_seconds", "From group_send to the frame carrying the event being written.", ["consumer"]))
+pending_depth = registry.add(Histogram(
+    "boards_ws_pending_depth", "Events waiting on one connection when a frame went out.", ["consumer"],
+    buckets=DEPTH_BUCKETS))
+pending_events = registry.add(Gauge(
+    "boards_ws_pending_events", "Events received but not yet written, across connections.", ["consumer"]))
+message_bytes = registry.add(Histogram(
+    "boards_ws_message_bytes", "Size of each frame sent.", ["consumer"], buckets=SIZE_BUCKETS))
+
+
+class SlowDeliveries:
+    """The last few slow deliveries, for a quick look when boards feel laggy."""
+
+    def __init__(self, size):
+        self._lock = threading.Lock()
+        self.entries = deque(maxlen=size)
+
+    def add(self, entry):
+        with self._lock:
+            self.entries.append(entry)
+
+    def recent(self):
+        with self._lock:
+            return list(reversed(self.entries))
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+slow_deliveries = SlowDeliveries(getattr(settings, "WS_SLOW_LOG_SIZE", 100))
+
+
+def group_kind(group):
+    """``board_12`` -> ``board``: the group name without its per-board or per-user id."""
+    prefix, _, suffix = group.rpartition("_")
+    return prefix if prefix and suffix.isdigit() else group
+
+
+def connected(consumer, group):
+    kind = group_kind(group)
+    connects.inc(consumer, kind)
+    open_connections.inc(kind)
+
+
+def disconnected(consumer, group):
+    kind = group_kind(group)
+    disconnects.inc(consumer, kind)
+    open_connections.inc(kind, amount=-1)
+
+
+def received(consumer, event):
+    """Call from the handler. Returns a stamp to pass back to ``delivered``."""
+    now = time.time()
+    sent_at = event.get("sent_at")
+    if sent_at:
+        layer_seconds.observe(consumer, value=max(now - sent_at, 0))
+    pending_events.inc(consumer)
+    return (sent_at or now, now)
+
+
+def delivered(consumer, group, stamps, event_types, size, send_began, send_ended):
+    """One frame carrying the events behind ``stamps`` went out."""
+    write = send_ended - send_began
+    send_seconds.observe(consumer, value=write)
+    message_bytes.observe(consumer, value=size)
+    pending_depth.observe(consumer, value=len(stamps))
+    pending_events.inc(consumer, amount=-len(stamps))
+
+    now = time.time()
+    threshold = getattr(settings, "WS_SLOW_DELIVERY_MS", 250) / 1000
+    slowest = 0
+    for sent_at, handled_at in stamps:
+        latency = max(now - sent_at, 0)
+        delivery_seconds.observe(consumer, value=latency)
+        slowest = max(slowest, latency)
+    if slowest >= threshold:
+        oldest = min(stamps)
+        slow_deliveries.add({
+            "at": now,
+            "consumer": consumer,
+            "group": group,
+            "events": event_types,
+            "delivery_ms": round(slowest * 1000, 1),
+            "layer_ms": round(max(oldest[1] - oldest[0], 0) * 1000, 1),
+            "send_ms": round(write * 1000, 1),
+            "depth": len(stamps),
+            "bytes": size,
+        })
+
+
+def discarded(consumer, count):
+    """Events that were pending on a connection that closed first."""
+    pending_events.inc(consumer, amount=-count)
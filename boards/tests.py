@@ -1,3 +1,1360 @@
-from django.test import TestCase
+import asyncio
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connection, connections, transaction
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from django.utils import timezone
+
+from . import analytics, archive, dashboard, events, locks, ndjson, uploads
+from .broadcast import batch_stats
+from .consumers import BoardConsumer, NotificationConsumer
+from .db.base import ConnectionPool, DatabaseWrapper, get_pool
+from .db.routers import ReadWriteRouter, reading
+from .layers import SQLiteChannelLayer
+from .models import ArchivedTask, Attachment, Blob, Board, BoardEvent, Column, Comment, Notification, NotificationCounter, SubTask, Task, TaskTransition, Team, UploadSession
+from .sidebar import local_cache
+from .ordering import ORDER_GAP, place_task
+from .pagination import decode_cursor, keyset_page
+from .search import build_match, rebuild_index, search_board
+from .snapshot import build_board_snapshot
+from .downloads import parse_range
+from .previews import queue_preview
+from . import middleware as query_metrics
+from . import telemetry
+from .uploads import part_path
+
+# The configured cache is shared with any dev server on this checkout, and
+# test databases reuse ids, so tests get a private in-memory cache instead
+_private_cache = override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+
+
+def setUpModule():
+    _private_cache.enable()
+
+
+def tearDownModule():
+    _private_cache.disable()
+
+
+class BoardSnapshotTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="pw", first_name="Ada", last_name="Lovelace")
+        self.board = Board.objects.create(name="Sprint", owner=self.owner)
+        self.board.members.add(self.owner)
+        self.client.force_login(self.owner)
+
+    def grow_board(self, n):
+        columns = list(self.board.columns.all())
+        for i in range(n):
+            user = User.objects.create_user(f"user{User.objects.count()}")
+            self.board.members.add(user)
+            task = Task.objects.create(
+                title=f"Task {i}", board=self.board, column=columns[i % len(columns)],
+                is_locked=bool(i % 2), locked_by=user if i % 2 else None,
+                lock_expires_at=timezone.now() + timedelta(minutes=5),
+            )
+            task.assigned_to.add(user, self.owner)
+            SubTask.objects.create(task=task, title="a", is_completed=True)
+            SubTask.objects.create(task=task, title="b")
+
+    def count_queries(self, func):
+        with CaptureQueriesContext(connection) as ctx:
+            func()
+        return len(ctx.captured_queries)
+
+    def test_snapshot_contents(self):
+        self.grow_board(3)
+        snapshot = build_board_snapshot(self.board)
+        self.assertEqual([c.title for c in snapshot.columns], ["To Do", "In Progress", "Done"])
+        card = snapshot.columns[1].tasks[0]
+        self.assertEqual(card.title, "Task 1")
+        self.assertTrue(card.is_locked)
+        self.assertEqual(card.locked_by, card.assignees[1].username)
+        self.assertEqual((card.subtasks_done, card.subtasks_total), (1, 2))
+        self.assertEqual(card.assignees[0].initials, "AL")
+        self.assertEqual(len(snapshot.members), 4)
+
+    def test_snapshot_query_count_is_constant(self):
+        self.grow_board(2)
+        small = self.count_queries(lambda: build_board_snapshot(self.board))
+        self.grow_board(25)
+        large = self.count_queries(lambda: build_board_snapshot(self.board))
+        self.assertEqual(small, large)
+
+    def test_board_detail_query_count_is_constant(self):
+        url = reverse("board_detail", args=[self.board.id])
+        self.client.get(url)  # warm the sidebar cache
+        self.grow_board(2)
+        small = self.count_queries(lambda: self.client.get(url))
+        self.grow_board(25)
+        large = self.count_queries(lambda: self.client.get(url))
+        self.assertEqual(small, large)
+
+    def test_snapshot_json(self):
+        self.grow_board(1)
+        response = self.client.get(reverse("board_snapshot", args=[self.board.id]))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["id"], self.board.id)
+        self.assertEqual(data["columns"][0]["tasks"][0]["title"], "Task 0")
+
+    def test_snapshot_requires_membership(self):
+        outsider = User.objects.create_user("outsider")
+        self.client.force_login(outsider)
+        response = self.client.get(reverse("board_snapshot", args=[self.board.id]))
+        self.assertEqual(response.status_code, 404)
+
+
+class OrderingTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner")
+        self.board = Board.objects.create(name="Sprint", owner=self.owner)
+        self.board.members.add(self.owner)
+        self.client.force_login(self.owner)
+        self.todo, self.doing, _ = self.board.columns.all()
+        self.tasks = [
+            Task.objects.create(title=f"T{i}", board=self.board, column=self.todo, order=(i + 1) * ORDER_GAP)
+            for i in range(3)
+        ]
+
+    def column_titles(self, column):
+        return list(column.tasks.order_by("order", "id").values_list("title", flat=True))
+
+    def test_drop_between_writes_only_moved_row(self):
+        a, b, c = self.tasks
+        with CaptureQueriesContext(connection) as ctx:
+            place_task(c, self.todo, prev_id=a.id, next_id=b.id)
+        self.assertEqual(self.column_titles(self.todo), ["T0", "T2", "T1"])
+        writes = [q for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(writes), 1)
+
+    def test_exhausted_gap_rebalances_column(self):
+        a, b, c = self.tasks
+        Task.objects.filter(id=b.id).update(order=a.order + 1)
+        place_task(c, self.todo, prev_id=a.id, next_id=b.id)
+        self.assertEqual(self.column_titles(self.todo), ["T0", "T2", "T1"])
+        event = self.board.events.get()
+        self.assertEqual((event.data["type"], event.data["task_ids"]), ("column_reordered", [a.id, b.id]))
+
+    def test_stale_neighbour_drops_after_last_card(self):
+        a, b, c = self.tasks
+        moved = Task.objects.create(title="Elsewhere", board=self.board, column=self.doing)
+        order = place_task(a, self.todo, prev_id=moved.id, next_id=None)
+        self.assertEqual(order, c.order + ORDER_GAP)
+        self.assertEqual(self.column_titles(self.todo), ["T1", "T2", "T0"])
+
+    def test_move_task_to_other_column(self):
+        response = self.client.post(reverse("move_task"), {"task_id": self.tasks[1].id, "new_column_id": self.doing.id})
+        self.assertEqual(response.json()["order"], ORDER_GAP)
+        self.assertEqual(self.column_titles(self.doing), ["T1"])
+
+    def test_reorder_endpoint(self):
+        a, b, c = self.tasks
+        url = reverse("reorder", args=[self.board.id])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(url, {"column_id": self.doing.id, "task_ids": [c.id, a.id, b.id]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "boards_task"')]), 1)
+        self.assertEqual(self.column_titles(self.doing), ["T2", "T0", "T1"])
+
+        response = self.client.post(url, {"column_id": self.doing.id, "task_ids": [a.id, 999999]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.column_titles(self.doing), ["T2", "T0", "T1"])
+
+        # Unlisted cards follow the listed ones instead of colliding with them
+        self.client.post(url, {"column_id": self.doing.id, "task_ids": [b.id, c.id]})
+        self.assertEqual(self.column_titles(self.doing), ["T1", "T2", "T0"])
+        orders = list(self.doing.tasks.order_by("order").values_list("order", flat=True))
+        self.assertEqual(orders, [ORDER_GAP, 2 * ORDER_GAP, 3 * ORDER_GAP])
+        self.assertEqual(self.board.events.last().data["task_ids"], [b.id, c.id, a.id])
+
+
+class SQLiteChannelLayerTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "channels.sqlite3")
+
+    async def test_send_receive_and_capacity(self):
+        layer = SQLiteChannelLayer(path=self.path, capacity=2)
+        channel = await layer.new_channel()
+        await layer.send(channel, {"type": "a", "raw": b"\x00"})
+        await layer.send(channel, {"type": "b"})
+        with self.assertRaises(ChannelFull):
+            await layer.send(channel, {"type": "c"})
+        message = await layer.receive(channel)
+        self.assertAlmostEqual(message.pop("sent_at"), time.time(), delta=5)
+        self.assertEqual(message, {"type": "a", "raw": b"\x00"})
+        self.assertEqual((await layer.receive(channel))["type"], "b")
+        await layer.close()
+
+    async def test_queues_of_gone_channels_are_dropped_once_expired(self):
+        layer = SQLiteChannelLayer(path=self.path, expiry=0.5)
+        live, gone = await layer.new_channel(), await layer.new_channel()
+        await layer.send(gone, {"type": "never.received"})
+        await layer.send(live, {"type": "a"})
+        await asyncio.wait_for(layer.receive(live), 2)
+        self.assertIn(gone, layer._queues)
+        await asyncio.sleep(1.1)
+        await layer.send(live, {"type": "b"})
+        await asyncio.wait_for(layer.receive(live), 2)
+        self.assertEqual(layer._queues, {})
+        await layer.close()
+
+    async def test_group_send_reaches_other_layer_instances(self):
+        # Two layers on one file stand in for two worker processes
+        sender = SQLiteChannelLayer(path=self.path)
+        receiver = SQLiteChannelLayer(path=self.path)
+        first, second = await receiver.new_channel(), await receiver.new_channel()
+        await receiver.group_add("board_1", first)
+        await receiver.group_add("board_1", second)
+        await receiver.group_discard("board_1", second)
+
+        await sender.group_send("board_1", {"type": "board_update", "data": {"task_id": 1}})
+        message = await asyncio.wait_for(receiver.receive(first), 2)
+        self.assertEqual(message["data"], {"task_id": 1})
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(receiver.receive(second), 0.2)
+        await sender.close()
+        await receiver.close()
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    BOARD_BATCH_WINDOW_MS=20,
+)
+class BoardBatchingTests(SimpleTestCase):
+    async def test_events_are_merged_into_one_frame(self):
+        batch_stats.reset()
+        communicator = ApplicationCommunicator(BoardConsumer.as_asgi(), {
+            "type": "websocket", "path": "/ws/boards/7/",
+            "url_route": {"args": (), "kwargs": {"board_id": "7"}},
+        })
+        await communicator.send_input({"type": "websocket.connect"})
+        self.assertEqual((await communicator.receive_output(1))["type"], "websocket.accept")
+
+        layer = get_channel_layer()
+        for data in [
+            {"type": "task_moved", "task_id": 1, "new_column_id": 2},
+            {"type": "task_locked", "task_id": 3},
+            {"type": "task_moved", "task_id": 1, "new_column_id": 4},
+        ]:
+            await layer.group_send("board_7", {"type": "board_update", "data": data})
+
+        frame = json.loads((await communicator.receive_output(1))["text"])
+        self.assertEqual(frame, [
+            {"type": "task_locked", "task_id": 3},
+            {"type": "task_moved", "task_id": 1, "new_column_id": 4},
+        ])
+        # A client can't forge events for the rest of the board
+        await communicator.send_input({"type": "websocket.receive", "text": json.dumps({"type": "task_deleted", "task_id": 3})})
+        self.assertTrue(await communicator.receive_nothing(timeout=0.05))
+        self.assertEqual(batch_stats.as_dict()["events_per_frame"], 3.0)
+        await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+        await communicator.wait(1)
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class NotificationCounterTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user("author")
+        self.board = Board.objects.create(name="Sprint", owner=self.author)
+        self.task = Task.objects.create(title="Spec", board=self.board, column=self.board.columns.first())
+
+    def comment_queries(self, team_size):
+        users = [User.objects.create_user(f"u{User.objects.count()}") for _ in range(team_size)]
+        self.task.assigned_to.set(users + [self.author])
+        with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+            Comment.objects.create(task=self.task, author=self.author, content="hi")
+        return users, len(ctx.captured_queries)
+
+    def unread(self, user):
+        return NotificationCounter.objects.get(user=user).unread
+
+    def test_comment_costs_constant_queries(self):
+        _, small = self.comment_queries(2)
+        users, large = self.comment_queries(20)
+        self.assertEqual(small, large)
+        self.assertEqual(Notification.objects.filter(user__in=users).count(), 20)
+        self.assertEqual(self.unread(users[0]), 1)
+
+    def test_failed_counter_update_rolls_back_comment(self):
+        reader = User.objects.create_user("reader")
+        self.task.assigned_to.add(reader)
+        with mock.patch.object(NotificationCounter, "add", side_effect=DatabaseError("locked")):
+            with self.assertRaises(DatabaseError):
+                Comment.objects.create(task=self.task, author=self.author, content="hi")
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+    def test_read_clear_and_task_delete_keep_counter_in_step(self):
+        users, _ = self.comment_queries(1)
+        reader = users[0]
+        Comment.objects.create(task=self.task, author=self.author, content="again")
+        self.assertEqual(self.unread(reader), 2)
+
+        note = reader.notifications.first()
+        note.mark_read()
+        note.mark_read()
+        self.assertEqual(self.unread(reader), 1)
+
+        self.task.delete()
+        self.assertEqual(self.unread(reader), 0)
+
+        Notification.objects.create(user=reader, message="Invited")
+        self.assertEqual(self.unread(reader), 1)
+        self.client.force_login(reader)
+        self.client.get(reverse("clear_notifications"))
+        self.assertEqual(self.unread(reader), 0)
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class SearchTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user("owner")
+        self.board = Board.objects.create(name="Sprint", owner=self.owner)
+        self.board.members.add(self.owner)
+        self.other = Board.objects.create(name="Other", owner=self.owner)
+        column = self.board.columns.first()
+        self.task = Task.objects.create(title="Invoice export", description="CSV for <accounting>", board=self.board, column=column)
+        SubTask.objects.create(task=self.task, title="Write invoicing tests")
+        Comment.objects.create(task=self.task, author=self.owner, content="Exports should be streamed")
+        Task.objects.create(title="Invoice layout", board=self.other, column=self.other.columns.first())
+
+    def kinds(self, query):
+        return sorted(hit["kind"] for hit in search_board(self.board, query))
+
+    def test_search_is_ranked_and_board_scoped(self):
+        self.assertEqual(self.kinds("invoic"), ["subtask", "task"])
+        self.assertEqual(self.kinds("export"), ["comment", "task"])
+        # Title matches outrank body matches
+        self.assertEqual(search_board(self.board, "export")[0]["kind"], "task")
+        self.assertIn("&lt;<mark>accounting</mark>&gt;", search_board(self.board, "accounting")[0]["snippet"])
+
+    def test_index_follows_edits_deletes_and_rebuilds(self):
+        self.task.title = "Payroll export"
+        self.task.save()
+        self.assertEqual(self.kinds("payroll"), ["task"])
+        self.task.delete()
+        self.assertEqual(self.kinds("export"), [])
+        self.assertEqual(rebuild_index(), 1)
+
+    def test_build_match_escapes_syntax(self):
+        self.assertEqual(build_match('foo" OR bar*'), '"foo" "OR" "bar"*')
+        self.assertIsNone(build_match("  --- "))
+
+    def test_search_endpoint_requires_membership(self):
+        self.client.force_login(self.owner)
+        response = self.client.get(reverse("board_search_json", args=[self.board.id]), {"q": "invoice"})
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.client.force_login(User.objects.create_user("outsider"))
+        response = self.client.get(reverse("board_search_json", args=[self.board.id]), {"q": "invoice"})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class TaskLockTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice")
+        self.bob = User.objects.create_user("bob")
+        self.board = Board.objects.create(name="Sprint", owner=self.alice)
+        self.board.members.add(self.alice, self.bob)
+        self.task = Task.objects.create(title="Spec", board=self.board, column=self.board.columns.first())
+
+    def test_lease_blocks_others_until_released(self):
+        self.assertTrue(locks.acquire(self.task, self.alice).acquired)
+        lease = locks.acquire(Task.objects.get(id=self.task.id), self.bob)
+        self.assertFalse(lease.acquired)
+        self.assertEqual(lease.holder, "alice")
+        self.assertFalse(locks.release(self.task, self.bob))
+        self.assertTrue(locks.release(self.task, self.alice))
+        self.assertTrue(locks.acquire(self.task, self.bob).acquired)
+
+    def test_expired_lease_is_free_and_swept(self):
+        locks.acquire(self.task, self.alice)
+        Task.objects.filter(id=self.task.id).update(lock_expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertFalse(locks.renew(self.task, self.alice).acquired)
+        self.assertFalse(build_board_snapshot(self.board).columns[0].tasks[0].is_locked)
+        self.assertEqual(locks.expire_stale(), 1)
+        self.assertFalse(Task.objects.get(id=self.task.id).is_locked)
+
+    def test_edit_page_locks_and_save_unlocks(self):
+        self.client.force_login(self.alice)
+        url = reverse("edit_task", args=[self.task.id])
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.force_login(self.bob)
+        self.assertRedirects(self.client.get(url), reverse("board_detail", args=[self.board.id]))
+
+        self.client.force_login(self.alice)
+        self.client.post(url, {"title": "Spec v2", "column": self.task.column_id, "priority": "high"})
+        task = Task.objects.get(id=self.task.id)
+        self.assertEqual((task.title, task.is_locked, task.locked_by), ("Spec v2", False, None))
+
+    async def test_async_edit_page_broadcasts_lock_changes(self):
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add(f"board_{self.board.id}", channel)
+        await self.async_client.aforce_login(self.alice)
+        url = reverse("edit_task", args=[self.task.id])
+
+        self.assertEqual((await self.async_client.get(url)).status_code, 200)
+        self.assertEqual((await layer.receive(channel))["data"]["type"], "task_locked")
+        await self.async_client.post(url, {"title": "Spec v3", "column": self.task.column_id, "priority": "low"})
+        updated = (await layer.receive(channel))["data"]
+        self.assertEqual((updated["type"], updated["task"]["title"]), ("task_updated", "Spec v3"))
+        self.assertEqual((await layer.receive(channel))["data"]["type"], "task_unlocked")
+        self.assertEqual((await Task.objects.aget(id=self.task.id)).title, "Spec v3")
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class BulkTaskTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user("alice")
+        self.bob = User.objects.create_user("bob")
+        self.board = Board.objects.create(name="Sprint", owner=self.alice)
+        self.board.members.add(self.alice, self.bob)
+        self.todo, self.doing, _ = self.board.columns.all()
+        Task.objects.create(title="Old", board=self.board, column=self.doing, order=5 * ORDER_GAP)
+        self.tasks = [
+            Task.objects.create(title=f"T{i}", board=self.board, column=self.todo, order=(i + 1) * ORDER_GAP)
+            for i in range(5)
+        ]
+        self.ids = [t.id for t in self.tasks]
+        self.client.force_login(self.alice)
+
+    def bulk(self, action, value=None, ids=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse("bulk_tasks"), {
+                "action": action, "value": value or "", "task_ids": ids or self.ids,
+            })
+
+    async def board_events(self):
+        layer = get_channel_layer()
+        channel = await layer.new_channel()
+        await layer.group_add(f"board_{self.board.id}", channel)
+        return layer, channel
+
+    def test_move_is_one_update_and_one_event(self):
+        layer, channel = async_to_sync(self.board_events)()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.bulk("move", self.doing.id, ids=self.ids[::-1])
+        self.assertEqual(response.json(), {"success": True, "action": "move", "updated": 5})
+        self.assertEqual(len([q for q in ctx.captured_queries if q["sql"].startswith('UPDATE "boards_task"')]), 1)
+        titles = list(self.doing.tasks.order_by("order").values_list("title", flat=True))
+        self.assertEqual(titles, ["Old", "T0", "T1", "T2", "T3", "T4"])
+
+        event = async_to_sync(self.next_event)(layer, channel)
+        self.assertEqual((event["type"], event["task_ids"], event["orders"][0]), ("tasks_bulk", self.ids, 6 * ORDER_GAP))
+        self.assertIsNone(async_to_sync(self.next_event)(layer, channel))
+
+    async def next_event(self, layer, channel):
+        try:
+            return (await asyncio.wait_for(layer.receive(channel), 0.1))["data"]
+        except asyncio.TimeoutError:
+            return None
+
+    def test_field_updates_and_assignees(self):
+        self.bulk("priority", "high")
+        self.bulk("due_date", "2026-11-01")
+        self.bulk("assign", self.bob.id)
+        self.assertEqual(set(Task.objects.filter(id__in=self.ids).values_list("priority", "due_date")),
+                         {("high", timezone.datetime(2026, 11, 1).date())})
+        self.assertEqual(self.bob.tasks.count(), 5)
+        self.bulk("unassign", self.bob.id, ids=self.ids[:2])
+        self.assertEqual(self.bob.tasks.count(), 3)
+        self.assertEqual(self.bulk("priority", "urgent").status_code, 400)
+
+    def test_membership_is_checked_per_board(self):
+        other = Board.objects.create(name="Private", owner=self.bob)
+        hidden = Task.objects.create(title="Secret", board=other, column=other.columns.first())
+        response = self.bulk("delete", ids=[self.ids[0], hidden.id])
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Task.objects.filter(id__in=[self.ids[0], hidden.id]).count(), 2)
+        self.assertEqual(self.bulk("delete", ids=[999999]).status_code, 404)
+
+        self.assertEqual(self.bulk("delete").json()["updated"], 5)
+        self.assertFalse(Task.objects.filter(id__in=self.ids).exists())
+
+
+@override_settings(CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}})
+class BoardEventLogTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("alice")
+        self.board = Board.objects.create(name="Sprint", owner=self.user)
+        self.board.members.add(self.user)
+        self.todo, self.doing, _ = self.board.columns.all()
+        self.task = Task.objects.create(title="Spec", board=self.board, column=self.todo)
+        self.client.force_login(self.user)
+
+    def move(self, column):
+        return self.client.post(reverse("move_task"), {"task_id": self.task.id, "new_column_id": column.id})
+
+    def since(self, version):
+        return self.client.get(reverse("board_events", args=[self.board.id]), {"since": version}).json()
+
+    def test_changes_are_versioned_and_replayed(self):
+        layer = get_channel_layer()
+        channel = async_to_sync(layer.new_channel)()
+        async_to_sync(layer.group_add)(f"board_{self.board.id}", channel)
+        self.move(self.doing)
+        self.move(self.todo)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("reorder", args=[self.board.id]), {"column_id": self.todo.id, "task_ids": [self.task.id]})
+
+        self.assertEqual(async_to_sync(layer.receive)(channel)["data"]["version"], 1)
+        body = self.since(1)
+        self.assertEqual(body["version"], 3)
+        self.assertEqual([(e["version"], e["type"]) for e in body["events"]], [(2, "task_moved"), (3, "column_reordered")])
+        self.assertEqual(self.since(3), {"version": 3, "events": []})
+
+    def test_task_create_edit_and_delete_are_replayed(self):
+        self.client.post(reverse("add_task", args=[self.board.id]), {"title": "Draft", "column": self.todo.id, "priority": "low"})
+        task = Task.objects.get(title="Draft")
+        self.client.post(reverse("add_subtask", args=[task.id]), {"title": "Outline"})
+        self.client.post(reverse("edit_task", args=[task.id]), {"title": "Final", "column": self.doing.id, "priority": "high"})
+        self.client.get(reverse("delete_task", args=[task.id]))
+
+        body = self.since(0)
+        self.assertEqual([e["type"] for e in body["events"]], [
+            "task_created", "task_updated", "task_locked", "task_moved", "task_updated", "task_unlocked", "task_deleted",
+        ])
+        created, subtask, _, moved, edited, _, deleted = body["events"]
+        self.assertEqual((created["task"]["title"], created["task"]["column_id"]), ("Draft", self.todo.id))
+        self.assertEqual(subtask["task"]["subtasks_total"], 1)
+        self.assertEqual(moved["new_column_id"], self.doing.id)
+        self.assertEqual((edited["task"]["title"], edited["task"]["priority"]), ("Final", "high"))
+        self.assertEqual(deleted["task_id"], task.id)
+        self.assertEqual(body["version"], Board.objects.get(id=self.board.id).version)
+
+    def test_change_and_its_event_commit_together(self):
+        with mock.patch.object(events, "record", side_effect=DatabaseError("locked")):
+            with self.assertRaises(DatabaseError):
+                self.move(self.doing)
+            with self.assertRaises(DatabaseError):
+                self.client.get(reverse("edit_task", args=[self.task.id]))
+        self.task.refresh_from_db()
+        self.assertEqual((self.task.column, self.task.is_locked), (self.todo, False))
+        self.assertFalse(self.board.events.exists())
+
+    def test_compacted_log_falls_back_to_snapshot(self):
+        for column in (self.doing, self.todo, self.doing):
+            self.move(column)
+        self.assertEqual(call_command("compact_board_events", keep=1, stdout=io.StringIO()), None)
+        self.assertEqual(list(self.board.events.values_list("version", flat=True)), [3])
+        self.assertEqual(len(self.since(2)["events"]), 1)
+        body = self.since(1)
+        self.assertEqual(body["version"], 3)
+        self.assertEqual(body["snapshot"]["columns"][1]["tasks"][0]["id"], self.task.id)
+        self.assertIn("snapshot", self.since(99))
+
+
+class SidebarCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_cache.clear()
+        self.user = User.objects.create_user("member")
+        self.team = Team.objects.create(name="Core", owner=self.user)
+        self.team.members.add(self.user)
+        self.board = Board.objects.create(name="Roadmap", owner=self.user, team=self.team)
+        self.board.members.add(self.user)
+        self.client.force_login(self.user)
+
+    def sidebar_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("notifications"))
+        tables = ("boards_team", "boards_board")
+        return response, [q["sql"] for q in ctx.captured_queries if any(t in q["sql"] for t in tables)]
+
+    def test_second_page_view_issues_no_sidebar_queries(self):
+        response, first = self.sidebar_queries()
+        self.assertTrue(first)
+        self.assertContains(response, "Roadmap")
+        response, second = self.sidebar_queries()
+        self.assertEqual(second, [])
+        self.assertContains(response, "Roadmap")
+
+    def test_membership_and_renames_invalidate(self):
+        self.sidebar_queries()
+        other = Board.objects.create(name="Backlog", owner=self.user, team=self.team)
+        other.members.add(self.user)
+        self.assertContains(self.sidebar_queries()[0], "Backlog")
+
+        self.board.name = "Roadmap 2027"
+        self.board.save()
+        self.assertContains(self.sidebar_queries()[0], "Roadmap 2027")
+
+        self.user.teams.remove(self.team)
+        self.assertNotContains(self.sidebar_queries()[0], "Core")
+
+    def test_unrelated_users_stay_cached(self):
+        self.sidebar_queries()
+        stranger = User.objects.create_user("stranger")
+        Board.objects.create(name="Elsewhere", owner=stranger).members.add(stranger)
+        self.assertEqual(self.sidebar_queries()[1], [])
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("bot")
+        same_moment = timezone.now()
+        Notification.objects.bulk_create([
+            Notification(user=self.user, message=f"n{i}", is_read=i % 2 == 0) for i in range(7)
+        ])
+        # Ties on created_at must still page cleanly, on id
+        Notification.objects.update(created_at=same_moment)
+        self.client.force_login(self.user)
+
+    def test_pages_cover_everything_once(self):
+        seen, cursor = [], None
+        while True:
+            page = keyset_page(self.user.notifications.all(), cursor, size=3)
+            seen += [n.message for n in page.items]
+            if not page.has_more:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, [f"n{i}" for i in reversed(range(7))])
+
+    def test_json_endpoint_and_bad_cursor(self):
+        url = reverse("notifications_json")
+        data = self.client.get(url, {"unread": "1"}).json()
+        self.assertEqual([n["message"] for n in data["results"]], ["n5", "n3", "n1"])
+        self.assertIsNone(data["next_cursor"])
+        self.assertIsNone(decode_cursor("not-a-cursor"))
+        self.assertEqual(len(self.client.get(url, {"cursor": "garbage"}).json()["results"]), 7)
+
+    def test_board_list_load_more_link(self):
+        for i in range(3):
+            Board.objects.create(name=f"B{i}", owner=self.user).members.add(self.user)
+        page = keyset_page(Board.objects.filter(members=self.user), size=2)
+        response = self.client.get(reverse("board_list"), {"cursor": page.next_cursor})
+        # Match the link text: a bare "B2" can turn up in the CSRF token
+        self.assertContains(response, ">B0</a>")
+        self.assertNotContains(response, ">B2</a>")
+
+
+@override_settings(PREVIEW_WORKERS=0)
+class AttachmentUploadTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=self.media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.user = User.objects.create_user("alice")
+        self.board = Board.objects.create(name="Sprint", owner=self.user)
+        self.board.members.add(self.user)
+        column = self.board.columns.first()
+        self.tasks = [Task.objects.create(title=f"T{i}", board=self.board, column=column) for i in range(2)]
+        self.client.force_login(self.user)
+
+    def upload(self, task, data, chunk=4):
+        start = self.client.post(reverse("start_upload", args=[task.id]), {"filename": "spec.pdf", "size": len(data)})
+        state = start.json()
+        while not state["done"]:
+            url = reverse("upload_chunk", args=[state["id"]]) + f"?offset={state['offset']}"
+            body = data[state["offset"]:state["offset"] + chunk]
+            # The blob file is moved into place on commit
+            with self.captureOnCommitCallbacks(execute=True):
+                state = self.client.post(url, body, content_type="application/octet-stream").json()
+        return Attachment.objects.get(id=state["attachment_id"])
+
+    def test_resume_after_offset_conflict(self):
+        state = self.client.post(reverse("start_upload", args=[self.tasks[0].id]), {"filename": "a.txt", "size": 6}).json()
+        chunk_url = reverse("upload_chunk", args=[state["id"]])
+        self.client.post(chunk_url + "?offset=0", b"abc", content_type="application/octet-stream")
+        # The client lost the reply and resends from 0
+        response = self.client.post(chunk_url + "?offset=0", b"abc", content_type="application/octet-stream")
+        self.assertEqual((response.status_code, response.json()["offset"]), (409, 3))
+        self.assertEqual(self.client.get(reverse("upload_status", args=[state["id"]])).json()["offset"], 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            done = self.client.post(chunk_url + "?offset=3", b"def", content_type="application/octet-stream").json()
+        attach = Attachment.objects.get(id=done["attachment_id"])
+        with attach.file.open("rb") as f:
+            self.assertEqual(f.read(), b"abcdef")
+        self.assertFalse(UploadSession.objects.exists())
+
+    def test_empty_chunks_and_second_finish_are_refused(self):
+        state = self.client.post(reverse("start_upload", args=[self.tasks[0].id]), {"filename": "a.txt", "size": 3}).json()
+        chunk_url = reverse("upload_chunk", args=[state["id"]])
+        response = self.client.post(chunk_url + "?offset=0", b"", content_type="application/octet-stream")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(UploadSession.objects.get().received, 0)
+
+        # An empty file is finished by its one empty chunk, and only once
+        session = UploadSession.objects.create(task=self.tasks[0], user=self.user, filename="e.txt", size=0)
+        open(part_path(session.id), "wb").close()
+        with self.captureOnCommitCallbacks(execute=True):
+            uploads.finish_upload(session)
+        with self.assertRaises(uploads.UploadError):
+            uploads.finish_upload(session)
+        self.assertEqual(Attachment.objects.filter(name="e.txt").count(), 1)
+
+    def test_rolled_back_finish_moves_no_files(self):
+        state = self.client.post(reverse("start_upload", args=[self.tasks[0].id]), {"filename": "a.txt", "size": 3}).json()
+        session = UploadSession.objects.get(id=state["id"])
+        uploads.write_chunk(session, io.BytesIO(b"abc"), 0)
+        with mock.patch("boards.uploads._attach", side_effect=RuntimeError), self.assertRaises(RuntimeError):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                uploads.finish_upload(session)
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Blob.objects.exists())
+        # The part file is back where a retry expects it
+        with open(part_path(session.id), "rb") as f:
+            self.assertEqual(f.read(), b"abc")
+
+    def test_duplicates_share_one_blob_until_last_delete(self):
+        first = self.upload(self.tasks[0], b"same spec bytes")
+        second = self.upload(self.tasks[1], b"same spec bytes")
+        self.assertEqual(first.blob_id, second.blob_id)
+        self.assertEqual(Blob.objects.get().ref_count, 2)
+        path = first.blob.file.path
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse("delete_attachment", args=[first.id]))
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tasks[1].delete()
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(os.path.exists(path))
+
+    def test_form_upload_dedups_with_chunked(self):
+        chunked = self.upload(self.tasks[0], b"report")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("add_attachment", args=[self.tasks[1].id]),
+                {"file": SimpleUploadedFile("report.txt", b"report")},
+            )
+        form = self.tasks[1].attachments.get()
+        self.assertEqual((form.blob_id, form.name), (chunked.blob_id, "report.txt"))
+        self.assertEqual(os.listdir(os.path.dirname(part_path("x"))), [])
+        self.assertContains(self.client.get(reverse("task_detail", args=[self.tasks[1].id])), "report.txt")
+
+    def test_download_ranges_and_membership(self):
+        attach = self.upload(self.tasks[0], b"0123456789")
+        url = reverse("download_attachment", args=[attach.id])
+
+        response = self.client.get(url)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        self.assertEqual((response["Accept-Ranges"], response["ETag"]), ("bytes", f'"{attach.blob.sha256}"'))
+
+        response = self.client.get(url, HTTP_RANGE="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+        self.assertEqual((response["Content-Range"], response["Content-Length"]), ("bytes 2-5/10", "4"))
+
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=20-").status_code, 416)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+        # A stale If-Range gets the whole file
+        self.assertEqual(self.client.get(url, HTTP_RANGE="bytes=2-5", HTTP_IF_RANGE='"old"').status_code, 200)
+        self.assertEqual(parse_range("bytes=-3", 10), (7, 9))
+
+        self.client.force_login(User.objects.create_user("mallory"))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
+@override_settings(
+    PREVIEW_WORKERS=0,
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+)
+class AttachmentPreviewTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        media_override = override_settings(MEDIA_ROOT=self.media.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        self.user = User.objects.create_user("alice")
+        self.board = Board.objects.create(name="Sprint", owner=self.user)
+        self.board.members.add(self.user)
+        self.task = Task.objects.create(title="Logo", board=self.board, column=self.board.columns.first())
+        self.client.force_login(self.user)
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (1200, 600), "red").save(buffer, "PNG")
+        self.png = buffer.getvalue()
+
+    def attach(self, name, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("add_attachment", args=[self.task.id]), {"file": SimpleUploadedFile(name, data)})
+        return Attachment.objects.select_related("blob").latest("id")
+
+    def test_image_preview_rendered_once_per_blob(self):
+        attach = self.attach("logo.png", self.png)
+        self.assertEqual(attach.blob.preview_status, "ready")
+        with Image.open(attach.blob.preview.path) as thumb:
+            self.assertEqual(thumb.size, (320, 160))
+
+        again = self.attach("logo-copy.png", self.png)
+        self.assertEqual(again.blob_id, attach.blob_id)
+        self.assertFalse(queue_preview(again))
+
+        response = self.client.get(reverse("attachment_preview", args=[attach.id]))
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertContains(self.client.get(reverse("task_detail", args=[self.task.id])), "attachment-preview")
+
+    def test_unpreviewable_and_broken_files(self):
+        self.assertEqual(self.attach("notes.txt", b"plain text").blob.preview_status, "")
+        with self.assertLogs("boards.previews", "ERROR"):
+            self.assertEqual(self.attach("broken.png", b"not a png").blob.preview_status, "failed")
+        self.assertEqual(self.client.get(reverse("attachment_preview", args=[Attachment.objects.latest("id").id])).status_code, 404)
+
+
+class SeedBoardsTests(TestCase):
+    def seed(self, prefix):
+        call_command(
+            "seed_boards", users=12, teams=2, boards=4, tasks=40, team_size=6, board_size=3,
+            notifications=5, batch_size=7, seed=42, prefix=prefix, stdout=io.StringIO(),
+        )
+        return list(Task.objects.filter(board__team__name__startswith=prefix).order_by("id").values_list("title", "priority"))
+
+    def test_deterministic_and_consistent(self):
+        first = self.seed("a")
+        self.assertEqual(len(first), 40)
+        self.assertEqual(first, self.seed("b"))
+
+        # Every board gets its columns and every task sits on one of its own
+        self.assertEqual(Column.objects.count(), 8 * 3)
+        self.assertFalse(Task.objects.exclude(column__board=F("board")).exists())
+        # Counters match the unread notifications generated
+        for counter in NotificationCounter.objects.all():
+            self.assertEqual(counter.unread, Notification.objects.filter(user_id=counter.user_id, is_read=False).count())
+        task = Task.objects.first()
+        self.assertTrue(search_board(task.board, task.title.split()[1]))
+
+
+@override_settings(METRICS_SAMPLE_RATE=1.0, METRICS_TOKEN="s3cret")
+class QueryMetricsTests(TestCase):
+    def setUp(self):
+        query_metrics.reset()
+        self.user = User.objects.create_user("alice")
+        self.board = Board.objects.create(name="Sprint", owner=self.user)
+        self.board.members.add(self.user)
+        self.client.force_login(self.user)
+
+    def test_views_are_measured_per_url_name(self):
+        self.client.get(reverse("board_detail", args=[self.board.id]))
+        self.client.get(reverse("board_detail", args=[self.board.id]))
+        self.assertEqual(query_metrics.requests_total.value("board_detail"), 2)
+        self.assertEqual(query_metrics.queries_per_request.count("board_detail"), 2)
+        self.assertGreater(query_metrics.template_seconds._values[("board_detail",)][1], 0)
+        self.client.get(reverse("board_list"))
+        self.assertGreater(query_metrics.template_seconds._values[("board_list",)][1], 0)
+
+        body = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer s3cret").content.decode()
+        self.assertIn('boards_db_queries_per_request_count{view="board_detail"} 2', body)
+        self.assertIn('boards_http_request_duration_seconds_bucket{view="board_detail",le="+Inf"} 2', body)
+
+    def test_repeated_shapes_are_flagged(self):
+        self.assertEqual(
+            query_metrics.query_shape("SELECT * FROM t WHERE id IN (%s, %s, %s)\n  AND x = %s"),
+            "SELECT * FROM t WHERE id IN (...) AND x = %s",
+        )
+        with self.settings(METRICS_NPLUSONE_THRESHOLD=2):
+            sample = query_metrics.RequestSample()
+            with connection.execute_wrapper(sample):
+                for pk in range(3):
+                    Board.objects.filter(id=pk).exists()
+            query_metrics._record_shapes("demo", sample.shapes, 2)
+        self.assertEqual(query_metrics.nplusone_total.value("demo"), 1)
+        self.assertIn("# N+1 candidate view=demo", "\n".join(query_metrics.shape_comments()))
+
+    def test_staff_or_token_only(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer nope").status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        self.assertEqual(self.client.get("/metrics")["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+    WS_SLOW_DELIVERY_MS=500,
+)
+class WebSocketTelemetryTests(TestCase):
+    def setUp(self):
+        query_metrics.reset()
+        telemetry.slow_deliveries.clear()
+
+    async def test_deliveries_are_measured(self):
+        communicator = ApplicationCommunicator(NotificationConsumer.as_asgi(), {
+            "type": "websocket", "path": "/ws/notifications/3/",
+            "url_route": {"args": (), "kwargs": {"user_id": "3"}},
+        })
+        await communicator.send_input({"type": "websocket.connect"})
+        await communicator.receive_output(1)
+        self.assertEqual(telemetry.open_connections.value("notif"), 1)
+        self.assertEqual(telemetry.connects.value("notification", "notif"), 1)
+
+        layer = get_channel_layer()
+        await layer.group_send("notif_3", {"type": "notification_update", "data": {"type": "count", "unread": 1}})
+        # Stamped as if it sat in the layer for a second
+        await layer.group_send("notif_3", {
+            "type": "notification_update", "data": {"type": "count", "unread": 2}, "sent_at": time.time() - 1,
+        })
+        await communicator.receive_output(1)
+        await communicator.receive_output(1)
+        await communicator.send_input({"type": "websocket.disconnect", "code": 1000})
+        await communicator.wait(1)
+
+        self.assertEqual(telemetry.send_seconds.count("notification"), 2)
+        self.assertEqual(telemetry.layer_seconds.count("notification"), 1)
+        self.assertEqual(telemetry.pending_events.value("notification"), 0)
+        self.assertEqual(telemetry.disconnects.value("notification", "notif"), 1)
+        self.assertEqual(telemetry.open_connections.value("notif"), 0)
+        self.assertEqual(list(telemetry.open_connections._values), [("notif",)])
+        [slow] = telemetry.slow_deliveries.recent()
+        self.assertEqual((slow["group"], slow["events"], slow["depth"]), ("notif_3", ["count"], 1))
+        self.assertGreaterEqual(slow["layer_ms"], 1000)
+
+    def test_slow_deliveries_view_is_staff_only(self):
+        user = User.objects.create_user("alice", is_staff=True)
+        telemetry.delivered("board", "board_1", [(time.time() - 2, time.time() - 1)], ["task_moved"], 40, 0, 0.1)
+        self.client.force_login(user)
+        body = self.client.get(reverse("websocket_slow_deliveries")).json()
+        self.assertEqual(body["deliveries"][0]["events"], ["task_moved"])
+        self.assertIn('boards_ws_message_bytes_count{consumer="board"} 1', self.client.get("/metrics").content.decode())
+        user.is_staff = False
+        user.save()
+        self.assertEqual(self.client.get(reverse("websocket_slow_deliveries")).status_code, 302)
+
+
+class ReadWriteRoutingTests(SimpleTestCase):
+    def test_pool_reuses_idle_connections(self):
+        pool = ConnectionPool(1)
+        path = os.path.join(tempfile.mkdtemp(), "pool.sqlite3")
+        self.assertIsNone(pool.acquire())
+        first, second = sqlite3.connect(path), sqlite3.connect(path)
+        pool.release(first)
+        pool.release(second)
+        self.assertIs(pool.acquire(), first)
+        self.assertIsNone(pool.acquire())
+        pool.release(first)
+        pool.close_all()
+
+    def test_writers_only_hold_a_file_database_for_their_own_transaction(self):
+        # Each thread keeps its pooled connection open between writes, as a
+        # request does, and waits for the others in between
+        alias, threads, rounds = "file_writes", 6, 10
+        path = os.path.join(tempfile.mkdtemp(), "writes.sqlite3")
+
+        def connect():
+            # Configured like "default", registered for this thread only
+            connections[alias] = DatabaseWrapper({**connections.settings[DEFAULT_DB_ALIAS], "NAME": path}, alias)
+            return connections[alias]
+
+        with connect().cursor() as cursor:
+            cursor.execute("CREATE TABLE counter (n INTEGER NOT NULL)")
+            cursor.execute("CREATE TABLE log (id INTEGER PRIMARY KEY)")
+            cursor.execute("INSERT INTO counter VALUES (0)")
+        barrier, errors = threading.Barrier(threads, timeout=10), []
+
+        def work():
+            conn = connect()
+            try:
+                for _ in range(rounds):
+                    # Read-modify-write: only correct if BEGIN takes the write lock
+                    with transaction.atomic(using=alias), conn.cursor() as cursor:
+                        cursor.execute("SELECT n FROM counter")
+                        cursor.execute("UPDATE counter SET n = %s", [cursor.fetchone()[0] + 1])
+                    with conn.cursor() as cursor:
+                        cursor.execute("INSERT INTO log DEFAULT VALUES")
+                    barrier.wait()
+            except Exception as e:
+                errors.append(e)
+                barrier.abort()
+            finally:
+                conn.close()
+
+        workers = [threading.Thread(target=work) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(errors, [])
+        with connections[alias].cursor() as cursor:
+            cursor.execute("SELECT (SELECT n FROM counter), (SELECT COUNT(*) FROM log)")
+            self.assertEqual(cursor.fetchone(), (threads * rounds, threads * rounds))
+        connections[alias].close()
+        del connections[alias]
+        get_pool(alias, path, 0).close_all()
+
+    def test_reads_go_to_reader_only_in_read_requests(self):
+        router = ReadWriteRouter()
+        self.assertIsNone(router.db_for_read(Task))
+        token = reading.set(True)
+        try:
+            self.assertEqual(router.db_for_read(Task), "reader")
+            self.assertEqual(router.db_for_write(Task), "default")
+        finally:
+            reading.reset(token)
+        self.assertFalse(router.allow_migrate("reader", "boards"))
+
+
+class SubTaskCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ada", password="pw")
+        self.board = Board.objects.create(name="Sprint", owner=self.user)
+        self.board.members.add(self.user)
+        self.task = Task.objects.create(title="Ship", board=self.board, column=self.board.columns.first())
+        self.client.force_login(self.user)
+
+    def counts(self):
+        self.task.refresh_from_db()
+        return self.task.subtasks_done, self.task.subtasks_total
+
+    def test_views_keep_counts_in_step(self):
+        self.client.post(reverse("add_subtask", args=[self.task.id]), {"title": "a"})
+        self.client.post(reverse("add_subtask", args=[self.task.id]), {"title": "b"})
+        a, b = self.task.subtasks.order_by("id")
+        self.client.get(reverse("toggle_subtask", args=[a.id]))
+        self.assertEqual(self.counts(), (1, 2))
+        a.refresh_from_db()
+        a.save()  # an unchanged save doesn't count twice
+        self.assertEqual(self.counts(), (1, 2))
+        self.client.post(reverse("delete_subtask", args=[a.id]))
+        self.assertEqual(self.counts(), (0, 1))
+        self.client.get(reverse("toggle_subtask", args=[b.id]))
+        self.client.get(reverse("toggle_subtask", args=[b.id]))
+        self.assertEqual(self.counts(), (0, 1))
+
+    def test_board_detail_shows_progress(self):
+        SubTask.objects.create(task=self.task, title="a", is_completed=True)
+        for title in "bcd":
+            SubTask.objects.create(task=self.task, title=title)
+        response = self.client.get(reverse("board_detail", args=[self.board.id]))
+        self.assertContains(response, 'title="1/4 subtasks done"')
+        self.assertContains(response, "width: 25%")
+
+    def test_rebuild_command_fixes_bulk_created_subtasks(self):
+        SubTask.objects.bulk_create([SubTask(task=self.task, title="a", is_completed=True), SubTask(task=self.task, title="b")])
+        self.assertEqual(self.counts(), (0, 0))
+        call_command("rebuild_subtask_counts", stdout=io.StringIO())
+        self.assertEqual(self.counts(), (1, 2))
+
+
+class FlowAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("ada", password="pw")
+        self.team = Team.objects.create(name="Core", owner=self.user)
+        self.board = Board.objects.create(name="Sprint", owner=self.user, team=self.team)
+        self.board.members.add(self.user)
+        self.todo, self.doing, self.done = self.board.columns.order_by("order")
+        self.client.force_login(self.user)
+
+    def history(self, task, *moves):
+        previous = None
+        for day, column in moves:
+            TaskTransition.objects.create(
+                task=task, board=self.board, from_column=previous, to_column=column,
+                created_at=datetime(2026, 10, day, 12, tzinfo=dt_timezone.utc),
+            )
+            previous = column
+
+    def test_metrics(self):
+        a = Task.objects.create(title="A", board=self.board, column=self.done)
+        b = Task.objects.create(title="B", board=self.board, column=self.doing)
+        self.history(a, (8, self.todo), (10, self.doing), (13, self.done))
+        self.history(b, (15, self.todo), (16, self.doing))
+
+        now = datetime(2026, 10, 18, 12, tzinfo=dt_timezone.utc)
+        flow = analytics.compute([self.board.id], days=7, now=now)
+        self.assertEqual(flow["cumulative_flow"]["dates"][0], "2026-10-12")
+        self.assertEqual(flow["cumulative_flow"]["counts"], {
+            "To Do": [0, 0, 0, 1, 0, 0, 0],
+            "In Progress": [1, 0, 0, 0, 1, 1, 1],
+            "Done": [0, 1, 1, 1, 1, 1, 1],
+        })
+        self.assertEqual(flow["lead_time_days"]["p50"], 5.0)
+        self.assertEqual(flow["cycle_time_days"], {"count": 1, "p50": 3.0, "p85": 3.0, "p95": 3.0})
+        self.assertEqual(flow["throughput"], {"weeks": ["2026-10-12"], "done": [1]})
+
+    def test_moves_are_recorded_and_served(self):
+        self.client.post(reverse("add_task", args=[self.board.id]), {"title": "A", "column": self.todo.id, "priority": "low"})
+        task = Task.objects.get()
+        self.client.post(reverse("move_task"), {"task_id": task.id, "new_column_id": self.doing.id})
+        self.client.post(reverse("bulk_tasks"), {"task_ids": [task.id], "action": "move", "value": self.done.id})
+        path = list(TaskTransition.objects.order_by("id").values_list("from_column", "to_column"))
+        self.assertEqual(path, [(None, self.todo.id), (self.todo.id, self.doing.id), (self.doing.id, self.done.id)])
+
+        flow = self.client.get(reverse("board_analytics", args=[self.board.id])).json()
+        self.assertEqual(flow["board"], self.board.id)
+        self.assertEqual(flow["throughput"]["done"][-1], 1)
+        self.assertEqual(flow["cumulative_flow"]["counts"]["Done"][-1], 1)
+        self.assertEqual(self.client.get(reverse("board_analytics", args=[self.board.id]), {"days": 0}).status_code, 400)
+
+    def test_team_lanes_are_matched_by_title(self):
+        other = Board.objects.create(name="Ops", owner=self.user, team=self.team)
+        Column.objects.create(board=other, title="Review", order=4)
+        flow = self.client.get(reverse("team_analytics", args=[self.team.id]), {"days": 14}).json()
+        self.assertEqual(flow["lanes"], ["To Do", "In Progress", "Done", "Review"])
+        self.assertEqual(len(flow["cumulative_flow"]["dates"]), 14)
+        outsider = User.objects.create_user("eve")
+        self.client.force_login(outsider)
+        self.assertEqual(self.client.get(reverse("team_analytics", args=[self.team.id])).status_code, 404)
+
+
+class MyWorkDashboardTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ada", password="pw")
+        self.board = Board.objects.create(name="Sprint", owner=self.user)
+        self.board.members.add(self.user)
+        self.todo, self.doing, self.done = self.board.columns.order_by("order")
+        self.today = timezone.localdate()
+        self.client.force_login(self.user)
+
+    def assigned(self, title, days=None, priority="medium", column=None, board=None):
+        board = board or self.board
+        task = Task.objects.create(
+            title=title, board=board, column=column or board.columns.order_by("order").first(), priority=priority,
+            due_date=self.today + timedelta(days=days) if days is not None else None,
+        )
+        task.assigned_to.add(self.user)
+        return task
+
+    def test_groups_and_sorting(self):
+        monday = self.today - timedelta(days=self.today.weekday())
+        self.assigned("late", -2)
+        self.assigned("late but urgent", -1, priority="high")
+        self.assigned("this week", (monday + timedelta(days=6) - self.today).days, priority="low")
+        self.assigned("undated")
+        self.assigned("next month", 30, priority="high", column=self.doing)
+        self.assigned("finished", -5, column=self.done)
+        elsewhere = Board.objects.create(name="Not mine", owner=User.objects.create_user("bob"))
+        self.assigned("not a member", -3, board=elsewhere)
+
+        with self.assertNumQueries(1):
+            groups = dashboard.my_work(self.user)
+        titles = {key: [t["title"] for t in group["tasks"]] for key, group in groups.items()}
+        self.assertEqual(titles, {
+            "overdue": ["late", "late but urgent"],
+            "this_week": ["this week"],
+            "later": ["next month", "undated"],
+        })
+        by_priority = dashboard.my_work(self.user, sort="priority")
+        self.assertEqual([t["title"] for t in by_priority["overdue"]["tasks"]], ["late but urgent", "late"])
+
+    def test_limit_keeps_totals(self):
+        for i in range(4):
+            self.assigned(f"late {i}", -1 - i)
+        groups = dashboard.my_work(self.user, limit=2)
+        self.assertEqual(groups["overdue"]["total"], 4)
+        self.assertEqual([t["title"] for t in groups["overdue"]["tasks"]], ["late 3", "late 2"])
+
+    def test_views(self):
+        self.assigned("late", -2)
+        response = self.client.get(reverse("my_work"), {"sort": "priority"})
+        self.assertContains(response, "Overdue (1)")
+        data = self.client.get(reverse("my_work_json"), {"sort": "bogus"}).json()
+        self.assertEqual(data["sort"], "due")
+        self.assertEqual(data["groups"]["overdue"]["tasks"][0]["board_name"], "Sprint")
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ada", password="pw")
+        self.board = Board.objects.create(name="Sprint", owner=self.user)
+        self.board.members.add(self.user)
+        self.todo, self.doing, self.done = self.board.columns.order_by("order")
+        self.long_ago = timezone.now() - timedelta(days=60)
+        self.client.force_login(self.user)
+
+    def finished(self, title, column=None, when=None):
+        task = Task.objects.create(title=title, board=self.board, column=column or self.done)
+        TaskTransition.record(self.board.id, [(task.id, None, task.column_id)])
+        when = when or self.long_ago
+        Task.objects.filter(id=task.id).update(updated_at=when)
+        TaskTransition.objects.filter(task=task).update(created_at=when)
+        return task
+
+    def test_archive_and_restore_round_trip(self):
+        task = self.finished("Ship the needle")
+        task.assigned_to.add(self.user)
+        SubTask.objects.create(task=task, title="Write notes", is_completed=True)
+        comment = Comment.objects.create(task=task, author=self.user, content="Looks good")
+        Comment.objects.filter(id=comment.id).update(created_at=self.long_ago)
+        blob = Blob.objects.create(sha256="a" * 64, file="blobs/a", size=1, ref_count=1)
+        attachment = Attachment.objects.create(task=task, file=blob.file.name, blob=blob, name="spec.pdf")
+        self.finished("Finished yesterday", when=timezone.now() - timedelta(days=1))
+        self.finished("Stale but open", column=self.doing)
+
+        out = io.StringIO()
+        call_command("archive_tasks", days=30, stdout=out)
+        self.assertIn("Archived 1 task(s)", out.getvalue())
+        self.assertFalse(Task.objects.filter(id=task.id).exists())
+        self.assertEqual(search_board(self.board, "needle"), [])
+        # The archive holds the attachment's reference, so the blob stays
+        self.assertEqual(Blob.objects.get(id=blob.id).ref_count, 1)
+        archived = ArchivedTask.objects.get()
+        self.assertEqual(archived.task_id, task.id)
+        self.assertEqual(archived.done_at, self.long_ago)
+
+        response = self.client.post(reverse("restore_archived_task", args=[archived.id]))
+        # Open boards get the card back
+        event = BoardEvent.objects.filter(board=self.board).latest("version")
+        self.assertEqual((event.data["type"], event.data["task"]["id"]), ("task_created", task.id))
+        self.assertRedirects(response, reverse("task_detail", args=[task.id]), fetch_redirect_response=False)
+        restored = Task.objects.get(id=task.id)
+        self.assertEqual((restored.column_id, restored.subtasks_total, restored.subtasks_done), (self.done.id, 1, 1))
+        self.assertEqual(list(restored.assigned_to.all()), [self.user])
+        self.assertEqual(Comment.objects.get(id=comment.id).created_at, self.long_ago)
+        self.assertEqual(Attachment.objects.get(id=attachment.id).blob_id, blob.id)
+        self.assertEqual(Blob.objects.get(id=blob.id).ref_count, 1)
+        self.assertEqual(restored.transitions.count(), 1)
+        self.assertEqual([r["kind"] for r in search_board(self.board, "needle")], ["task"])
+        self.assertFalse(ArchivedTask.objects.exists())
+        # Restoring counts as a touch, so the next run leaves it alone
+        self.assertEqual(archive.archive_tasks(days=30), 0)
+
+    def test_batches_are_separate_board_events(self):
+        for i in range(5):
+            self.finished(f"Old {i}")
+        before = BoardEvent.objects.filter(board=self.board).count()
+        self.assertEqual(archive.archive_tasks(days=30, batch_size=2), 5)
+        events = BoardEvent.objects.filter(board=self.board).order_by("version")[before:]
+        self.assertEqual([len(e.data["task_ids"]) for e in events], [2, 2, 1])
+        self.assertEqual(ArchivedTask.objects.count(), 5)
+
+    def test_deleting_the_board_releases_archived_blobs(self):
+        task = self.finished("With a file")
+        blob = Blob.objects.create(sha256="b" * 64, file="blobs/b", size=1, ref_count=1)
+        Attachment.objects.create(task=task, file=blob.file.name, blob=blob)
+        archive.archive_tasks(days=30)
+        self.board.delete()
+        self.assertFalse(Blob.objects.filter(id=blob.id).exists())
+
+    def test_browser_pages_newest_finished_first(self):
+        for i in range(3):
+            self.finished(f"Old {i}", when=self.long_ago - timedelta(days=i))
+        archive.archive_tasks(days=30)
+        response = self.client.get(reverse("archived_tasks", args=[self.board.id]))
+        self.assertContains(response, "Restore", count=3)
+
+        first = keyset_page(self.board.archived_tasks.all(), size=2, field="done_at")
+        self.assertEqual([a.title for a in first.items], ["Old 0", "Old 1"])
+        data = self.client.get(reverse("archived_tasks_json", args=[self.board.id]), {"cursor": first.next_cursor}).json()
+        self.assertEqual([a["title"] for a in data["results"]], ["Old 2"])
+
+        self.client.force_login(User.objects.create_user("eve"))
+        self.assertEqual(self.client.get(reverse("archived_tasks", args=[self.board.id])).status_code, 404)
+        archived = ArchivedTask.objects.first()
+        self.assertEqual(self.client.post(reverse("restore_archived_task", args=[archived.id])).status_code, 404)
+
+
+class BoardNdjsonTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ada", password="pw")
+        self.board = Board.objects.create(name="Sprint", owner=self.user)
+        self.board.members.add(self.user)
+        self.todo, self.doing, self.done = self.board.columns.order_by("order")
+        self.task = Task.objects.create(title="Find the needle", board=self.board, column=self.todo, created_by=self.user)
+        self.task.assigned_to.add(self.user)
+        TaskTransition.record(self.board.id, [(self.task.id, None, self.todo.id)])
+        SubTask.objects.create(task=self.task, title="Look", is_completed=True)
+        SubTask.objects.create(task=self.task, title="Look again")
+        self.comment = Comment.objects.create(task=self.task, author=self.user, content="Still looking")
+        self.blob = Blob.objects.create(sha256="c" * 64, file="blobs/c", size=3, ref_count=1)
+        Attachment.objects.create(task=self.task, file=self.blob.file.name, blob=self.blob, name="hay.txt")
+
+    def test_round_trip_through_the_commands(self):
+        path = os.path.join(tempfile.mkdtemp(), "board.ndjson")
+        call_command("export_board", self.board.id, output=path, chunk_size=2)
+        with open(path) as f:
+            kinds = [json.loads(line)["type"] for line in f]
+        self.assertEqual(kinds[0], "board")
+        self.assertEqual(kinds.count("subtask"), 2)
+
+        bob = User.objects.create_user("bob")
+        out = io.StringIO()
+        call_command("import_board", path, owner="bob", name="Copy", batch_size=1, stdout=out)
+        self.assertIn("rows/s", out.getvalue())
+        copy = Board.objects.get(name="Copy")
+        self.assertEqual(list(copy.members.all()), [bob])
+        self.assertEqual(list(copy.columns.order_by("order").values_list("title", flat=True)), ["To Do", "In Progress", "Done"])
+        task = copy.tasks.get()
+        self.assertNotEqual(task.id, self.task.id)
+        self.assertEqual(task.column.board_id, copy.id)
+        self.assertEqual((task.subtasks_total, task.subtasks_done, task.created_by), (2, 1, self.user))
+        self.assertEqual(list(task.assigned_to.all()), [self.user])
+        self.assertEqual(task.created_at, self.task.created_at)
+        self.assertEqual(task.comments.get().created_at, self.comment.created_at)
+        self.assertEqual(task.attachments.get().blob_id, self.blob.id)
+        self.assertEqual(Blob.objects.get(id=self.blob.id).ref_count, 2)
+        self.assertEqual(list(task.transitions.values_list("to_column__board", flat=True)), [copy.id])
+        self.assertEqual([r["task_id"] for r in search_board(copy, "needle")], [task.id])
+
+    def test_missing_people_and_content_are_skipped(self):
+        lines = list(ndjson.export_board(self.board, chunk_size=100))
+        text = "".join(lines).replace('"author_username": "ada"', '"author_username": "nobody"')
+        # Content this installation has never stored
+        text = text.replace("c" * 64, "d" * 64)
+        board, counts = ndjson.import_board(text.splitlines(), self.user)
+        self.assertEqual(counts["comment"], 0)
+        self.assertEqual(counts["attachment"], 0)
+        self.assertEqual(counts["skipped"], 2)
+        self.assertEqual(board.tasks.get().subtasks_total, 2)
+
+    def test_bad_input_leaves_nothing_behind(self):
+        boards = Board.objects.count()
+        with self.assertRaisesMessage(ndjson.BoardImportError, "Line 1: the first line must be the board."):
+            ndjson.import_board(['{"type": "task", "id": 1}'], self.user)
+        header = '{"type": "board", "format": 1, "name": "X"}'
+        with self.assertRaisesMessage(ndjson.BoardImportError, "Line 2: task is missing column_id."):
+            ndjson.import_board([header, '{"type": "task", "id": 1, "title": "A"}'], self.user)
+        with self.assertRaisesMessage(ndjson.BoardImportError, "Line 2: not valid JSON."):
+            ndjson.import_board([header, "{"], self.user)
+        column = '{"type": "column", "id": 1, "title": "To Do", "order": 0}'
+        for line, message in [
+            ('{"type": "task", "id": "1", "column_id": 1, "title": "A"}', "Line 3: task id must be a whole number."),
+            ('{"type": "task", "id": 1, "column_id": 1, "title": "A", "created_at": "yesterday"}',
+             "Line 3: task created_at is not a valid date."),
+            ('{"type": "task", "id": 1, "column_id": 1, "title": "A", "due_date": "2024-02-30"}',
+             "Line 3: task due_date is not a valid date."),
+            ('{"type": "transition", "task_id": 1, "to_column_id": 1, "created_at": null}',
+             "Line 3: transition created_at is not a valid date."),
+            ('{"type": "attachment", "task_id": 1, "file": "../settings.py"}',
+             "Line 3: attachment file '../settings.py' is not allowed."),
+            ('{"type": "attachment", "task_id": 1, "file": "/etc/passwd"}',
+             "Line 3: attachment file '/etc/passwd' is not allowed."),
+        ]:
+            with self.subTest(line=line), self.assertRaisesMessage(ndjson.BoardImportError, message):
+                ndjson.import_board([header, column, line], self.user)
+        self.assertEqual(Board.objects.count(), boards)
+
+    async def test_export_view_streams(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse("export_board", args=[self.board.id]))
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        body = b"".join([chunk async for chunk in response.streaming_content])
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual(records[0]["name"], "Sprint")
+        self.assertEqual([r["title"] for r in records if r["type"] == "task"], ["Find the needle"])
+
+        await self.async_client.aforce_login(await User.objects.acreate(username="eve"))
+        response = await self.async_client.get(reverse("export_board", args=[self.board.id]))
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,79 @@
+"""
+Thumbnail rendering, run inside the preview worker processes.
+
+Nothing here imports Django, so a freshly spawned worker can unpickle and
+run ``render`` without setting up the project.
+"""
+import os
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+
+from PIL import Image
+
+
+def render(src, dest, kind, box, max_pixels, timeout):
+    """
+    Write a PNG thumbnail of ``src`` that fits in ``box`` x ``box`` to
+    ``dest``. Returns "ready" or "unsupported"; raises if rendering fails or
+    takes longer than ``timeout`` seconds.
+    """
+    def expire(signum, frame):
+        raise TimeoutError(f"Preview took longer than {timeout}s")
+
+    # Alarms only work on the main thread, which is where pool workers run us
+    use_alarm = threading.current_thread() is threading.main_thread()
+    if use_alarm:
+        previous = signal.signal(signal.SIGALRM, expire)
+        signal.alarm(timeout)
+    try:
+        if kind == "pdf":
+            return _render_pdf(src, dest, box, timeout)
+        return _render_image(src, dest, box, max_pixels)
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+            signal.signal(signal.SIGALRM, previous)
+
+
+def _render_image(src, dest, box, max_pixels):
+    with Image.open(src) as image:
+        # Only the header has been read so far; refuse decompression bombs here
+        if image.width * image.height > max_pixels:
+            raise ValueError(f"Image is {image.width}x{image.height}, over the {max_pixels} pixel limit")
+        image.draft("RGB", (box, box))  # JPEGs decode straight at a reduced size
+        image.thumbnail((box, box))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        _save_atomically(dest, lambda path: image.save(path, "PNG", optimize=True))
+    return "ready"
+
+
+def _render_pdf(src, dest, box, timeout):
+    # First page only, through poppler's pdftoppm if it's installed
+    if not shutil.which("pdftoppm"):
+        return "unsupported"
+
+    def convert(path):
+        prefix = path[:-len(".png")]
+        subprocess.run(
+            ["pdftoppm", "-png", "-singlefile", "-f", "1", "-l", "1",
+             "-scale-to", str(box), src, prefix],
+            check=True, timeout=timeout, capture_output=True,
+        )
+
+    _save_atomically(dest, convert)
+    return "ready"
+
+
+def _save_atomically(dest, write):
+    fd, tmp = tempfile.mkstemp(suffix=".png", dir=os.path.dirname(dest))
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,244 @@
+"""
+Attachment storage: chunked, resumable uploads and content-addressed blobs.
+
+A client starts an upload session, then sends the file in chunks, each
+tagged with the byte offset it starts at. Chunks are streamed straight onto
+a ``.part`` file under ``MEDIA_ROOT/uploads/``, so a dropped connection only
+costs the chunk in flight: the session remembers how many bytes arrived and
+the client resumes from there. A chunk lands in its own file first and is
+copied into place by whichever request moves the session's offset on.
+
+Finished files are stored once per SHA-256 under ``blobs/ab/cd/<sha256>``
+and shared by every attachment with the same content. Each Blob counts its
+attachments (and archived ones, see boards.archive); the file is removed
+when the last one is deleted. Files are only moved or removed once the
+transaction that changes the Blob rows commits.
+"""
+import hashlib
+import os
+import shutil
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Attachment, Blob, UploadSession
+
+MAX_SIZE = getattr(settings, "ATTACHMENT_MAX_SIZE", 512 * 1024 * 1024)
+SESSION_TTL = getattr(settings, "UPLOAD_SESSION_TTL", 24 * 3600)
+READ_SIZE = 64 * 1024
+
+
+class UploadError(Exception):
+    pass
+
+
+class OffsetMismatch(UploadError):
+    """A chunk didn't start where the session left off."""
+    def __init__(self, expected):
+        super().__init__(f"Expected a chunk at offset {expected}.")
+        self.expected = expected
+
+
+def blob_name(sha256):
+    return f"blobs/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def part_path(session_id):
+    return os.path.join(settings.MEDIA_ROOT, "uploads", f"{session_id}.part")
+
+
+# --- Upload sessions ---
+
+def start_upload(task, user, filename, size):
+    if size < 0 or size > MAX_SIZE:
+        raise UploadError(f"Files must be between 0 and {MAX_SIZE} bytes.")
+    session = UploadSession.objects.create(
+        task=task, user=user, filename=os.path.basename(filename)[:255], size=size
+    )
+    path = part_path(session.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    return session
+
+
+def write_chunk(session, stream, offset):
+    """
+    Write the bytes read from ``stream`` at ``offset`` and return the new
+    offset. Nothing is kept in memory beyond one READ_SIZE buffer.
+    """
+    if offset != session.received:
+        raise OffsetMismatch(session.received)
+
+    remaining = session.size - offset
+    written = 0
+    # Each request streams into its own file, so a retry racing the original can't mix bytes with it
+    chunk_path = f"{part_path(session.id)}.{uuid.uuid4().hex}"
+    try:
+        with open(chunk_path, "wb") as chunk:
+            while True:
+                data = stream.read(READ_SIZE)
+                if not data:
+                    break
+                written += len(data)
+                if written > remaining:
+                    raise UploadError("Chunk runs past the end of the file.")
+                chunk.write(data)
+        # Only an empty file is finished by an empty chunk
+        if not written and session.size:
+            raise UploadError("Chunk is empty.")
+
+        with transaction.atomic():
+            # The UPDATE holds the write lock until commit, so only one request
+            # moves the offset on, and nobody sees the new offset before its bytes are in
+            moved = UploadSession.objects.filter(id=session.id, received=offset).update(
+                received=offset + written, updated_at=timezone.now()
+            )
+            if not moved:
+                session.refresh_from_db(fields=["received"])
+                raise OffsetMismatch(session.received)
+            with open(chunk_path, "rb") as chunk, open(part_path(session.id), "r+b") as part:
+                part.seek(offset)
+                shutil.copyfileobj(chunk, part, READ_SIZE)
+    finally:
+        _discard(chunk_path)
+    session.received = offset + written
+    return session.received
+
+
+def finish_upload(session):
+    """Turn a complete session into an Attachment. Raises UploadError if it's already being finished."""
+    if session.received != session.size:
+        raise UploadError("Upload is not complete.")
+    path = part_path(session.id)
+    finishing = f"{path}.finishing"
+    try:
+        # The rename claims the session: a second finish finds no part file
+        os.rename(path, finishing)
+    except FileNotFoundError:
+        raise UploadError("Upload is already finished.")
+    try:
+        with open(finishing, "rb") as part:
+            sha256 = hashlib.file_digest(part, "sha256").hexdigest()
+        with transaction.atomic():
+            blob = _claim_blob(sha256, session.size, finishing)
+            attachment = _attach(session.task, session.user, session.filename, blob)
+            session.delete()
+    except BaseException:
+        # Rolled back: hand the part file back so the client can try again
+        os.replace(finishing, path)
+        raise
+    return attachment
+
+
+def store_uploaded_file(task, user, uploaded_file):
+    """The single-request form path: same storage, no session."""
+    tmp = part_path(f"form-{uuid.uuid4().hex}")
+    os.makedirs(os.path.dirname(tmp), exist_ok=True)
+    digest = hashlib.sha256()
+    with open(tmp, "wb") as out:
+        for chunk in uploaded_file.chunks(READ_SIZE):
+            digest.update(chunk)
+            out.write(chunk)
+    try:
+        with transaction.atomic():
+            blob = _claim_blob(digest.hexdigest(), uploaded_file.size, tmp)
+            return _attach(task, user, uploaded_file.name, blob)
+    except BaseException:
+        _discard(tmp)
+        raise
+
+
+def discard_stale_uploads(max_age=SESSION_TTL):
+    """Drop sessions nobody has written to for ``max_age`` seconds."""
+    cutoff = timezone.now() - timedelta(seconds=max_age)
+    stale = list(UploadSession.objects.filter(updated_at__lt=cutoff))
+    for session in stale:
+        session.delete()
+    return len(stale)
+
+
+# --- Blobs ---
+
+def _claim_blob(sha256, size, path):
+    """
+    Take a reference on the blob for ``sha256``. Once the transaction
+    commits, ``path`` becomes the blob's file if the blob is new and is
+    removed if not. On rollback nothing has moved and ``path`` is the
+    caller's to clean up.
+    """
+    if Blob.objects.filter(sha256=sha256).update(ref_count=F("ref_count") + 1):
+        transaction.on_commit(lambda: _discard(path))
+        return Blob.objects.get(sha256=sha256)
+
+    name = blob_name(sha256)
+    try:
+        with transaction.atomic():
+            blob = Blob.objects.create(sha256=sha256, file=name, size=size, ref_count=1)
+    except IntegrityError:
+        # Another upload of the same bytes got there first
+        Blob.objects.filter(sha256=sha256).update(ref_count=F("ref_count") + 1)
+        transaction.on_commit(lambda: _discard(path))
+        return Blob.objects.get(sha256=sha256)
+    transaction.on_commit(lambda: _store(path, name))
+    return blob
+
+
+def _store(path, name):
+    dest = default_storage.path(name)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    # Same filesystem, so this is a rename rather than a copy
+    os.replace(path, dest)
+
+
+def _discard(path):
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def _attach(task, user, filename, blob):
+    return Attachment.objects.create(
+        task=task, file=blob.file.name, blob=blob, name=filename, uploaded_by=user
+    )
+
+
+def _unlink_if_unused(sha256, name):
+    # A new upload may have re-created the blob since
+    if not Blob.objects.filter(sha256=sha256).exists():
+        default_storage.delete(name)
+        default_storage.delete(f"{name}.preview.png")
+
+
+def take_blob_refs(blob_ids):
+    """Take a reference on each blob in ``blob_ids`` (repeats count), e.g. for re-created attachments."""
+    for blob_id, count in Counter(pk for pk in blob_ids if pk).items():
+        Blob.objects.filter(id=blob_id).update(ref_count=F("ref_count") + count)
+
+
+def release_blob_refs(blob_id, count=1):
+    """Drop ``count`` references on a blob, removing it and its file at zero."""
+    Blob.objects.filter(id=blob_id).update(ref_count=F("ref_count") - count)
+    unused = Blob.objects.filter(id=blob_id, ref_count=0).values_list("sha256", "file").first()
+    if unused:
+        sha256, name = unused
+        Blob.objects.filter(id=blob_id, ref_count=0).delete()
+        transaction.on_commit(lambda: _unlink_if_unused(sha256, name))
+
+
+@receiver(post_delete, sender=Attachment)
+def release_blob(sender, instance, **kwargs):
+    if instance.blob_id is not None:
+        release_blob_refs(instance.blob_id)
+
+
+@receiver(post_delete, sender=UploadSession)
+def remove_part_file(sender, instance, **kwargs):
+    path = part_path(instance.id)
+    transaction.on_commit(lambda: _discard(path))
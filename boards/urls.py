@@ -4,28 +4,57 @@ from . import views
 urlpatterns = [
     # Board & Team Management
     path('', views.board_list, name='board_list'),
+    path('boards.json', views.board_list_json, name='board_list_json'),
     path('create/', views.create_board, name='create_board'),
     path('teams/', views.team_list, name='team_list'),
+    path('teams.json', views.team_list_json, name='team_list_json'),
     path('teams/create/', views.create_team, name='create_team'),
+    path('teams/<int:team_id>/analytics.json', views.team_analytics, name='team_analytics'),
+    path('my-work/', views.my_work, name='my_work'),
+    path('my-work.json', views.my_work_json, name='my_work_json'),
     path('<int:board_id>/', views.board_detail, name='board_detail'),
+    path('<int:board_id>/snapshot.json', views.board_snapshot, name='board_snapshot'),
+    path('<int:board_id>/events.json', views.board_events, name='board_events'),
+    path('<int:board_id>/analytics.json', views.board_analytics, name='board_analytics'),
+    path('<int:board_id>/search/', views.board_search, name='board_search'),
+    path('<int:board_id>/search.json', views.board_search_json, name='board_search_json'),
     path('<int:board_id>/invite/', views.invite_user, name='invite_user'),
+    path('<int:board_id>/export.ndjson', views.export_board, name='export_board'),
+    path('<int:board_id>/archive/', views.archived_tasks, name='archived_tasks'),
+    path('<int:board_id>/archive.json', views.archived_tasks_json, name='archived_tasks_json'),
+    path('archive/<int:archived_id>/restore/', views.restore_archived_task, name='restore_archived_task'),
     
     # Task Management
     path('<int:board_id>/add_task/', views.add_task, name='add_task'),
     path('task/<int:task_id>/', views.task_detail, name='task_detail'),
     path('task/<int:task_id>/edit/', views.edit_task, name='edit_task'),
+    path('task/<int:task_id>/lock/renew/', views.renew_task_lock, name='renew_task_lock'),
+    path('task/<int:task_id>/lock/release/', views.release_task_lock, name='release_task_lock'),
     path('task/<int:task_id>/delete/', views.delete_task, name='delete_task'),
     path('move-task/', views.move_task, name='move_task'),
+    path('<int:board_id>/reorder/', views.reorder, name='reorder'),
+    path('tasks/bulk/', views.bulk_tasks, name='bulk_tasks'),
     
     # Subtasks & Attachments
     path('task/<int:task_id>/subtask/add/', views.add_subtask, name='add_subtask'),
     path('subtask/<int:subtask_id>/toggle/', views.toggle_subtask, name='toggle_subtask'),
+    path('subtask/<int:subtask_id>/delete/', views.delete_subtask, name='delete_subtask'),
     path('task/<int:task_id>/attachment/add/', views.add_attachment, name='add_attachment'),
+    path('attachment/<int:attach_id>/download/', views.download_attachment, name='download_attachment'),
+    path('attachment/<int:attach_id>/preview/', views.attachment_preview, name='attachment_preview'),
     path('attachment/<int:attach_id>/delete/', views.delete_attachment, name='delete_attachment'),
+    path('task/<int:task_id>/uploads/', views.start_upload, name='start_upload'),
+    path('uploads/<uuid:upload_id>/', views.upload_status, name='upload_status'),
+    path('uploads/<uuid:upload_id>/chunk/', views.upload_chunk, name='upload_chunk'),
     
     # Notifications & Auth
     path('notifications/', views.notifications_panel, name='notifications'),
+    path('notifications.json', views.notifications_json, name='notifications_json'),
     path('notifications/read/<int:note_id>/', views.mark_notification_read, name='mark_notification_read'),
     path('notifications/clear/', views.clear_notifications, name='clear_notifications'),
     path('signup/', views.signup, name='signup'),
+
+    # Metrics (staff only)
+    path('metrics/broadcast/', views.broadcast_metrics, name='broadcast_metrics'),
+    path('metrics/websocket/slow/', views.websocket_slow_deliveries, name='websocket_slow_deliveries'),
 ]
\ No newline at end of file
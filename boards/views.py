@@ -1,16 +1,49 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import os
+
+from django.shortcuts import redirect, get_object_or_404, aget_object_or_404
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from django.utils import timezone
-from django.http import JsonResponse
+from django.utils.crypto import constant_time_compare
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.template.response import TemplateResponse
+from django.db import transaction
+from django.db.models import Q
 from django.views.decorators.http import require_POST
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login as auth_login
-from asgiref.sync import async_to_sync
-from channels.layers import get_channel_layer
+from asgiref.sync import sync_to_async
 
-from .models import Board, Column, Task, SubTask, Notification, Team, Attachment
+from .models import ArchivedTask, Board, Column, Task, TaskTransition, SubTask, Notification, NotificationCounter, Team, Attachment, UploadSession
 from .forms import TaskForm, SubTaskForm, BoardInviteForm, AttachmentForm
+from .snapshot import build_board_snapshot, task_card
+from .ordering import ORDER_GAP, next_order, place_task, write_order
+from .broadcast import batch_stats
+from .search import search_board
+from . import locks
+from .pagination import keyset_page, next_page_url
+from . import uploads
+from . import analytics
+from . import archive
+from . import bulk
+from . import dashboard
+from . import events
+from . import ndjson
+from .downloads import stream_file
+from .metrics import registry as metrics_registry
+from .telemetry import slow_deliveries
+
+# --- Async helpers ---
+# The hot paths (board_detail, task_detail, edit_task, move_task) are async
+# views: lookups go through the async ORM and broadcasts await the channel
+# layer directly. Pages are TemplateResponses, which the handler renders in a
+# thread because the context processors and lazy relations in templates use
+# the sync ORM.
+async def _auser(request):
+    # Resolve once, so request.user in templates doesn't query again
+    request.user = await request.auser()
+    return request.user
 
 # --- User Authentication ---
 def signup(request):
@@ -22,14 +55,29 @@ def signup(request):
             return redirect("board_list")
     else:
         form = UserCreationForm()
-    return render(request, "registration/signup.html", {"form": form})
+    return TemplateResponse(request, "registration/signup.html", {"form": form})
 
 # --- Team Management ---
+def _team_queryset(user):
+    member_of = Team.members.through.objects.filter(user=user).values("team_id")
+    return Team.objects.filter(Q(id__in=member_of) | Q(owner=user)).select_related("owner")
+
 @login_required
 def team_list(request):
     """List all teams the user belongs to or owns."""
-    teams = request.user.teams.all() | Team.objects.filter(owner=request.user)
-    return render(request, "boards/team_list.html", {"teams": teams.distinct()})
+    page = keyset_page(_team_queryset(request.user), request.GET.get("cursor"))
+    return TemplateResponse(request, "boards/team_list.html", {"teams": page.items, "next_url": next_page_url(request, page)})
+
+@login_required
+def team_list_json(request):
+    page = keyset_page(_team_queryset(request.user), request.GET.get("cursor"))
+    return JsonResponse({
+        "results": [
+            {"id": t.id, "name": t.name, "owner": t.owner.username, "created_at": t.created_at}
+            for t in page.items
+        ],
+        "next_cursor": page.next_cursor,
+    })
 
 @login_required
 def create_team(request):
@@ -42,17 +90,31 @@ def create_team(request):
             team.members.add(request.user)
             messages.success(request, f"Team '{name}' created!")
             return redirect("team_list")
-    return render(request, "boards/create_team.html")
+    return TemplateResponse(request, "boards/create_team.html")
 
 # --- Board Management ---
-@login_required
-def board_list(request):
+def _board_queryset(request):
+    boards = Board.objects.filter(members=request.user)
     team_id = request.GET.get("team")
     if team_id:
-        boards = Board.objects.filter(team_id=team_id, members=request.user)
-    else:
-        boards = Board.objects.filter(members=request.user)
-    return render(request, 'boards/board_list.html', {'boards': boards})
+        boards = boards.filter(team_id=team_id)
+    return boards
+
+@login_required
+def board_list(request):
+    page = keyset_page(_board_queryset(request), request.GET.get("cursor"))
+    return TemplateResponse(request, 'boards/board_list.html', {'boards': page.items, 'next_url': next_page_url(request, page)})
+
+@login_required
+def board_list_json(request):
+    page = keyset_page(_board_queryset(request), request.GET.get("cursor"))
+    return JsonResponse({
+        "results": [
+            {"id": b.id, "name": b.name, "description": b.description, "team_id": b.team_id, "created_at": b.created_at}
+            for b in page.items
+        ],
+        "next_cursor": page.next_cursor,
+    })
 
 @login_required
 def create_board(request):
@@ -65,22 +127,101 @@ def create_board(request):
         board = Board.objects.create(name=name, description=desc, owner=request.user, team=team)
         board.members.add(request.user)
         return redirect("board_detail", board_id=board.id)
-    return render(request, "boards/create_board.html", {"teams": teams})
+    return TemplateResponse(request, "boards/create_board.html", {"teams": teams})
 
 @login_required
-def board_detail(request, board_id):
+async def board_detail(request, board_id):
     # 1. Get the board and verify user is a member
-    board = get_object_or_404(Board, id=board_id, members=request.user)
-    
-    # 2. Get columns for THIS board and "pre-fetch" their tasks
-    # We use 'tasks' because that is the related_name we set in models.py
-    columns = board.columns.all().order_by('order').prefetch_related('tasks', 'tasks__assigned_to')
-    
-    return render(request, 'boards/board_detail.html', {
+    board = await aget_object_or_404(Board, id=board_id, members=await _auser(request))
+
+    # 2. Load columns, tasks, assignees and locks in a fixed number of queries,
+    # in one thread hop rather than one per query
+    snapshot = await sync_to_async(build_board_snapshot)(board)
+
+    return TemplateResponse(request, 'boards/board_detail.html', {
         'board': board,
-        'columns': columns
+        'snapshot': snapshot,
+        'columns': snapshot.columns,
+    })
+
+@login_required
+def board_snapshot(request, board_id):
+    """JSON version of the board page, built from the same snapshot."""
+    board = get_object_or_404(Board, id=board_id, members=request.user)
+    return JsonResponse(build_board_snapshot(board).as_dict())
+
+@login_required
+def board_events(request, board_id):
+    """
+    What a client missed while its socket was down: the events after
+    ``?since=<version>``, or a full snapshot if the log no longer has them.
+    """
+    board = get_object_or_404(Board, id=board_id, members=request.user)
+    try:
+        since = int(request.GET.get("since", ""))
+    except ValueError:
+        return JsonResponse({"error": "since must be an integer."}, status=400)
+    version, missed = events.since(board.id, since)
+    if missed is None:
+        return JsonResponse({"version": version, "snapshot": build_board_snapshot(board).as_dict()})
+    return JsonResponse({"version": version, "events": missed})
+
+def _my_work(request):
+    sort = request.GET.get("sort", "due")
+    sort = sort if sort in dashboard.SORTS else "due"
+    return sort, dashboard.my_work(request.user, sort)
+
+@login_required
+def my_work(request):
+    """Open tasks assigned to you on any of your boards, by due date or priority."""
+    sort, groups = _my_work(request)
+    return TemplateResponse(request, "boards/my_work.html", {"groups": groups, "sort": sort})
+
+@login_required
+def my_work_json(request):
+    sort, groups = _my_work(request)
+    return JsonResponse({"sort": sort, "groups": groups})
+
+def _analytics_days(request):
+    try:
+        days = int(request.GET.get("days", analytics.DEFAULT_DAYS))
+    except ValueError:
+        return None
+    return days if 1 <= days <= analytics.MAX_DAYS else None
+
+@login_required
+def board_analytics(request, board_id):
+    """Cumulative flow, cycle/lead time and throughput over the last ``?days=`` days."""
+    board = get_object_or_404(Board, id=board_id, members=request.user)
+    days = _analytics_days(request)
+    if days is None:
+        return JsonResponse({"error": f"days must be between 1 and {analytics.MAX_DAYS}."}, status=400)
+    return JsonResponse(analytics.board_flow(board, days))
+
+@login_required
+def team_analytics(request, team_id):
+    """board_analytics across all of a team's boards, with columns matched by title."""
+    team = get_object_or_404(_team_queryset(request.user), id=team_id)
+    days = _analytics_days(request)
+    if days is None:
+        return JsonResponse({"error": f"days must be between 1 and {analytics.MAX_DAYS}."}, status=400)
+    return JsonResponse(analytics.team_flow(team, days))
+
+@login_required
+def board_search(request, board_id):
+    board = get_object_or_404(Board, id=board_id, members=request.user)
+    query = request.GET.get("q", "")
+    return TemplateResponse(request, "boards/search_results.html", {
+        "board": board,
+        "query": query,
+        "results": search_board(board, query),
     })
 
+@login_required
+def board_search_json(request, board_id):
+    board = get_object_or_404(Board, id=board_id, members=request.user)
+    return JsonResponse({"results": search_board(board, request.GET.get("q", ""))})
+
 @login_required
 def invite_user(request, board_id):
     board = get_object_or_404(Board, id=board_id, owner=request.user)
@@ -94,7 +235,52 @@ def invite_user(request, board_id):
             return redirect('board_detail', board_id=board.id)
     else:
         form = BoardInviteForm()
-    return render(request, "boards/invite_user.html", {"board": board, "form": form})
+    return TemplateResponse(request, "boards/invite_user.html", {"board": board, "form": form})
+
+@login_required
+async def export_board(request, board_id):
+    """The whole board as NDJSON (see boards.ndjson), streamed as it's read."""
+    board = await aget_object_or_404(Board, id=board_id, members=await _auser(request))
+    response = StreamingHttpResponse(ndjson.aexport_board(board), content_type="application/x-ndjson")
+    response["Content-Disposition"] = f'attachment; filename="board-{board.id}.ndjson"'
+    return response
+
+@login_required
+def archived_tasks(request, board_id):
+    board = get_object_or_404(Board, id=board_id, members=request.user)
+    page = keyset_page(board.archived_tasks.defer("data"), request.GET.get("cursor"), field="done_at")
+    return TemplateResponse(request, "boards/archived_tasks.html", {
+        "board": board,
+        "tasks": page.items,
+        "next_url": next_page_url(request, page),
+    })
+
+@login_required
+def archived_tasks_json(request, board_id):
+    board = get_object_or_404(Board, id=board_id, members=request.user)
+    page = keyset_page(board.archived_tasks.defer("data"), request.GET.get("cursor"), field="done_at")
+    return JsonResponse({
+        "results": [
+            {
+                "id": a.id, "task_id": a.task_id, "title": a.title, "priority": a.priority,
+                "due_date": a.due_date, "done_at": a.done_at, "archived_at": a.archived_at,
+            }
+            for a in page.items
+        ],
+        "next_cursor": page.next_cursor,
+    })
+
+@login_required
+@require_POST
+def restore_archived_task(request, archived_id):
+    archived = get_object_or_404(ArchivedTask, id=archived_id, board__members=request.user)
+    try:
+        task = archive.restore(archived)
+    except archive.RestoreError as e:
+        messages.error(request, str(e))
+        return redirect("archived_tasks", board_id=archived.board_id)
+    messages.success(request, f"'{task.title}' restored.")
+    return redirect("task_detail", task_id=task.id)
 
 # --- Task Management ---
 @login_required
@@ -103,73 +289,165 @@ def add_task(request, board_id):
     if request.method == "POST":
         form = TaskForm(request.POST, board=board)
         if form.is_valid():
-            task = form.save(commit=False)
-            task.board = board
-            task.created_by = request.user
-            task.save()
-            form.save_m2m() # Saves assigned users
+            with transaction.atomic():
+                task = form.save(commit=False)
+                task.board = board
+                task.created_by = request.user
+                task.order = next_order(task.column.tasks.all())
+                task.save()
+                form.save_m2m() # Saves assigned users
+                TaskTransition.record(board.id, [(task.id, None, task.column_id)])
+                events.publish(_card_event(board.id, task.id, "task_created"))
             return redirect("board_detail", board_id=board.id)
     else:
         form = TaskForm(board=board)
-    return render(request, "boards/add_task.html", {"form": form, "board": board})
+    return TemplateResponse(request, "boards/add_task.html", {"form": form, "board": board})
 
 @login_required
-def task_detail(request, task_id):
-    task = get_object_or_404(Task, id=task_id)
-    return render(request, "boards/task_detail.html", {"task": task})
+async def task_detail(request, task_id):
+    await _auser(request)
+    task = await aget_object_or_404(Task.objects.select_related("board"), id=task_id)
+    attachments = [a async for a in task.attachments.select_related("blob", "uploaded_by")]
+    return TemplateResponse(request, "boards/task_detail.html", {"task": task, "attachments": attachments})
 
 @login_required
-def edit_task(request, task_id):
-    task = get_object_or_404(Task, id=task_id)
+async def edit_task(request, task_id):
+    user = await _auser(request)
+    task = await aget_object_or_404(Task.objects.select_related("board"), id=task_id)
     board = task.board
-    channel_layer = get_channel_layer()
 
-    # Collision Prevention
-    if task.is_locked and task.locked_by and task.locked_by != request.user:
-        messages.error(request, f"This task is being edited by {task.locked_by.username}")
+    # Collision Prevention: take (or renew) the editing lease
+    lease = await locks.aacquire(task, user)
+    if not lease.acquired:
+        messages.error(request, f"This task is being edited by {lease.holder}")
         return redirect("board_detail", board.id)
 
-    if request.method == "GET":
-        task.is_locked, task.locked_by, task.lock_timestamp = True, request.user, timezone.now()
-        task.save()
-        # Broadcast Lock
-        async_to_sync(channel_layer.group_send)(f"board_{board.id}", {"type": "board_update", "data": {"type": "task_locked", "task_id": task.id, "locked_by": request.user.username}})
+    form, saved, changed = await sync_to_async(_task_form)(task, board, request.POST if request.method == "POST" else None)
+    if saved:
+        await events.asend(changed)
+        await locks.arelease(task, user)
+        return redirect("task_detail", task_id=task.id)
+    return TemplateResponse(request, "boards/edit_task.html", {"form": form, "task": task, "lock_ttl": locks.LOCK_TTL})
 
-    if request.method == "POST":
-        form = TaskForm(request.POST, instance=task, board=board)
-        if form.is_valid():
+def _task_form(task, board, data=None):
+    # A ModelForm reads and writes assigned_to through the sync ORM.
+    # Returns the form, whether it saved, and the events recorded for the save.
+    from_column = task.column_id
+    form = TaskForm(data, instance=task, board=board)
+    if data is not None and form.is_valid():
+        with transaction.atomic():
             form.save()
-            task.is_locked, task.locked_by = False, None
-            task.save()
-            # Broadcast Unlock
-            async_to_sync(channel_layer.group_send)(f"board_{board.id}", {"type": "board_update", "data": {"type": "task_unlocked", "task_id": task.id}})
-            return redirect("task_detail", task_id=task.id)
-    else:
-        form = TaskForm(instance=task, board=board)
-    return render(request, "boards/edit_task.html", {"form": form, "task": task})
+            TaskTransition.record(board.id, [(task.id, from_column, task.column_id)])
+            changed = []
+            if task.column_id != from_column:
+                changed.append((board.id, {"type": "task_moved", "task_id": task.id, "new_column_id": task.column_id, "order": task.order}))
+            changed += _card_event(board.id, task.id)
+            events.record(changed)
+        return form, True, changed
+    return form, False, []
+
+def _card_event(board_id, task_id, kind="task_updated"):
+    """An event carrying the task's whole card, for boards to add or redraw it."""
+    return [(board_id, {"type": kind, "task": task_card(task_id)})]
+
+@login_required
+@require_POST
+def renew_task_lock(request, task_id):
+    """Heartbeat from an open edit page."""
+    task = get_object_or_404(Task, id=task_id)
+    lease = locks.renew(task, request.user)
+    return JsonResponse({"renewed": lease.acquired, "expires_at": lease.expires_at})
+
+@login_required
+@require_POST
+def release_task_lock(request, task_id):
+    task = get_object_or_404(Task, id=task_id)
+    return JsonResponse({"released": locks.release(task, request.user)})
 
 @login_required
 def delete_task(request, task_id):
     task = get_object_or_404(Task, id=task_id)
-    board_id = task.board.id
-    task.delete()
+    board_id = task.board_id
+    with transaction.atomic():
+        events.publish([(board_id, {"type": "task_deleted", "task_id": task.id})])
+        task.delete()
     return redirect('board_detail', board_id=board_id)
 
 @login_required
 @require_POST
-def move_task(request):
+async def move_task(request):
     task_id = request.POST.get("task_id")
     new_col_id = request.POST.get("new_column_id")
-    task = get_object_or_404(Task, id=task_id)
-    new_col = get_object_or_404(Column, id=new_col_id)
-    task.column = new_col
-    task.save()
-    
-    # WebSocket Broadcast
-    channel_layer = get_channel_layer()
-    async_to_sync(channel_layer.group_send)(f"board_{task.board.id}", {"type": "board_update", "data": {"type": "task_moved", "task_id": task.id}})
+    task = await aget_object_or_404(Task, id=task_id)
+    new_col = await aget_object_or_404(Column, id=new_col_id, board_id=task.board_id)
+    # Only the moved card is written; prev/next are the cards it was dropped between.
+    # place_task may renumber the column in a transaction, so it runs in one sync hop.
+    order, moved = await sync_to_async(_place_task)(task, new_col, request.POST.get("prev_id"), request.POST.get("next_id"))
+
+    # WebSocket Broadcast, once the move and its event log entry have committed
+    await events.asend(moved)
+    return JsonResponse({"success": True, "order": order})
+
+def _place_task(task, column, prev_id, next_id):
+    from_column = task.column_id
+    with transaction.atomic():
+        order = place_task(task, column, prev_id, next_id)
+        TaskTransition.record(task.board_id, [(task.id, from_column, column.id)])
+        moved = [(task.board_id, {"type": "task_moved", "task_id": task.id, "new_column_id": column.id, "order": order})]
+        events.record(moved)
+    return order, moved
+
+@login_required
+@require_POST
+def reorder(request, board_id):
+    """
+    Write a whole new order in one statement. Send ``column_id`` plus the
+    column's ``task_ids`` top to bottom, or just ``column_ids`` left to right.
+    Tasks in the column that aren't listed keep their relative order below
+    the listed ones.
+    """
+    board = get_object_or_404(Board, id=board_id, members=request.user)
+    column_id = request.POST.get("column_id")
+    try:
+        ids = [int(pk) for pk in request.POST.getlist("task_ids" if column_id else "column_ids")]
+    except ValueError:
+        return JsonResponse({"success": False, "error": "Ids must be integers."}, status=400)
+
+    with transaction.atomic():
+        if column_id:
+            column = get_object_or_404(Column, id=column_id, board=board)
+            tasks = Task.objects.filter(board=board)
+            arriving = list(tasks.filter(id__in=ids).exclude(column=column).values_list("id", "column_id"))
+            updated = write_order(tasks, ids, column=column)
+            # A card added since the client drew the column would otherwise keep an order that collides
+            rest = list(column.tasks.exclude(id__in=ids).order_by("order", "id").values_list("id", flat=True))
+            write_order(tasks, rest, base=len(ids) * ORDER_GAP)
+            event = {"type": "column_reordered", "column_id": column.id, "task_ids": ids + rest}
+        else:
+            updated = write_order(Column.objects.filter(board=board), ids)
+            event = {"type": "columns_reordered", "column_ids": ids}
+        if updated != len(ids):
+            transaction.set_rollback(True)
+            return JsonResponse({"success": False, "error": "Unknown ids for this board."}, status=400)
+        if column_id:
+            TaskTransition.record(board.id, [(task_id, old, column.id) for task_id, old in arriving])
+        events.publish([(board.id, event)])
     return JsonResponse({"success": True})
 
+@login_required
+@require_POST
+def bulk_tasks(request):
+    """
+    Apply one ``action`` to every task in ``task_ids``: move, priority,
+    assign, unassign, due_date or delete. ``value`` carries its argument
+    (see bulk.apply).
+    """
+    try:
+        result = bulk.apply(request.user, request.POST.getlist("task_ids"), request.POST.get("action", ""), request.POST.get("value"))
+    except bulk.BulkError as e:
+        return JsonResponse({"success": False, "error": str(e)}, status=e.status)
+    return JsonResponse({"success": True, **result})
+
 # --- Subtasks & Attachments ---
 @login_required
 def add_subtask(request, task_id):
@@ -177,15 +455,28 @@ def add_subtask(request, task_id):
     if request.method == "POST":
         form = SubTaskForm(request.POST)
         if form.is_valid():
-            sub = form.save(commit=False); sub.task = task; sub.save()
+            with transaction.atomic():
+                sub = form.save(commit=False); sub.task = task; sub.save()  # counted in SubTask.save
+                events.publish(_card_event(task.board_id, task.id))
             return redirect("task_detail", task_id=task.id)
-    return render(request, "boards/add_subtask.html", {"form": SubTaskForm(), "task": task})
+    return TemplateResponse(request, "boards/add_subtask.html", {"form": SubTaskForm(), "task": task})
 
 @login_required
 def toggle_subtask(request, subtask_id):
-    sub = get_object_or_404(SubTask, id=subtask_id)
-    sub.is_completed = not sub.is_completed; sub.save()
-    return redirect("task_detail", task_id=sub.task.id)
+    sub = get_object_or_404(SubTask.objects.select_related("task"), id=subtask_id)
+    with transaction.atomic():
+        sub.toggle()
+        events.publish(_card_event(sub.task.board_id, sub.task_id))
+    return redirect("task_detail", task_id=sub.task_id)
+
+@login_required
+@require_POST
+def delete_subtask(request, subtask_id):
+    sub = get_object_or_404(SubTask.objects.select_related("task"), id=subtask_id, task__board__members=request.user)
+    with transaction.atomic():
+        sub.delete()
+        events.publish(_card_event(sub.task.board_id, sub.task_id))
+    return redirect("task_detail", task_id=sub.task_id)
 
 @login_required
 def add_attachment(request, task_id):
@@ -193,30 +484,150 @@ def add_attachment(request, task_id):
     if request.method == "POST":
         form = AttachmentForm(request.POST, request.FILES)
         if form.is_valid():
-            attach = form.save(commit=False); attach.task, attach.uploaded_by = task, request.user; attach.save()
+            uploads.store_uploaded_file(task, request.user, form.cleaned_data["file"])
             return redirect("task_detail", task_id=task.id)
-    return render(request, "boards/add_attachment.html", {"form": AttachmentForm(), "task": task})
+    return TemplateResponse(request, "boards/add_attachment.html", {"form": AttachmentForm(), "task": task})
+
+@login_required
+@require_POST
+def start_upload(request, task_id):
+    """Open a chunked upload. Send ``filename`` and ``size`` in bytes."""
+    task = get_object_or_404(Task, id=task_id, board__members=request.user)
+    try:
+        session = uploads.start_upload(task, request.user, request.POST.get("filename", ""), int(request.POST.get("size", "")))
+    except ValueError:
+        return JsonResponse({"error": "size must be an integer."}, status=400)
+    except uploads.UploadError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+    return JsonResponse(_upload_state(session), status=201)
+
+@login_required
+def upload_status(request, upload_id):
+    """Where to resume an interrupted upload."""
+    session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+    return JsonResponse(_upload_state(session))
+
+@login_required
+@require_POST
+def upload_chunk(request, upload_id):
+    """
+    Raw chunk bytes as the request body, ``?offset=`` where they start. A
+    wrong offset gets a 409 carrying the offset to resume from.
+    """
+    session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+    try:
+        offset = int(request.GET.get("offset", ""))
+    except ValueError:
+        return JsonResponse({"error": "offset must be an integer."}, status=400)
+    try:
+        # request.read() streams the body; request.body would buffer it all
+        uploads.write_chunk(session, request, offset)
+    except uploads.OffsetMismatch as e:
+        return JsonResponse({"error": str(e), "offset": e.expected}, status=409)
+    except uploads.UploadError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    if session.received < session.size:
+        return JsonResponse(_upload_state(session))
+    try:
+        attach = uploads.finish_upload(session)
+    except uploads.UploadError as e:
+        # Another request for the same session is finishing it
+        return JsonResponse({"error": str(e), "offset": session.size}, status=409)
+    return JsonResponse({"done": True, "attachment_id": attach.id, "offset": session.size, "size": session.size})
+
+def _upload_state(session):
+    return {"id": str(session.id), "offset": session.received, "size": session.size, "done": False}
+
+@login_required
+def download_attachment(request, attach_id):
+    """Board members only; streamed, with Range and conditional GET support."""
+    attach = get_object_or_404(
+        Attachment.objects.select_related("blob"), id=attach_id, task__board__members=request.user
+    )
+    try:
+        path = attach.file.path
+    except (ValueError, NotImplementedError):
+        raise Http404("Attachment has no stored file.")
+    if not os.path.exists(path):
+        raise Http404("Attachment file is missing.")
+    return stream_file(request, path, str(attach), attach.blob.sha256 if attach.blob else None)
+
+@login_required
+def attachment_preview(request, attach_id):
+    attach = get_object_or_404(
+        Attachment.objects.select_related("blob"), id=attach_id, task__board__members=request.user
+    )
+    if not (attach.blob and attach.blob.preview_status == "ready"):
+        raise Http404("No preview for this attachment.")
+    return stream_file(request, attach.blob.preview.path, f"{attach}.png", f"{attach.blob.sha256}-preview")
 
 @login_required
 def delete_attachment(request, attach_id):
     attach = get_object_or_404(Attachment, id=attach_id)
     task_id = attach.task.id
+    # The stored file goes with its last attachment (see uploads.release_blob)
     attach.delete()
     return redirect("task_detail", task_id=task_id)
 
 # --- Notifications ---
+def _notification_queryset(request):
+    notes = request.user.notifications.all()
+    if request.GET.get("unread"):
+        notes = notes.filter(is_read=False)
+    return notes
+
 @login_required
 def notifications_panel(request):
-    notes = request.user.notifications.all().order_by('-created_at')
-    return render(request, "boards/notifications.html", {"notifications": notes})
+    page = keyset_page(_notification_queryset(request), request.GET.get("cursor"))
+    return TemplateResponse(request, "boards/notifications.html", {"notifications": page.items, "next_url": next_page_url(request, page)})
+
+@login_required
+def notifications_json(request):
+    page = keyset_page(_notification_queryset(request), request.GET.get("cursor"))
+    return JsonResponse({
+        "results": [
+            {"id": n.id, "message": n.message, "task_id": n.task_id, "is_read": n.is_read, "created_at": n.created_at}
+            for n in page.items
+        ],
+        "next_cursor": page.next_cursor,
+    })
 
 @login_required
 def mark_notification_read(request, note_id):
     note = get_object_or_404(Notification, id=note_id, user=request.user)
-    note.is_read = True; note.save()
+    note.mark_read()
     return redirect('notifications')
 
 @login_required
 def clear_notifications(request):
-    request.user.notifications.all().delete()
-    return redirect('notifications')
\ No newline at end of file
+    # One transaction, so a notification arriving meanwhile is either cleared or still counted
+    with transaction.atomic():
+        request.user.notifications.all().delete()
+        NotificationCounter.reset(request.user.id)
+        transaction.on_commit(lambda: NotificationCounter.push([request.user.id]))
+    return redirect('notifications')
+
+# --- Metrics ---
+@staff_member_required
+def broadcast_metrics(request):
+    """How many board events this process merged into each WebSocket frame."""
+    return JsonResponse(batch_stats.as_dict())
+
+@staff_member_required
+def websocket_slow_deliveries(request):
+    """The most recent WebSocket deliveries over WS_SLOW_DELIVERY_MS, newest first."""
+    return JsonResponse({
+        "threshold_ms": getattr(settings, "WS_SLOW_DELIVERY_MS", 250),
+        "deliveries": slow_deliveries.recent(),
+    })
+
+def prometheus_metrics(request):
+    """
+    This process's metrics in Prometheus text format. Staff can browse it;
+    a scraper sends ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if not (request.user.is_staff or (token and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"))):
+        return HttpResponse("Forbidden", status=403, content_type="text/plain")
+    return HttpResponse(metrics_registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
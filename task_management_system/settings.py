@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "boards.middleware.QueryMetricsMiddleware",
+    "boards.db.routers.ReadRoutingMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -56,12 +59,75 @@ ROOT_URLCONF = "task_management_system.urls"
 # Channels layer configuration
 ASGI_APPLICATION = "task_management_system.asgi.application"
 
+# Shared SQLite file so group_send reaches clients on every ASGI worker on
+# this host. A single worker can use "channels.layers.InMemoryChannelLayer".
 CHANNEL_LAYERS = {
     "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer",
+        "BACKEND": "boards.layers.SQLiteChannelLayer",
+        "CONFIG": {
+            "path": BASE_DIR / "channels.sqlite3",
+        },
     },
 }
 
+# The sidebar cache (boards/sidebar.py) and the analytics cache must be
+# shared by every worker process: a sidebar invalidation swaps a version
+# token here, and a per-process cache such as LocMemCache would let other
+# workers keep serving the old sidebar. Files work for workers on one host,
+# like the SQLite database and channel layer above. Use Redis or Memcached
+# (or DatabaseCache) once workers span hosts.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+    },
+}
+
+# BoardConsumer collects board updates for this many milliseconds and sends
+# each client one JSON array per window. 0 turns batching off.
+BOARD_BATCH_WINDOW_MS = 15
+
+# Board change log entries kept per board by compact_board_events; clients
+# that fall further behind reload from a full snapshot
+BOARD_EVENT_RETENTION = 1000
+
+# Seconds a board or team analytics result is cached; any change to the
+# boards involved starts a fresh one sooner
+ANALYTICS_CACHE_TIMEOUT = 300
+
+# archive_tasks moves tasks that have sat untouched in their board's last
+# column for this many days out of the live tables, this many per transaction
+ARCHIVE_AFTER_DAYS = 30
+ARCHIVE_BATCH_SIZE = 500
+
+# Seconds an editing lease on a task lasts without a heartbeat from the edit page
+TASK_LOCK_TTL = 120
+
+# Largest attachment a chunked upload will accept, and how long (seconds) an
+# unfinished upload can sit before clear_stale_uploads removes it
+ATTACHMENT_MAX_SIZE = 512 * 1024 * 1024
+UPLOAD_SESSION_TTL = 24 * 3600
+
+# Attachment thumbnails: worker processes (0 renders inline), longest edge in
+# pixels, and the per-file timeout in seconds
+PREVIEW_WORKERS = 2
+PREVIEW_SIZE = 320
+PREVIEW_TIMEOUT = 30
+
+# /metrics: the fraction of requests whose queries and template time are
+# recorded (every request is timed), how often one query shape may repeat in
+# a request before it's flagged as a likely N+1, and a bearer token for
+# scrapers (staff can always view it)
+METRICS_SAMPLE_RATE = 0.1
+METRICS_NPLUSONE_THRESHOLD = 5
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# WebSocket deliveries slower than this (milliseconds from group_send to the
+# socket write) are kept, up to WS_SLOW_LOG_SIZE per process, for
+# /boards/metrics/websocket/slow/
+WS_SLOW_DELIVERY_MS = 250
+WS_SLOW_LOG_SIZE = 100
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
@@ -84,12 +150,33 @@ WSGI_APPLICATION = "task_management_system.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# One SQLite file in WAL mode (see boards/db/base.py). BEGIN IMMEDIATE takes
+# the write lock up front rather than failing to upgrade a read lock
+# mid-transaction, and writers queue on SQLite's busy timeout ("timeout", in
+# seconds) for as long as one transaction holds it. Reads made while serving
+# GET requests use a pool of read-only connections (boards/db/routers.py).
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "boards.db",
         "NAME": BASE_DIR / "db.sqlite3",
-    }
+        "OPTIONS": {
+            "pool_size": 4,
+            "transaction_mode": "IMMEDIATE",
+            "timeout": 20,
+        },
+    },
+    "reader": {
+        "ENGINE": "boards.db",
+        "NAME": BASE_DIR / "db.sqlite3",
+        "OPTIONS": {
+            "pool_size": 8,
+            "read_only": True,
+            "timeout": 20,
+        },
+        "TEST": {"MIRROR": "default"},
+    },
 }
+DATABASE_ROUTERS = ["boards.db.routers.ReadWriteRouter"]
 # -------------------------------------------------------------------
 # Authentication Behavior
 # -------------------------------------------------------------------
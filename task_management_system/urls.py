@@ -21,11 +21,14 @@ from django.shortcuts import redirect
 from django.conf import settings
 from django.conf.urls.static import static
 
+from boards.views import prometheus_metrics
+
 urlpatterns = [
      path('', lambda request: redirect('board_list')),      # redirect home → boards
     path('admin/', admin.site.urls),
     path('boards/', include('boards.urls')),
     path('accounts/', include('django.contrib.auth.urls')),   # 👈 new line
+    path('metrics', prometheus_metrics, name='metrics'),
 ]
 
 if settings.DEBUG: